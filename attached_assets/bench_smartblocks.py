@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+스마트블록 스크래퍼 오프라인 벤치마크
+
+네트워크 없이 픽스처 저장소의 응답을 로컬 스텁 HTTP 서버로 재생하고,
+스테이지별(detect_smartblock_categories / extract_blogs_from_container / main) 처리량,
+p50/p95 지연 시간, 최대 RSS를 측정합니다. 파서/동시성 변경 전후를 같은 입력으로 비교하는 용도입니다.
+
+픽스처 저장소 구조:
+    <fixtures>/<키워드>.html          검색 결과 페이지 (tmp/naver_html_samples와 같은 형식)
+    <fixtures>/responses/<sha1>.json  그 외 응답 (lb_api JSON, 더보기 페이지, in.naver.com 리다이렉트)
+                                      {"url", "status", "headers", "body"}; sha1은 원래 URL 기준
+
+responses/에 없는 in.naver.com 요청은 URL로 정해지는 blog.naver.com 주소로 302 응답하고,
+그 외 기록이 없는 요청은 404로 응답합니다 (보고서의 missingFixtures에 집계).
+저장소에 들어 있는 tmp/naver_html_samples에는 검색 HTML만 있고 responses/ 기록이 없으므로,
+기본 픽스처로 돌린 main 스테이지는 lb_api/더보기 요청이 모두 404이고 in.naver.com은 합성 302입니다
+(팬아웃 비용이 아니라 404 처리 경로를 재는 셈). 실제 팬아웃을 재려면 --record로 만든 저장소를 쓰십시오.
+Playwright fallback은 오프라인에서 재현할 수 없으므로 벤치마크 중에는 끕니다.
+
+--urls는 네트워크 스테이지 대신 URL 분류 마이크로벤치마크만 실행합니다: 픽스처의 모든 href를
+말뭉치로 삼아 이전 방식(정규식 두 번, 컴파일/메모이즈 없음)과 classify_url(첫 호출 / 메모이즈)을 비교합니다.
+
+--startup은 픽스처 없이 기동 시간만 잽니다: CLI(사용법 오류), 배치(빈 입력), 워커(바로 shutdown)
+모드로 새 인터프리터를 `python -X importtime -m <스크래퍼>`로 띄워 벽시계 시간과 import 시간,
+가장 비싼 최상위 import를 집계합니다. 서버가 짧게 띄우는 호출마다 치르는 비용입니다.
+스크립트 경로로 실행하면 .pyc 없이 본문을 매번 컴파일하므로 그 비용도 별도 행(cli script)으로 보여줍니다.
+
+Usage:
+    python bench_smartblocks.py                                  # tmp/naver_html_samples 사용
+    python bench_smartblocks.py --urls --repeat 20               # URL 분류 마이크로벤치마크
+    python bench_smartblocks.py --startup --repeat 10            # 모드별 기동 시간 (-X importtime)
+    python bench_smartblocks.py --parser lxml --repeat 5 --json
+    python bench_smartblocks.py --record fixtures_dir 가습기 감자탕  # 실제 네이버 응답을 픽스처로 기록
+"""
+
+import argparse
+import asyncio
+import glob
+import hashlib
+import html
+import http.server
+import json
+import os
+import re
+import resource
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+import zlib
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import scrape_smartblocks_1759758904373 as scraper  # noqa: E402
+
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tmp', 'naver_html_samples')
+
+# --startup 모드별 실행 인자와 stdin (-m 실행 / 스크립트 경로 실행)
+STARTUP_MODES = (
+    ('cli (usage)', ['-m', scraper.__name__], b''),
+    ('cli script (usage)', [scraper.__file__], b''),
+    ('batch (empty input)', ['-m', scraper.__name__, '--batch', '-', '--no-cache'], b''),
+    ('worker (shutdown)', ['-m', scraper.__name__, '--worker', '--no-cache'],
+     b'{"jsonrpc": "2.0", "id": 1, "method": "shutdown"}\n'),
+)
+
+
+def fixture_key(url: str) -> str:
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+
+class FixtureStore:
+    """키워드별 검색 HTML과 URL별 기록 응답을 읽는 픽스처 저장소"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.serps: Dict[str, str] = {}
+        for path in sorted(glob.glob(os.path.join(root, '*.html'))):
+            keyword = os.path.splitext(os.path.basename(path))[0]
+            with open(path, encoding='utf-8') as f:
+                self.serps[keyword] = f.read()
+        self.missing = 0
+        self._lock = threading.Lock()
+
+    def response_path(self, url: str) -> str:
+        return os.path.join(self.root, 'responses', fixture_key(url) + '.json')
+
+    def lookup(self, url: str) -> Tuple[int, Dict[str, str], bytes]:
+        """원래 URL에 대한 (status, headers, body)"""
+        parts = urllib.parse.urlsplit(url)
+        if parts.hostname == 'search.naver.com' and parts.path == '/search.naver':
+            query = urllib.parse.parse_qs(parts.query).get('query', [''])[0]
+            if query in self.serps:
+                return 200, {'Content-Type': 'text/html; charset=UTF-8'}, self.serps[query].encode('utf-8')
+
+        path = self.response_path(url)
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                record = json.load(f)
+            return record['status'], record.get('headers', {}), record.get('body', '').encode('utf-8')
+
+        if parts.hostname == 'in.naver.com':
+            digest = zlib.crc32(url.encode('utf-8'))
+            return 302, {'Location': f'https://blog.naver.com/bench{digest % 97}/{digest}'}, b''
+
+        with self._lock:
+            self.missing += 1
+        return 404, {'Content-Type': 'text/plain'}, b'no fixture'
+
+    def record(self, url: str, status: int, headers, body: str) -> None:
+        os.makedirs(os.path.join(self.root, 'responses'), exist_ok=True)
+        kept = {name: headers[name] for name in ('content-type', 'location') if name in headers}
+        with open(self.response_path(url), 'w', encoding='utf-8') as f:
+            json.dump({'url': url, 'status': status, 'headers': kept, 'body': body}, f, ensure_ascii=False)
+
+
+class StubServer:
+    """픽스처 저장소를 http://127.0.0.1:<port>/<host><path>?<query> 로 제공하는 스텁 서버"""
+
+    def __init__(self, store: FixtureStore):
+        self.store = store
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(handler):
+                host, _, rest = handler.path.lstrip('/').partition('/')
+                status, headers, body = store.lookup(f'https://{host}/{rest}')
+                handler.send_response(status)
+                for name, value in headers.items():
+                    handler.send_header(name, value)
+                handler.send_header('Content-Length', str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(handler, *args):
+                pass
+
+        self.httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.base_url = f'http://127.0.0.1:{self.httpd.server_address[1]}'
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def rewrite(self, url: str) -> str:
+        parts = urllib.parse.urlsplit(url)
+        rewritten = f'{self.base_url}/{parts.netloc}{parts.path or "/"}'
+        return f'{rewritten}?{parts.query}' if parts.query else rewritten
+
+    def __enter__(self) -> 'StubServer':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(name: str, samples: List[float], wall: float) -> Dict:
+    return {
+        'stage': name,
+        'count': len(samples),
+        'wallSeconds': round(wall, 4),
+        'throughputPerSec': round(len(samples) / wall, 2) if wall > 0 else None,
+        'p50Ms': round(percentile(samples, 50) * 1000, 2),
+        'p95Ms': round(percentile(samples, 95) * 1000, 2),
+    }
+
+
+def peak_rss_mb() -> float:
+    # Linux ru_maxrss는 KB, macOS는 바이트
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+
+
+def timed(fn: Callable[[], object]) -> float:
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def bench_detect(store: FixtureStore, repeat: int) -> Dict:
+    samples = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for serp_html in store.serps.values():
+            samples.append(timed(lambda: scraper.detect_smartblock_categories(serp_html)))
+    return summarize('detect_smartblock_categories', samples, time.perf_counter() - started)
+
+
+_HREF_RE = re.compile(r'href\s*=\s*(?:"([^"]*)"|\'([^\']*)\')', re.I)
+
+
+def href_corpus(store: FixtureStore) -> List[str]:
+    """픽스처의 검색 HTML과 기록된 응답 본문에 있는 모든 href (등장 순서, 중복 포함)"""
+    documents = list(store.serps.values())
+    for path in sorted(glob.glob(os.path.join(store.root, 'responses', '*.json'))):
+        with open(path, encoding='utf-8') as f:
+            documents.append(json.load(f).get('body', ''))
+    return [html.unescape(double or single) for document in documents
+            for double, single in _HREF_RE.findall(document)]
+
+
+def legacy_classify(href: str):
+    """classify_url 이전의 추출 경로: 부분 문자열 검사 + 컴파일하지 않은 re.search 두 번"""
+    if 'blog.naver.com' in href:
+        match = re.search(r'blog\.naver\.com/([^/]+)/(\d+)', href)
+        if match:
+            return match.group(1), match.group(2)
+        match = re.search(r'blogId=([^&]+).*?logNo=(\d+)', href)
+        if match:
+            return match.group(1), match.group(2)
+        return None, None
+    if 'in.naver.com' in href and '/contents/' in href:
+        return href
+    return None
+
+
+def bench_urls(store: FixtureStore, repeat: int) -> List[Dict]:
+    """href 말뭉치 전체를 한 번 분류하는 시간을 샘플 하나로 측정"""
+    corpus = href_corpus(store)
+    classify = scraper.classify_url
+
+    def run(name: str, fn: Callable[[str], object], before: Callable[[], None] = lambda: None) -> Dict:
+        samples = []
+        started = time.perf_counter()
+        for _ in range(repeat):
+            before()
+            t0 = time.perf_counter()
+            for href in corpus:
+                fn(href)
+            samples.append(time.perf_counter() - t0)
+        stage = summarize(name, samples, time.perf_counter() - started)
+        stage['hrefsPerSec'] = round(len(corpus) * len(samples) / sum(samples)) if sum(samples) > 0 else None
+        return stage
+
+    stages = [
+        run(f'legacy parse_blog_url ({len(corpus)} hrefs)', legacy_classify, re.purge),
+        run(f'classify_url cold ({len(corpus)} hrefs)', classify, classify.cache_clear),
+        run(f'classify_url memoized ({len(corpus)} hrefs)', classify),
+    ]
+    kinds: Dict[str, int] = {}
+    for href in corpus:
+        kind = classify(href).kind
+        kinds[kind] = kinds.get(kind, 0) + 1
+    stages[-1]['kinds'] = kinds
+    return stages
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """-X importtime 출력 → [(모듈, 깊이, self us, cumulative us)] (깊이 0이 최상위 import)"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        if not self_us.strip().isdigit():
+            continue  # 머리글 행
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return rows
+
+
+def bench_startup(repeat: int, top: int = 5) -> List[Dict]:
+    """모드마다 새 인터프리터를 repeat번 띄워 기동 시간과 import 시간을 측정
+
+    첫 실행은 .pyc 준비용으로 버립니다. importMs는 최상위 import의 cumulative 합계,
+    topImports는 그 중 중앙값이 가장 큰 모듈입니다.
+    """
+    cwd = os.path.dirname(os.path.abspath(scraper.__file__))
+    stages = []
+    for name, args, stdin in STARTUP_MODES:
+        command = [sys.executable, '-X', 'importtime', *args]
+        samples: List[float] = []
+        import_ms: List[float] = []
+        per_module: Dict[str, List[int]] = {}
+        started = time.perf_counter()
+        for attempt in range(repeat + 1):
+            t0 = time.perf_counter()
+            completed = subprocess.run(command, input=stdin, cwd=cwd, capture_output=True, timeout=120)
+            elapsed = time.perf_counter() - t0
+            if attempt == 0:
+                continue
+            samples.append(elapsed)
+            top_level = [row for row in parse_importtime(completed.stderr.decode('utf-8', 'replace')) if row[1] == 0]
+            import_ms.append(sum(row[3] for row in top_level) / 1000)
+            for module, _, _, cumulative_us in top_level:
+                per_module.setdefault(module, []).append(cumulative_us)
+        stage = summarize(name, samples, time.perf_counter() - started)
+        stage['importP50Ms'] = round(percentile(import_ms, 50), 2)
+        stage['topImports'] = sorted(
+            ((module, round(percentile(values, 50) / 1000, 2)) for module, values in per_module.items()),
+            key=lambda item: item[1], reverse=True,
+        )[:top]
+        stages.append(stage)
+    return stages
+
+
+def print_startup_report(report: Dict) -> None:
+    print(f"startup python={report['python']} repeat={report['repeat']}")
+    print(f"{'mode':<24} {'p50 ms':>9} {'p95 ms':>9} {'import ms':>10}  top imports (ms)")
+    for stage in report['stages']:
+        top = ', '.join(f'{module} {ms:.1f}' for module, ms in stage['topImports'])
+        print(f"{stage['stage']:<24} {stage['p50Ms']:>9.2f} {stage['p95Ms']:>9.2f} {stage['importP50Ms']:>10.2f}  {top}")
+
+
+async def bench_extract(client: scraper.NaverHttpClient, store: FixtureStore, repeat: int) -> Dict:
+    containers = [
+        cat_info['container']
+        for html in store.serps.values()
+        for cat_info in scraper.detect_smartblock_categories(html)
+    ]
+    samples = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for container in containers:
+            t0 = time.perf_counter()
+            await scraper.extract_blogs_from_container_async(client, container, scraper.DEFAULT_HEADERS)
+            samples.append(time.perf_counter() - t0)
+    return summarize('extract_blogs_from_container', samples, time.perf_counter() - started)
+
+
+async def bench_main(client: scraper.NaverHttpClient, store: FixtureStore, repeat: int,
+                     concurrency: int) -> Tuple[Dict, Dict[str, int]]:
+    jobs = [keyword for _ in range(repeat) for keyword in store.serps]
+    pending = iter(jobs)
+    samples = []
+    blogs: Dict[str, int] = {}
+
+    async def worker() -> None:
+        for keyword in pending:
+            t0 = time.perf_counter()
+            result = await scraper.main_async(keyword, client)
+            samples.append(time.perf_counter() - t0)
+            blogs[keyword] = result.get('totalBlogs', 0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    return summarize(f'main (concurrency={concurrency})', samples, time.perf_counter() - started), blogs
+
+
+async def _disabled_playwright(*args, **kwargs) -> List[Dict]:
+    return []
+
+
+def run_benchmarks(args: argparse.Namespace) -> Dict:
+    store = FixtureStore(args.fixtures)
+    if not store.serps:
+        raise SystemExit(f'검색 HTML 픽스처가 없습니다: {args.fixtures}')
+
+    scraper.HTML_PARSER_BACKEND = args.parser
+    scraper.RESOLVE_MODE = 'fast'  # 리다이렉트를 클라이언트가 따라가면 스텁 서버를 벗어남
+    scraper.scrape_ugc_list_with_playwright_async = _disabled_playwright
+
+    if args.urls:
+        return {
+            'parser': args.parser,
+            'keywords': len(store.serps),
+            'repeat': args.repeat,
+            'stages': bench_urls(store, args.repeat),
+            'peakRssMb': peak_rss_mb(),
+            'missingFixtures': 0,
+        }
+
+    stages = [bench_detect(store, args.repeat)]
+
+    with StubServer(store) as server:
+        async def networked() -> Tuple[Dict, Dict, Dict[str, int]]:
+            controller = scraper.RateController(initial_window=args.per_host_limit, rate=args.rate or None)
+            # 결과 재사용(ttl)을 끄지 않으면 두 번째 반복부터 스텁 서버 대신 합치기 캐시를 재게 됨
+            # (동시 요청 합치기는 운영과 같게 유지)
+            async with scraper.NaverHttpClient(per_host_limit=args.per_host_limit, controller=controller,
+                                               url_rewriter=server.rewrite,
+                                               single_flight=scraper.SingleFlight(ttl=0)) as client:
+                extract = await bench_extract(client, store, args.repeat)
+                main, blogs = await bench_main(client, store, args.repeat, args.concurrency)
+                return extract, main, blogs
+
+        extract, main, blogs = asyncio.run(networked())
+    stages.extend([extract, main])
+
+    return {
+        'parser': args.parser,
+        'keywords': len(store.serps),
+        'repeat': args.repeat,
+        'stages': stages,
+        'blogsPerKeyword': blogs,
+        'missingFixtures': store.missing,
+        'peakRssMb': peak_rss_mb(),
+    }
+
+
+def record_fixtures(root: str, keywords: List[str]) -> None:
+    """실제 네이버에 요청하면서 검색 HTML과 모든 응답을 픽스처 저장소에 기록"""
+    store = FixtureStore(root)
+
+    class RecordingClient(scraper.NaverHttpClient):
+        async def request(self, method, url, *, params=None, **kwargs):
+            response = await super().request(method, url, params=params, **kwargs)
+            if params:
+                url = f'{url}?{urllib.parse.urlencode(params)}'
+            if urllib.parse.urlsplit(url).path == '/search.naver' and params and 'query' in params:
+                with open(os.path.join(root, f"{params['query']}.html"), 'w', encoding='utf-8') as f:
+                    f.write(response.text)
+            else:
+                store.record(url, response.status_code, response.headers, response.text)
+            return response
+
+    scraper.RESOLVE_MODE = 'full'  # in.naver.com 응답 본문까지 기록
+    os.makedirs(root, exist_ok=True)
+
+    async def run() -> None:
+        async with RecordingClient() as client:
+            for keyword in keywords:
+                result = await scraper.main_async(keyword, client)
+                print(f"{keyword}: {result.get('totalBlogs', 0)}개 블로그 기록", file=sys.stderr)
+
+    asyncio.run(run())
+
+
+def print_report(report: Dict) -> None:
+    print(f"parser={report['parser']} keywords={report['keywords']} repeat={report['repeat']}")
+    print(f"{'stage':<40} {'count':>6} {'ops/s':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    for stage in report['stages']:
+        print(f"{stage['stage']:<40} {stage['count']:>6} {stage['throughputPerSec'] or 0:>9.2f} "
+              f"{stage['p50Ms']:>9.2f} {stage['p95Ms']:>9.2f}")
+    print(f"peak RSS: {report['peakRssMb']} MB, missing fixtures: {report['missingFixtures']}")
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description='스마트블록 스크래퍼 오프라인 벤치마크',
+        epilog='기본 픽스처(tmp/naver_html_samples)에는 검색 HTML만 있고 responses/ 기록이 없어 main 스테이지의 '
+               'lb_api/더보기 요청은 404, in.naver.com은 합성 302로 응답합니다 (missingFixtures 참고). '
+               '실제 팬아웃은 --record로 기록한 저장소를 --fixtures로 지정해 측정하십시오.',
+    )
+    parser.add_argument('--fixtures', default=DEFAULT_FIXTURES,
+                        help='픽스처 저장소 디렉터리 (기본 tmp/naver_html_samples, 검색 HTML만 있음)')
+    parser.add_argument('--parser', choices=('bs4', 'lxml'), default=scraper.HTML_PARSER_BACKEND,
+                        help='HTML 파싱 백엔드')
+    parser.add_argument('--repeat', type=int, default=3, help='스테이지별 반복 횟수 (기본 3)')
+    parser.add_argument('--concurrency', type=int, default=4, help='main 스테이지 동시 키워드 수 (기본 4)')
+    parser.add_argument('--per-host-limit', type=int, default=6, help='호스트별 초기 동시 요청 수 (기본 6)')
+    parser.add_argument('--rate', type=float, default=0,
+                        help='호스트별 초당 요청 수 상한 (기본 0 = 제한 없음, 스텁 서버가 모든 호스트를 받음)')
+    parser.add_argument('--urls', action='store_true',
+                        help='URL 분류 마이크로벤치마크만 실행 (이전 방식 vs classify_url)')
+    parser.add_argument('--startup', action='store_true',
+                        help='모드별(CLI/배치/워커) 기동 시간만 측정 (-X importtime, 픽스처 불필요)')
+    parser.add_argument('--json', action='store_true', help='결과를 JSON으로 출력')
+    parser.add_argument('--record', metavar='DIR',
+                        help='벤치마크 대신 실제 네이버 응답을 DIR에 픽스처로 기록 (키워드는 위치 인자)')
+    parser.add_argument('keywords', nargs='*', help='--record에서 기록할 키워드')
+    return parser
+
+
+def cli(argv: List[str]) -> int:
+    args = build_arg_parser().parse_args(argv)
+    if args.record:
+        if not args.keywords:
+            print('기록할 키워드를 지정하세요', file=sys.stderr)
+            return 1
+        record_fixtures(args.record, args.keywords)
+        return 0
+
+    if args.startup:
+        report = {'python': sys.version.split()[0], 'repeat': args.repeat, 'stages': bench_startup(args.repeat)}
+        printer = print_startup_report
+    else:
+        report = run_benchmarks(args)
+        printer = print_report
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        printer(report)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(cli(sys.argv[1:]))
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-네이버 스마트블록 다중 카테고리 스크래퍼 (v12 - Timeout 수정 + 카테고리 필터링)
+네이버 스마트블록 다중 카테고리 스크래퍼 (v13 - asyncio 엔진 + 공유 커넥션 풀)
 키워드 하나로 모든 스마트블록 카테고리를 감지하고 블로그 목록을 추출합니다.
 
 v12 Changes:
@@ -9,581 +9,2814 @@ v12 Changes:
 - Fixed timeout in extract_blog_from_in_naver() (timeout: 5s→3s, added retry logic)
 - Added filtering logic to remove empty and duplicate categories
 - Now properly extracts 20-30+ blogs with stable performance
+
+v13 Changes:
+- All network stages run on asyncio and share one keep-alive NaverHttpClient
+  (httpx + HTTP/2 when available, requests.Session fallback)
+- Search page, more pages, lb_api pages and in.naver.com redirects of all
+  categories are fetched concurrently under one per-host controller
+- Container extraction split into plan (DOM only) / build (after redirect resolution)
+- Batch mode: many keywords per process on a bounded worker pool, NDJSON output
+- Optional lxml parser backend (--parser lxml) that skips BeautifulSoup trees
+- in.naver.com links resolved from redirects / streamed bytes without a DOM (--resolve-mode)
+- Per-host adaptive concurrency (AIMD) with token-bucket pacing and 429/5xx/timeout/connection-error
+  backoff; idempotent requests are retried on timeouts and connection errors too
+  (--per-host-limit, --max-per-host, --rate)
+- Playwright ugc_list fallback runs on a pooled headless browser: warm contexts reused
+  across categories/keywords, images/fonts/media blocked, selector waits instead of
+  fixed sleeps (--browser-pool-size, --browser-max-uses)
+- lb_api pagination: pages 2..N fetched concurrently, merged with (blogId, postId) dedup,
+  stops at the first page without new posts (--lb-api-pages)
+- SERP cache per keyword (compressed HTML + smart-block fingerprint, ETag/Last-Modified):
+  unchanged smart blocks reuse the previous result without any fan-out (opt-in: --serp-cache,
+  --serp-max-age defaults to one hour because more-page/lb_api ranks are reused unverified)
+- Per-stage timings and counters (bytes, requests, retries, cache hits) via a context
+  variable: optional "metrics" object in the output (--metrics) and Prometheus text
+  (--metrics-prom); bytesDownloaded counts decompressed body bytes, not wire bytes, and
+  stages timed inside --parse-processes workers are merged back into the keyword's metrics
+- Long-running worker (--worker, --socket): newline-delimited JSON-RPC 2.0 over stdio or
+  a Unix socket with scrape/health/stats/shutdown, many keywords in flight on warm pools
+- Optional process pool for HTML parsing (--parse-processes): SERP, more pages and lb_api
+  fragments are parsed from raw bytes in worker processes that return only plans
+- Blogs/categories kept as NamedTuple records (Blog, Category, CategoryResult) with
+  interned blogIds; the parse tree is released right after detection (same JSON output)
+- Diff mode (--diff-from, previous/previousHash in the worker): only categories added/removed
+  and blogs added/removed/moved with rank deltas; categories whose preview is unchanged reuse
+  the previous more-page blogs without fetching
+- Target mode (--target, "targets" in the worker): in.naver.com links resolved in order and
+  more/lb_api pages fetched only until every target is placed; "targets" holds their ranks
+- Many targets per keyword from one scrape via a per-category (blogId, postId) rank index;
+  batch lines may be {"keyword", "targets"} objects and identical keywords are scraped once
+- Single-flight layer under more pages, lb_api and in.naver.com resolution: concurrent
+  requests for the same normalized URL share one fetch, kept for a short TTL (--dedup-ttl)
+- One precompiled, memoized URL classifier (classify_url) for every extraction path:
+  m.blog.naver.com, PostView.naver with blogId/logNo in any order, in.naver.com content IDs
+- Pluggable result writer: compact NDJSON per keyword or per category (--format, --per-category;
+  category records are written when their keyword finishes, since empty/duplicate categories are
+  only filtered once all categories are in), orjson when installed, optional zstd frames per result (--compress zstd), --output FILE
+- Observation archive (--archive DIR): one row per blog appearance (keyword, scrapedAt, category,
+  position, blogId, postId, preview/more) in per-date SQLite files with dictionary-encoded columns,
+  written in batches; per-blog appearance counts via --archive-query
+- Blog index (--blog-index FILE): blogId -> current (keyword, category, rank, scrapedAt) entries, replaced
+  per keyword on every result; top-K latest appearances for many blogIds at once via --blog-lookup or
+  the worker's "appearances" method, without any Naver request
+- Lease-based keyword job queue in SQLite (--queue FILE): --enqueue adds jobs, any number of
+  --queue-worker processes claim them with renewable leases (expired leases are reclaimed), transient
+  failures (timeouts, 429/5xx) retry with exponential backoff up to --max-attempts while permanent ones
+  ("retryable": false) fail at once, results are written back to the queue and read with --queue-results
+- Lazy imports: requests, bs4, lxml, sqlite3, multiprocessing and http.cookiejar load only in the
+  paths that use them; cold start per mode measured by bench_smartblocks.py --startup
+
+Usage:
+    python scrape_smartblocks.py <keyword>
+    python scrape_smartblocks.py --batch keywords.txt --concurrency 8   # 또는 --batch - (stdin)
+    python scrape_smartblocks.py --batch keywords.txt --diff-from last.ndjson   # 변경분만 출력
+    python scrape_smartblocks.py --batch jobs.ndjson   # {"keyword": "가습기", "targets": ["https://blog.naver.com/id/123"]}
+    python scrape_smartblocks.py --batch keywords.txt --per-category --compress zstd -o results.ndjson.zst
+    python scrape_smartblocks.py --batch keywords.txt --archive ~/blrank-archive   # 노출 관측 기록
+    python scrape_smartblocks.py --archive ~/blrank-archive --archive-query myblog --archive-since 2026-01-01
+    python scrape_smartblocks.py --blog-index ~/blrank-index.sqlite3 --blog-lookup myblog --blog-lookup other
+    python scrape_smartblocks.py --queue jobs.sqlite3 --enqueue keywords.txt   # 작업 큐에 추가
+    python scrape_smartblocks.py --queue jobs.sqlite3 --queue-worker --drain   # 프로세스/노드마다 하나씩
+    python scrape_smartblocks.py --queue jobs.sqlite3 --queue-results > results.ndjson
+    python scrape_smartblocks.py --worker [--socket /tmp/scraper.sock]   # 상주 JSON-RPC 워커
+        → {"jsonrpc": "2.0", "id": 1, "method": "scrape", "params": {"keyword": "가습기"}}
 """
 
-import requests
-from bs4 import BeautifulSoup
+from __future__ import annotations
+
+import argparse
+import asyncio
+import bisect
+import contextlib
+import contextvars
+import functools
+import hashlib
+import html
+import importlib.util
+import io
 import json
+import os
 import re
 import sys
+import threading
+import time
+import urllib.parse
+import zlib
 from datetime import datetime, timezone
-from typing import List, Dict, Optional, Tuple, Set
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import (TYPE_CHECKING, Any, Awaitable, BinaryIO, Callable, Iterable, Iterator, List, Dict, NamedTuple,
+                    Optional, Tuple, Set, TextIO, Union)
 
+# requests / bs4 / lxml / sqlite3 / multiprocessing / http.cookiejar는 쓰는 경로에서만 import합니다.
+# 사용법 오류처럼 짧게 끝나는 호출이 쓰지 않는 의존성의 로딩 비용을 치르지 않도록
+# (기동 시간 측정: bench_smartblocks.py --startup).
+if TYPE_CHECKING:  # 타입 힌트 전용 (실행 시에는 import하지 않음)
+    from concurrent.futures import ProcessPoolExecutor
 
-def get_naver_search_html(keyword: str) -> str:
-    """네이버 검색 HTML 가져오기 (쿠키/헤더 포함)"""
+    from bs4 import Tag
+    from lxml import etree
 
-    cookies = {
-        'NNB': 'ECHGGL2ZR7AGO',
-        'ASID': '7425f1d60000019564d162b600000055',
-        'PM_CK_loc': '1dd76e4b80bc46c7d0d1adf34d89f5e27fc787c39dbf2aab1c87ad65a4e7d39a',
-        'SHP_BUCKET_ID': '4',
-        'nx_ssl': '2',
-        'page_uid': 'j9SIYdp0JXVssLpE5EZssssstJV-155875',
-    }
 
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
-        'Accept-Language': 'ko,en-US;q=0.9,en;q=0.8',
-        'Accept-Encoding': 'gzip, deflate, br, zstd',
-        'Referer': 'https://search.naver.com/',
-        'DNT': '1',
-        'Connection': 'keep-alive',
-        'Upgrade-Insecure-Requests': '1',
-        'Sec-Fetch-Dest': 'document',
-        'Sec-Fetch-Mode': 'navigate',
-        'Sec-Fetch-Site': 'same-origin',
-        'Sec-Fetch-User': '?1',
-        'sec-ch-ua': '"Google Chrome";v="131", "Chromium";v="131", "Not_A Brand";v="24"',
-        'sec-ch-ua-mobile': '?0',
-        'sec-ch-ua-platform': '"Windows"',
-    }
+# HTML 파싱 백엔드: 'bs4' (BeautifulSoup + lxml 빌더) 또는 'lxml' (lxml 직접, 트리 변환 없음)
+HTML_PARSER_BACKEND = os.environ.get('SCRAPER_PARSER', 'bs4')
 
-    params = {
-        'where': 'nexearch',
-        'query': keyword,
-    }
+# in.naver.com 해석 방식: 'fast' (리다이렉트/스트리밍 스캔) 또는 'full' (본문 전체 + DOM 파싱)
+RESOLVE_MODE = os.environ.get('SCRAPER_RESOLVE_MODE', 'fast')
 
-    try:
-        response = requests.get(
-            'https://search.naver.com/search.naver',
-            params=params,
-            cookies=cookies,
-            headers=headers,
-            timeout=10
-        )
-        response.raise_for_status()
-        return response.text
-    except requests.RequestException as e:
-        print(f"Error fetching Naver search page: {e}", file=sys.stderr)
-        return ""
+# True면 결과 JSON에 스테이지별 시간/카운터(metrics)를 포함
+COLLECT_METRICS = os.environ.get('SCRAPER_METRICS') == '1'
 
+# lb_api(ugc_list 더보기)에서 가져올 최대 페이지 수
+LB_API_MAX_PAGES = int(os.environ.get('SCRAPER_LB_API_PAGES', '5'))
 
-def parse_blog_url(url: str) -> Tuple[Optional[str], Optional[str]]:
-    """블로그 URL에서 blogId, postId 추출"""
+NAVER_COOKIES = {
+    'NNB': 'ECHGGL2ZR7AGO',
+    'ASID': '7425f1d60000019564d162b600000055',
+    'PM_CK_loc': '1dd76e4b80bc46c7d0d1adf34d89f5e27fc787c39dbf2aab1c87ad65a4e7d39a',
+    'SHP_BUCKET_ID': '4',
+    'nx_ssl': '2',
+    'page_uid': 'j9SIYdp0JXVssLpE5EZssssstJV-155875',
+}
 
-    # https://blog.naver.com/userid/postid 형식
-    match = re.search(r'blog\.naver\.com/([^/]+)/(\d+)', url)
-    if match:
-        return match.group(1), match.group(2)
 
-    # URL 파라미터 형식: logNo=123&blogId=abc
-    match = re.search(r'blogId=([^&]+).*?logNo=(\d+)', url)
-    if match:
-        return match.group(1), match.group(2)
+def _accept_encoding() -> str:
+    """설치된 디코더 기준 Accept-Encoding (br/zstd는 디코더가 있을 때만 요청)"""
+    encodings = ['gzip', 'deflate']
+    if importlib.util.find_spec('brotli') or importlib.util.find_spec('brotlicffi'):
+        encodings.append('br')
+    if importlib.util.find_spec('zstandard'):
+        encodings.append('zstd')
+    return ', '.join(encodings)
 
-    return None, None
 
+# 검색 페이지용 브라우저 헤더 (Connection 헤더는 HTTP/2에서 금지되므로 클라이언트가 관리)
+SEARCH_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
+    'Accept-Language': 'ko,en-US;q=0.9,en;q=0.8',
+    'Accept-Encoding': _accept_encoding(),
+    'Referer': 'https://search.naver.com/',
+    'DNT': '1',
+    'Upgrade-Insecure-Requests': '1',
+    'Sec-Fetch-Dest': 'document',
+    'Sec-Fetch-Mode': 'navigate',
+    'Sec-Fetch-Site': 'same-origin',
+    'Sec-Fetch-User': '?1',
+    'sec-ch-ua': '"Google Chrome";v="131", "Chromium";v="131", "Not_A Brand";v="24"',
+    'sec-ch-ua-mobile': '?0',
+    'sec-ch-ua-platform': '"Windows"',
+}
 
-def extract_blog_from_in_naver(in_url: str, headers: dict, max_retries: int = 2) -> Optional[str]:
-    """in.naver.com 링크에서 실제 blog.naver.com URL 추출 (v12: timeout 5s→3s, retry logic added)"""
-    for attempt in range(max_retries + 1):
-        try:
-            response = requests.get(in_url, headers=headers, timeout=3, allow_redirects=True)
-            
-            # 최종 리다이렉션된 URL이 blog.naver.com인지 확인
-            final_url = response.url
-            if 'blog.naver.com' in final_url:
-                return final_url
-            
-            # HTML에서 blog.naver.com 링크 찾기
-            soup = BeautifulSoup(response.text, 'lxml')
-            for a_tag in soup.find_all('a', href=True):
-                href = a_tag['href']
-                if 'blog.naver.com' in href:
-                    return href
-            
-            return None
-        except requests.Timeout:
-            if attempt < max_retries:
-                continue  # Retry on timeout
-            print(f"Timeout extracting from {in_url} after {max_retries + 1} attempts", file=sys.stderr)
-            return None
-        except Exception as e:
-            print(f"Error extracting from {in_url}: {e}", file=sys.stderr)
-            return None
-    return None
+# 더보기/lb_api/in.naver.com 요청용 기본 헤더
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9',
+    'Accept-Language': 'ko,en-US;q=0.9',
+    'Referer': 'https://search.naver.com/',
+}
 
 
+class FetchError(Exception):
+    """HTTP 요청 실패 (HTTP 에러 응답이면 status_code에 상태 코드 기록)"""
 
-def batch_extract_in_naver_urls(in_urls: Set[str], headers: dict, max_workers: int = 3) -> Dict[str, str]:
-    """배치로 in.naver.com URL들을 blog.naver.com URL로 변환
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
 
-    Returns:
-        Dict mapping in_url -> blog_url
-    """
-    url_map = {}
 
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_url = {
-            executor.submit(extract_blog_from_in_naver, url, headers): url
-            for url in in_urls
-        }
+class FetchTimeout(FetchError):
+    """HTTP 요청 타임아웃"""
 
-        for future in as_completed(future_to_url, timeout=30):
-            in_url = future_to_url[future]
-            try:
-                blog_url = future.result(timeout=3)
-                if blog_url:
-                    url_map[in_url] = blog_url
-            except Exception as e:
-                print(f"Error processing {in_url}: {e}", file=sys.stderr)
 
-    return url_map
+class FetchResponse:
+    """HTTP 백엔드(httpx/requests)와 무관한 응답 객체"""
 
+    __slots__ = ('status_code', 'url', 'headers', 'content')
 
-def extract_blogs_from_container(container, headers: dict) -> List[Dict]:
-    """컨테이너에서 블로그 목록 추출 (v6 - 배치 최적화)
+    def __init__(self, status_code: int, url: str, headers, content: bytes):
+        self.status_code = status_code
+        self.url = url
+        self.headers = headers
+        self.content = content
 
-    3단계 프로세스:
-    1. 모든 고유 in.naver.com/contents URL 수집
-    2. 배치로 blog.naver.com URL 추출
-    3. blog_items와 매칭하여 제목/썸네일 추출
-    """
+    @property
+    def encoding(self) -> str:
+        match = re.search(r'charset=([\w-]+)', self.headers.get('content-type', ''), re.I)
+        return match.group(1) if match else 'utf-8'
 
-    blogs = []
-    seen_posts = set()  # (blogId, postId) 튜플로 중복 체크
+    @property
+    def text(self) -> str:
+        try:
+            return self.content.decode(self.encoding, errors='replace')
+        except LookupError:
+            return self.content.decode('utf-8', errors='replace')
 
-    # 1단계: 블로그 아이템 컨테이너 찾기
-    blog_items = container.find_all('div', class_=lambda x: x and any(
-        keyword in str(x).lower() for keyword in [
-            'fds-article-simple-box',
-            'fds-comps-right-image-desktop',
-            'fds-ugc-body',
-            'api-blogr-body',
-            'blog-item',
-            'post-item'
-        ]
-    ))
+    def json(self) -> Any:
+        return json.loads(self.content)
 
-    # 컨테이너를 못 찾으면 전체를 하나의 컨테이너로 처리
-    if not blog_items:
-        blog_items = [container]
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise FetchError(f'HTTP {self.status_code} for {self.url}', self.status_code)
 
-    # 2단계: in.naver.com URL 수집 (중복 제거)
-    in_naver_urls = set()
-    for item in blog_items:
-        for link in item.find_all('a', href=True):
-            href = link.get('href', '')
-            if 'in.naver.com' in href and '/contents/' in href:
-                in_naver_urls.add(href)
 
-    # 3단계: 배치로 in.naver.com URL 변환
-    in_to_blog_map = {}
-    if in_naver_urls:
-        in_to_blog_map = batch_extract_in_naver_urls(in_naver_urls, headers)
+def default_cache_dir() -> str:
+    """캐시 파일 기본 위치 (SCRAPER_CACHE_DIR 환경변수로 변경 가능)"""
+    return os.environ.get('SCRAPER_CACHE_DIR') or os.path.join(os.path.expanduser('~'), '.cache', 'naver_blrank')
 
-    # v10 FIX: influencer/location type (blog_items == 1) 처리
-    if len(blog_items) == 1 and blog_items[0] == container:
-        # 단일 컨테이너 내부의 모든 blog 링크 추출
-        all_links = container.find_all('a', href=True)
 
-        for link in all_links:
-            href = link.get('href', '')
-            blog_url = None
-            blog_id = None
-            post_id = None
+class InNaverResolutionCache:
+    """in.naver.com → blog.naver.com 해석 결과 영구 캐시 (SQLite)
 
-            # 우선순위 1: blog.naver.com 직접 링크
-            if 'blog.naver.com' in href:
-                blog_id, post_id = parse_blog_url(href)
-                if blog_id and post_id:
-                    blog_url = href
-
-            # 우선순위 2: in.naver.com 링크 (배치 추출된 결과 사용)
-            elif href in in_to_blog_map:
-                blog_url = in_to_blog_map[href]
-                blog_id, post_id = parse_blog_url(blog_url)
+    - 성공 결과: 게시 후 바뀌지 않으므로 만료 없이 보관
+    - 실패 결과(None/타임아웃): negative_ttl초 동안만 보관 후 다시 해석
+    - max_entries를 넘으면 가장 오래 사용하지 않은 항목부터 삭제 (LRU)
+    - 키는 normalize_fetch_key로 정규화한 URL (키워드별 쿼리 파라미터 없음)
+    여러 배치 프로세스가 같은 파일을 공유할 수 있도록 WAL 모드로 엽니다.
+    """
 
-            if not blog_url or not blog_id or not post_id:
-                continue
+    def __init__(self, path: str, negative_ttl: float = 600, max_entries: int = 200_000):
+        self.path = path
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
 
-            # 중복 체크
-            post_key = (blog_id, post_id)
-            if post_key in seen_posts:
-                continue
-            seen_posts.add(post_key)
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        import sqlite3
 
-            # 제목 추출
-            title = link.get_text(strip=True) or link.get('aria-label', '') or link.get('title', '')
-            if not title or len(title) < 3:
-                title = f"블로그 포스트 ({blog_id})"
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS in_naver_resolution ('
+            ' in_url TEXT PRIMARY KEY,'
+            ' blog_url TEXT,'  # NULL = 해석 실패 (negative)
+            ' resolved_at REAL NOT NULL,'
+            ' last_used REAL NOT NULL)'
+        )
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_in_naver_resolution_last_used '
+            'ON in_naver_resolution(last_used)'
+        )
 
-            blogs.append({
-                'url': blog_url,
-                'title': title,
-                'blogId': blog_id,
-                'postId': post_id,
-                'thumbnail': None,
-                'preview': title
-            })
+    def get_many(self, in_urls: Iterable[str]) -> Tuple[Dict[str, str], Set[str]]:
+        """캐시 조회
 
-        return blogs
+        Returns:
+            (in_url -> blog_url 성공 결과, 다시 해석해야 하는 in_url 집합)
+            유효한 negative 항목은 어느 쪽에도 포함되지 않습니다.
+        """
+        urls = list(in_urls)
+        now = time.time()
+        found: Dict[str, str] = {}
+        fresh: List[str] = []
+        negatives = 0
 
-    # 4단계: 각 블로그 아이템에서 추출
-    for item in blog_items:
-        blog_url = None
-        blog_id = None
-        post_id = None
-        title_link = None
+        with self._lock:
+            for chunk in _chunks(urls, 500):
+                rows = self._conn.execute(
+                    'SELECT in_url, blog_url, resolved_at FROM in_naver_resolution '
+                    f'WHERE in_url IN ({",".join("?" * len(chunk))})',
+                    chunk,
+                ).fetchall()
+                for in_url, blog_url, resolved_at in rows:
+                    if blog_url:
+                        found[in_url] = blog_url
+                        fresh.append(in_url)
+                    elif now - resolved_at < self.negative_ttl:
+                        negatives += 1
+                        fresh.append(in_url)
 
-        # 우선순위 1: blog.naver.com 직접 링크
-        all_links = item.find_all('a', href=True)
-        for link in all_links:
-            href = link.get('href', '')
-            if 'blog.naver.com' in href:
-                blog_id, post_id = parse_blog_url(href)
-                if blog_id and post_id:
-                    blog_url = href
-                    title_link = link
-                    break
+            for chunk in _chunks(fresh, 500):
+                self._conn.execute(
+                    'UPDATE in_naver_resolution SET last_used = ? '
+                    f'WHERE in_url IN ({",".join("?" * len(chunk))})',
+                    [now, *chunk],
+                )
 
-        # 우선순위 2: in.naver.com 링크 (배치 추출된 결과 사용)
-        if not blog_url:
-            for link in all_links:
-                href = link.get('href', '')
-                if href in in_to_blog_map:
-                    blog_url = in_to_blog_map[href]
-                    blog_id, post_id = parse_blog_url(blog_url)
-                    if blog_id and post_id:
-                        title_link = link
-                        break
+            self.hits += len(found)
+            self.negative_hits += negatives
+            missing = set(urls) - set(fresh)
+            self.misses += len(missing)
 
-        # 우선순위 3: title 클래스가 있는 링크
-        if not title_link:
-            title_link = item.find('a', class_=lambda x: x and 'title' in str(x).lower())
-            if title_link:
-                href = title_link.get('href', '')
-                if 'blog.naver.com' in href:
-                    blog_id, post_id = parse_blog_url(href)
-                    blog_url = href
+        return found, missing
 
-        if not blog_url or not blog_id or not post_id:
-            continue
+    def put_many(self, results: Dict[str, Optional[str]]) -> None:
+        """해석 결과 저장 (값이 None이면 negative 항목)"""
+        if not results:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO in_naver_resolution (in_url, blog_url, resolved_at, last_used) '
+                'VALUES (?, ?, ?, ?)',
+                [(in_url, blog_url, now, now) for in_url, blog_url in results.items()],
+            )
+            self.stores += len(results)
+            self._evict()
 
-        # 중복 체크
-        post_key = (blog_id, post_id)
-        if post_key in seen_posts:
-            continue
-        seen_posts.add(post_key)
+    def _evict(self) -> None:
+        (count,) = self._conn.execute('SELECT COUNT(*) FROM in_naver_resolution').fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                'DELETE FROM in_naver_resolution WHERE in_url IN ('
+                ' SELECT in_url FROM in_naver_resolution ORDER BY last_used LIMIT ?)',
+                (overflow,),
+            )
+            self.evictions += overflow
 
-        # 제목 추출 - 다양한 방법 시도
-        title = ''
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            (entries,) = self._conn.execute('SELECT COUNT(*) FROM in_naver_resolution').fetchone()
+        return {
+            'hits': self.hits,
+            'negativeHits': self.negative_hits,
+            'misses': self.misses,
+            'stores': self.stores,
+            'evictions': self.evictions,
+            'entries': entries,
+        }
 
-        # 방법 1: title 관련 클래스명 찾기
-        title_elem = item.find(['span', 'div', 'strong', 'h3', 'h4'], class_=lambda x: x and any(
-            keyword in str(x).lower() for keyword in ['title', 'headline', 'subject', 'name']
-        ))
-        if title_elem:
-            title = title_elem.get_text(strip=True)
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
 
-        # 방법 2: 링크의 텍스트
-        if not title and title_link:
-            title = title_link.get_text(strip=True)
 
-        # 방법 3: aria-label 또는 title 속성
-        if not title and title_link:
-            title = title_link.get('aria-label', '') or title_link.get('title', '')
+class SerpEntry(NamedTuple):
+    """SerpCache에 저장된 키워드 하나의 직전 검색 결과"""
+    html_blob: bytes  # zlib 압축된 검색 HTML
+    fingerprint: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    result: Optional[dict]
+    stored_at: float
 
-        # 방법 4: 아이템 내부의 첫 번째 텍스트 요소
-        if not title:
-            for elem in item.find_all(['span', 'div', 'strong']):
-                text = elem.get_text(strip=True)
-                if text and len(text) > 5:
-                    title = text
-                    break
+    @property
+    def html(self) -> str:
+        return zlib.decompress(self.html_blob).decode('utf-8')
 
-        # 썸네일 추출
-        img = item.find('img')
-        thumbnail = None
-        if img:
-            thumbnail = img.get('src') or img.get('data-src') or img.get('data-lazy-src')
 
-        # 미리보기 텍스트 추출
-        preview = None
-        preview_elem = item.find(['span', 'div', 'p'], class_=lambda x: x and any(
-            keyword in str(x).lower() for keyword in ['desc', 'preview', 'text', 'content', 'dsc']
-        ))
-        if preview_elem:
-            preview = preview_elem.get_text(strip=True)[:200]
+class SerpCache:
+    """키워드별 검색 결과 페이지(SERP) 캐시 (SQLite)
 
-        # 빈 제목 방지
-        if not title or len(title) < 3:
-            title = f"블로그 포스트 ({blog_id})"
+    검색 HTML을 zlib으로 압축해 저장하고, 스마트블록 영역의 지문(fingerprint)과
+    그때 만든 전체 결과를 함께 보관합니다. 다시 가져온 페이지의 지문이 같으면
+    (또는 ETag/Last-Modified 조건부 요청이 304이면) 더보기/lb_api/in.naver.com 요청 없이
+    직전 결과를 재사용합니다. 결과는 max_result_age초가 지나면 재사용하지 않습니다.
+    지문은 미리보기 영역만 보므로 재사용한 결과의 더보기/lb_api/in.naver.com 순위는 다시 확인하지 않은
+    값입니다. 그래서 기본으로 끄고(--serp-cache로 켬) max_result_age는 측정 주기 정도로 짧게 둡니다.
+    """
 
-        # 제목이 너무 긴 경우 자르기
-        if len(title) > 100:
-            title = title[:97] + "..."
+    def __init__(self, path: str, max_result_age: float = 3600):
+        self.path = path
+        self.max_result_age = max_result_age
+        self.lookups = 0
+        self.reused = 0
+        self.not_modified = 0
+        self.stores = 0
+        self._lock = threading.Lock()
 
-        blogs.append({
-            'url': blog_url,
-            'title': title,
-            'blogId': blog_id,
-            'postId': post_id,
-            'thumbnail': thumbnail,
-            'preview': preview
-        })
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        import sqlite3
 
-    return blogs
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS serp_cache ('
+            ' keyword TEXT PRIMARY KEY,'
+            ' html BLOB NOT NULL,'
+            ' fingerprint TEXT NOT NULL,'
+            ' etag TEXT,'
+            ' last_modified TEXT,'
+            ' result TEXT,'  # 직전 전체 스크래핑 결과 JSON
+            ' stored_at REAL NOT NULL)'
+        )
 
+    def get(self, keyword: str) -> Optional[SerpEntry]:
+        with self._lock:
+            self.lookups += 1
+            row = self._conn.execute(
+                'SELECT html, fingerprint, etag, last_modified, result, stored_at FROM serp_cache WHERE keyword = ?',
+                (keyword,),
+            ).fetchone()
+        if row is None:
+            return None
+        html_blob, fingerprint, etag, last_modified, result, stored_at = row
+        return SerpEntry(html_blob, fingerprint, etag, last_modified,
+                         json.loads(result) if result else None, stored_at)
 
+    def reusable_result(self, entry: Optional[SerpEntry], fingerprint: str) -> Optional[dict]:
+        """지문이 같고 너무 오래되지 않았으면 직전 결과 반환"""
+        if entry is None or entry.result is None or entry.fingerprint != fingerprint:
+            return None
+        if time.time() - entry.stored_at > self.max_result_age:
+            return None
+        with self._lock:
+            self.reused += 1
+        return entry.result
 
-def scrape_lb_api_more_page(lb_api_url: str, cookies: dict, headers: dict, max_pages: int = 2) -> List[Dict]:
-    """lb_api URL에서 블로그 목록 크롤링 (ugc_list 카테고리용)"""
-    import urllib.parse
-    import json
-    
-    all_blogs = []
-    seen_posts = set()
-    
-    try:
-        # lb_api URL 디코딩
-        if lb_api_url.startswith('#lb_api='):
-            api_url = urllib.parse.unquote(lb_api_url.split('#lb_api=', 1)[1])
-        else:
-            api_url = lb_api_url
-        
-        # API 호출
-        response = requests.get(api_url, cookies=cookies, headers=headers, timeout=15)
-        response.raise_for_status()
-        
-        # JSON 파싱
-        data = response.json()
-        
-        # dom.collection[0].html에서 HTML 추출
-        if 'dom' in data and 'collection' in data['dom']:
-            collection = data['dom']['collection']
-            if isinstance(collection, list) and len(collection) > 0:
-                html_content = collection[0].get('html', '')
-                
-                if html_content:
-                    # HTML 파싱
-                    soup = BeautifulSoup(html_content, 'lxml')
-                    
-                    # 블로그 추출
-                    page_blogs = extract_blogs_from_container(soup, headers)
-                    
-                    # 중복 제거하면서 추가
-                    for blog in page_blogs:
-                        post_key = (blog['blogId'], blog['postId'])
-                        if post_key not in seen_posts:
-                            seen_posts.add(post_key)
-                            all_blogs.append(blog)
-                    
-                    print(f'lb_api에서 {len(page_blogs)}개 블로그 추출 (중복 제거 후: {len(all_blogs)}개)', file=sys.stderr)
-        
-    except Exception as e:
-        print(f'Error scraping lb_api {lb_api_url[:50]}...: {e}', file=sys.stderr)
-    
-    return all_blogs
+    def record_not_modified(self) -> None:
+        with self._lock:
+            self.not_modified += 1
 
+    def put(self, keyword: str, html: str, fingerprint: str, result: dict,
+            etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO serp_cache '
+                '(keyword, html, fingerprint, etag, last_modified, result, stored_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (keyword, zlib.compress(html.encode('utf-8'), 6), fingerprint, etag, last_modified,
+                 json.dumps(result, ensure_ascii=False), time.time()),
+            )
+            self.stores += 1
 
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            (entries,) = self._conn.execute('SELECT COUNT(*) FROM serp_cache').fetchone()
+        return {
+            'lookups': self.lookups,
+            'reused': self.reused,
+            'notModified': self.not_modified,
+            'stores': self.stores,
+            'entries': entries,
+        }
 
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
 
-def scrape_ugc_list_with_playwright(more_link: str, keyword: str, headers: dict, headless: bool = False, max_pages: int = 2) -> List[Dict]:
-    """Phase 2: Playwright MCP를 사용한 ugc_list 카테고리 크롤링 (lb_api fallback)"""
-    
-    all_blogs = []
-    seen_posts = set()
-    
-    try:
-        # lb_api URL 디코딩하여 실제 검색 URL 구성
-        if more_link.startswith("#lb_api="):
-            import urllib.parse
-            # lb_api URL을 검색 URL로 변환
-            # keyword로 새로 검색하는 것이 안전함
-            search_url = f"https://search.naver.com/search.naver?where=blog&query={urllib.parse.quote(keyword)}"
-        else:
-            search_url = more_link if more_link.startswith("http") else f"https://search.naver.com{more_link}"
-        
-        print(f"Playwright 크롤링 시작 (headless={headless}): {search_url[:80]}...", file=sys.stderr)
-        
-        # Playwright MCP 도구 사용
-        from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
-        
-        with sync_playwright() as p:
-            # 브라우저 실행
-            browser = p.chromium.launch(headless=headless)
-            context = browser.new_context(
-                user_agent=headers.get("User-Agent"),
-                viewport={"width": 1920, "height": 1080}
-            )
-            page = context.new_page()
-            
-            # 네이버 검색 결과 페이지 이동
-            page.goto(search_url, wait_until="networkidle", timeout=30000)
-            
-            # 페이지별 크롤링
-            for page_num in range(1, max_pages + 1):
-                print(f"Playwright 페이지 {page_num} 크롤링 중...", file=sys.stderr)
-                
-                # 페이지 로드 대기
-                page.wait_for_timeout(2000)
-                
-                # 현재 페이지 HTML 추출
-                html_content = page.content()
-                soup = BeautifulSoup(html_content, "lxml")
-                
-                # 블로그 컨테이너 찾기
-                containers = soup.find_all(["div", "section"], class_=lambda x: x and any(
-                    keyword in str(x) for keyword in ["blog", "total", "lst", "api_subject"]
-                ))
-                
-                page_blogs = []
-                for container in containers:
-                    container_blogs = extract_blogs_from_container(container, headers)
-                    for blog in container_blogs:
-                        post_key = (blog["blogId"], blog["postId"])
-                        if post_key not in seen_posts:
-                            seen_posts.add(post_key)
-                            page_blogs.append(blog)
-                            all_blogs.append(blog)
-                
-                print(f"페이지 {page_num}에서 {len(page_blogs)}개 신규 블로그 추출", file=sys.stderr)
-                
-                # 다음 페이지로 이동
-                if page_num < max_pages:
-                    try:
-                        # "더보기" 버튼 찾기
-                        more_button_selectors = [
-                            "a:has-text('더보기')",
-                            ".fds-comps-more-button-no-border a",
-                            "button:has-text('더보기')",
-                            "[aria-label*='더보기']"
-                        ]
-                        
-                        button_found = False
-                        for selector in more_button_selectors:
-                            try:
-                                if page.is_visible(selector, timeout=3000):
-                                    page.click(selector)
-                                    button_found = True
-                                    print(f"더보기 버튼 클릭 성공: {selector}", file=sys.stderr)
-                                    page.wait_for_timeout(3000)
-                                    break
-                            except:
-                                continue
-                        
-                        if not button_found:
-                            print(f"더보기 버튼을 찾을 수 없어 페이지 {page_num}에서 중단", file=sys.stderr)
-                            break
-                    
-                    except PlaywrightTimeout:
-                        print(f"더보기 버튼 타임아웃, 페이지 {page_num}에서 중단", file=sys.stderr)
-                        break
-                    except Exception as e:
-                        print(f"더보기 버튼 클릭 실패: {e}", file=sys.stderr)
-                        break
-            
-            # 브라우저 닫기
-            browser.close()
-        
-        print(f"Playwright 크롤링 완료: 총 {len(all_blogs)}개 블로그 추출", file=sys.stderr)
-    
-    except Exception as e:
-        print(f"Playwright 크롤링 실패: {e}", file=sys.stderr)
-        import traceback
-        traceback.print_exc()
-    
-    return all_blogs
 
-def find_more_link(container) -> Optional[str]:
-    """더보기 링크 찾기 (influencer + ugc_list 카테고리 지원)"""
+def _chunks(items: List[Any], size: int) -> Iterator[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
 
-    # 방법 1: container 내부에서 직접 찾기 (influencer 카테고리)
-    # "더보기" 텍스트가 있는 링크 찾기
-    more_link = container.find('a', string=lambda x: x and '더보기' in x)
-    if more_link:
-        return more_link.get('href')
 
-    # 클래스명으로 찾기
-    more_link = container.find('a', class_=lambda x: x and 'more' in str(x).lower())
-    if more_link:
-        return more_link.get('href')
+def _parse_scraped_at(scraped_at: str) -> datetime:
+    return datetime.fromisoformat(scraped_at.replace('Z', '+00:00'))
 
-    # title 속성으로 찾기
-    more_link = container.find('a', title=lambda x: x and '더보기' in x)
-    if more_link:
-        return more_link.get('href')
 
-    # aria-label로 찾기
-    more_link = container.find('a', attrs={'aria-label': lambda x: x and '더보기' in x})
-    if more_link:
-        return more_link.get('href')
+def _ranked_observations(category: Dict) -> Iterator[Tuple[int, Dict, bool]]:
+    """category_ranking 순서의 (순위, 블로그, 미리보기 여부)"""
+    seen = set()
+    position = 0
+    for in_preview, blogs in ((True, category['blogsInPreview']), (False, category['morePageBlogs'])):
+        for blog in blogs:
+            key = (blog['blogId'], blog['postId'])
+            if key in seen:
+                continue
+            seen.add(key)
+            position += 1
+            yield position, blog, in_preview
 
-    # 방법 2: parent section에서 ugc_list footer 찾기
-    parent_section = container.find_parent(['div', 'section'])
-    if parent_section:
-        # fds-comps-footer-full-container 찾기
-        footer = parent_section.find('div', class_=lambda x: x and 'fds-comps-footer-full-container' in str(x))
-        if footer:
-            # fds-comps-more-button-no-border 찾기
-            more_button = footer.find('div', class_=lambda x: x and 'fds-comps-more-button-no-border' in str(x))
-            if more_button:
-                link = more_button.find('a', href=True)
-                if link:
-                    href = link.get('href')
-                    if href:  # lb_api URL도 포함
-                        print(f'Found ugc_list more link in footer: {href[:80]}...', file=sys.stderr)
-                        return href
 
-    return None
+class ObservationArchive:
+    """스마트블록 노출 기록 아카이브 (날짜별 SQLite 파일, 압축 스키마)
 
+    성공한 결과마다 블로그 하나의 노출을 관측 한 행(keyword, scrapedAt, categoryTitle, categoryType,
+    position, blogId, postId, 미리보기/더보기)으로 남깁니다. 키워드/카테고리/blogId는 파티션별
+    사전 테이블의 정수 id로, scrapedAt은 epoch 초로 저장하고 행은 scrapedAt의 UTC 날짜별 파일
+    (<root>/YYYY-MM-DD.sqlite3)에 나눠 씁니다. position은 category_ranking 순서의 순위입니다.
+    record()는 메모리에 모아 두었다가 batch_size행이 쌓이거나 flush_interval초가 지나면
+    파티션마다 트랜잭션 하나로 씁니다 (close()/flush()에서 남은 행 기록).
+    대상 모드에서 일찍 멈춘(partial) 카테고리는 수집한 순위까지만 기록됩니다.
+    """
 
-def scrape_more_page(more_url: str, cookies: dict, headers: dict) -> List[Dict]:
-    """더보기 페이지의 전체 블로그 목록 스크래핑"""
+    MAX_OPEN_PARTITIONS = 4
 
-    try:
-        response = requests.get(more_url, cookies=cookies, headers=headers, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'lxml')
+    def __init__(self, root: str, batch_size: int = 5000, flush_interval: float = 30):
+        self.root = root
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.results = 0
+        self.observations = 0
+        self.flushes = 0
+        self._pending: List[Tuple] = []
+        self._pending_since = 0.0
+        self._partitions: Dict[str, Any] = {}  # 날짜 -> sqlite3 연결
+        self._ids: Dict[Tuple[str, str, Tuple], int] = {}  # (날짜, 사전 테이블, 값) -> id
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
 
-        # extract_blogs_from_container 재사용
-        return extract_blogs_from_container(soup, headers)
+    def record(self, result: Dict) -> int:
+        """결과 하나의 관측 행을 버퍼에 추가 (반환값: 추가한 행 수)"""
+        if not result.get('success') or not result.get('categories'):
+            return 0
+        scraped_at = _parse_scraped_at(result['scrapedAt'])
+        day = scraped_at.date().isoformat()
+        epoch = int(scraped_at.timestamp())
+        keyword = result['keyword']
+        rows = [
+            (day, keyword, epoch, category['categoryTitle'], category['categoryType'], position,
+             blog['blogId'], _compact_post_id(blog['postId']), int(in_preview))
+            for category in result['categories']
+            for position, blog, in_preview in _ranked_observations(category)
+        ]
+        with self._lock:
+            if not self._pending:
+                self._pending_since = time.monotonic()
+            self._pending.extend(rows)
+            self.results += 1
+            due = (len(self._pending) >= self.batch_size
+                   or time.monotonic() - self._pending_since >= self.flush_interval)
+        if due:
+            self.flush()
+        return len(rows)
 
-    except Exception as e:
-        print(f"Error scraping more page {more_url}: {e}", file=sys.stderr)
-        return []
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, []
+            by_day: Dict[str, List[Tuple]] = {}
+            for row in pending:
+                by_day.setdefault(row[0], []).append(row)
+            for day, rows in by_day.items():
+                conn = self._partition(day)
+                conn.execute('BEGIN')
+                try:
+                    conn.executemany(
+                        'INSERT INTO observations '
+                        '(keyword, scraped_at, category, position, blog, post_id, preview) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                        [(self._id(conn, day, 'keywords', (keyword,)), epoch,
+                          self._id(conn, day, 'categories', (title, category_type)), position,
+                          self._id(conn, day, 'blogs', (blog_id,)) if blog_id else None, post_id, preview)
+                         for _, keyword, epoch, title, category_type, position, blog_id, post_id, preview in rows],
+                    )
+                    conn.execute('COMMIT')
+                except BaseException:
+                    conn.execute('ROLLBACK')
+                    raise
+                self.observations += len(rows)
+            if pending:
+                self.flushes += 1
 
+    _DICTIONARIES = {
+        'keywords': ('keyword',),
+        'categories': ('title', 'type'),
+        'blogs': ('blog_id',),
+    }
 
-def detect_smartblock_categories(html: str) -> List[Dict]:
-    """스마트블록 카테고리 감지 및 정보 추출"""
+    def _id(self, conn, day: str, table: str, values: Tuple) -> int:
+        """사전 테이블의 id (없으면 추가). 파티션마다 따로 번호를 매김"""
+        cache_key = (day, table, values)
+        found = self._ids.get(cache_key)
+        if found is None:
+            columns = self._DICTIONARIES[table]
+            where = ' AND '.join(f'{column} = ?' for column in columns)
+            conn.execute(f'INSERT OR IGNORE INTO {table} ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))})',
+                         values)
+            (found,) = conn.execute(f'SELECT id FROM {table} WHERE {where}', values).fetchone()
+            self._ids[cache_key] = found
+        return found
 
-    soup = BeautifulSoup(html, 'lxml')
-    categories = []
-    seen_containers = set()
+    def _partition(self, day: str, create: bool = True):
+        conn = self._partitions.get(day)
+        if conn is not None:
+            return conn
+        path = os.path.join(self.root, f'{day}.sqlite3')
+        if not create and not os.path.exists(path):
+            return None
+        if len(self._partitions) >= self.MAX_OPEN_PARTITIONS:
+            # 상주 워커가 날짜를 넘겨도 연결/사전 id 캐시가 계속 늘지 않도록 가장 오래된 날짜부터 닫음
+            oldest = min(self._partitions)
+            self._partitions.pop(oldest).close()
+            self._ids = {key: value for key, value in self._ids.items() if key[0] != oldest}
+        import sqlite3
 
-    # 전략 0: fds-ugc-block-mod-list 직접 타겟팅 (최우선)
-    ugc_list_containers = soup.find_all('div', class_=lambda x: x and 'fds-ugc-block-mod-list' in str(x))
+        conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('CREATE TABLE IF NOT EXISTS keywords (id INTEGER PRIMARY KEY, keyword TEXT NOT NULL UNIQUE)')
+        conn.execute('CREATE TABLE IF NOT EXISTS categories ('
+                     ' id INTEGER PRIMARY KEY, title TEXT NOT NULL, type TEXT NOT NULL, UNIQUE (title, type))')
+        conn.execute('CREATE TABLE IF NOT EXISTS blogs (id INTEGER PRIMARY KEY, blog_id TEXT NOT NULL UNIQUE)')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS observations ('
+            ' keyword INTEGER NOT NULL,'
+            ' scraped_at INTEGER NOT NULL,'  # epoch 초 (UTC)
+            ' category INTEGER NOT NULL,'
+            ' position INTEGER NOT NULL,'
+            ' blog INTEGER,'  # NULL = blogId 없음
+            ' post_id,'  # 숫자 logNo는 INTEGER, 그 외 TEXT
+            ' preview INTEGER NOT NULL)'  # 1 = 미리보기, 0 = 더보기
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_observations_blog ON observations(blog, category)')
+        self._partitions[day] = conn
+        return conn
 
-    for container in ugc_list_containers:
-        container_id = id(container)
-        if container_id in seen_containers:
-            continue
-        seen_containers.add(container_id)
+    def partitions(self, since: Optional[str] = None, until: Optional[str] = None) -> List[str]:
+        """기록된 날짜(YYYY-MM-DD) 목록, since/until은 양 끝 포함"""
+        days = sorted(name[:-len('.sqlite3')] for name in os.listdir(self.root)
+                      if re.fullmatch(r'\d{4}-\d{2}-\d{2}\.sqlite3', name))
+        return [day for day in days if (since is None or day >= since) and (until is None or day <= until)]
 
-        # 제목 찾기
-        title = "스마트블록"
-        parent_section = container.find_parent(['div', 'section'], class_=lambda x: x and any(
-            keyword in str(x).lower() for keyword in ['fds-info-section', 'api-subject-bx', 'section']
-        ))
+    def appearances(self, blog_id: str, category_title: Optional[str] = None,
+                    since: Optional[str] = None, until: Optional[str] = None) -> List[Dict]:
+        """blogId 하나가 (키워드, 카테고리)별로 몇 번 관측됐는지 (버퍼에 남은 행은 먼저 기록)
+
+        Returns:
+            [{keyword, categoryTitle, categoryType, observations, scrapes, previewObservations,
+              bestPosition, firstSeen, lastSeen}] (관측 수가 많은 순). observations는 글 단위 관측 수,
+            scrapes는 그 블로그가 한 번이라도 나온 수집 횟수입니다.
+        """
+        self.flush()
+        totals: Dict[Tuple[str, str, str], List] = {}
+        with self._lock:
+            for day in self.partitions(since, until):
+                conn = self._partition(day, create=False)
+                if conn is None:
+                    continue
+                rows = conn.execute(
+                    'SELECT k.keyword, c.title, c.type, COUNT(*), COUNT(DISTINCT o.scraped_at), SUM(o.preview),'
+                    ' MIN(o.position),'
+                    ' MIN(o.scraped_at), MAX(o.scraped_at) '
+                    'FROM observations o JOIN blogs b ON b.id = o.blog '
+                    'JOIN keywords k ON k.id = o.keyword JOIN categories c ON c.id = o.category '
+                    'WHERE b.blog_id = ?' + (' AND c.title = ?' if category_title is not None else '') +
+                    ' GROUP BY o.keyword, o.category',
+                    (blog_id, category_title) if category_title is not None else (blog_id,),
+                ).fetchall()
+                for keyword, title, category_type, count, scrapes, previews, best, first, last in rows:
+                    total = totals.get((keyword, title, category_type))
+                    if total is None:
+                        totals[(keyword, title, category_type)] = [count, scrapes, previews, best, first, last]
+                    else:
+                        total[0] += count
+                        total[1] += scrapes
+                        total[2] += previews
+                        total[3] = min(total[3], best)
+                        total[4] = min(total[4], first)
+                        total[5] = max(total[5], last)
+        return sorted((
+            {
+                'keyword': keyword,
+                'categoryTitle': title,
+                'categoryType': category_type,
+                'observations': count,
+                'scrapes': scrapes,
+                'previewObservations': previews,
+                'bestPosition': best,
+                'firstSeen': _epoch_iso(first),
+                'lastSeen': _epoch_iso(last),
+            }
+            for (keyword, title, category_type), (count, scrapes, previews, best, first, last) in totals.items()
+        ), key=lambda item: (-item['observations'], item['keyword'], item['categoryTitle']))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'results': self.results,
+                'observations': self.observations,
+                'pending': len(self._pending),
+                'flushes': self.flushes,
+                'partitions': len(self._partitions),
+            }
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            for conn in self._partitions.values():
+                conn.close()
+            self._partitions.clear()
+            self._ids.clear()
+
+
+def _compact_post_id(post_id: Optional[str]) -> Union[int, str, None]:
+    # logNo는 숫자라 INTEGER로 저장하면 더 작음 (앞자리 0이 있으면 그대로 문자열)
+    if post_id and post_id.isdigit() and not post_id.startswith('0') and len(post_id) < 19:
+        return int(post_id)
+    return post_id
+
+
+def _epoch_iso(epoch: int) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+class BlogAppearanceIndex:
+    """blogId → 현재 노출 (키워드, 카테고리, 순위, scrapedAt) 역색인 (SQLite)
+
+    키워드 결과가 들어올 때마다 그 키워드의 항목을 새 결과로 바꿉니다 (빠진 블로그는 삭제).
+    대상 모드에서 일찍 멈춘 결과(earlyExit)는 뒤쪽 순위가 비어 있으므로 삭제 없이 찾은 항목만 갱신합니다.
+    (blogId, 키워드, 카테고리)마다 가장 높은 순위의 글 하나를 보관하며, 기본 키가 blogId로 시작하는
+    WITHOUT ROWID 테이블이라 blogId 조회는 네이버 요청 없이 범위 스캔 한 번으로 끝납니다.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.updates = 0
+        self.lookups = 0
+        self._lock = threading.Lock()
+
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        import sqlite3
+
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS blog_index ('
+            ' blog_id TEXT NOT NULL,'
+            ' keyword TEXT NOT NULL,'
+            ' category_title TEXT NOT NULL,'
+            ' category_type TEXT NOT NULL,'
+            ' rank INTEGER NOT NULL,'  # category_ranking 순서, 1부터
+            ' preview INTEGER NOT NULL,'  # 1 = 미리보기, 0 = 더보기
+            ' post_id TEXT,'
+            ' url TEXT,'
+            ' scraped_at INTEGER NOT NULL,'  # epoch 초 (UTC)
+            ' PRIMARY KEY (blog_id, keyword, category_title)) WITHOUT ROWID'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_blog_index_keyword ON blog_index(keyword)')
+
+    def update(self, result: Dict) -> int:
+        """키워드 결과 하나로 색인 갱신 (반환값: 기록한 항목 수)"""
+        if not result.get('success') or 'categories' not in result:
+            return 0
+        epoch = int(_parse_scraped_at(result['scrapedAt']).timestamp())
+        keyword = result['keyword']
+        entries: Dict[Tuple[str, str], Tuple] = {}
+        for category in result['categories']:
+            for position, blog, in_preview in _ranked_observations(category):
+                key = (blog['blogId'], category['categoryTitle'])
+                if blog['blogId'] and key not in entries:
+                    entries[key] = (blog['blogId'], keyword, category['categoryTitle'], category['categoryType'],
+                                    position, int(in_preview), blog['postId'], blog['url'], epoch)
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                if not result.get('earlyExit'):
+                    self._conn.execute('DELETE FROM blog_index WHERE keyword = ?', (keyword,))
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO blog_index (blog_id, keyword, category_title, category_type, rank, preview,'
+                    ' post_id, url, scraped_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    entries.values(),
+                )
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            self.updates += 1
+        return len(entries)
+
+    def lookup_many(self, blog_ids: Iterable[str], limit: Optional[int] = 10) -> Dict[str, List[Dict]]:
+        """blogId마다 최근 노출 상위 limit개 (scrapedAt 최신순, 같으면 순위순; limit=None이면 전부)"""
+        ids = list(dict.fromkeys(blog_ids))
+        found: Dict[str, List[Dict]] = {blog_id: [] for blog_id in ids}
+        with self._lock:
+            for chunk in _chunks(ids, 500):
+                rows = self._conn.execute(
+                    'SELECT blog_id, keyword, category_title, category_type, rank, preview, post_id, url, scraped_at '
+                    f'FROM blog_index WHERE blog_id IN ({",".join("?" * len(chunk))}) '
+                    'ORDER BY blog_id, scraped_at DESC, rank, keyword',
+                    chunk,
+                ).fetchall()
+                for blog_id, keyword, title, category_type, rank, preview, post_id, url, scraped_at in rows:
+                    appearances = found[blog_id]
+                    if limit is not None and len(appearances) >= limit:
+                        continue
+                    appearances.append({
+                        'keyword': keyword,
+                        'categoryTitle': title,
+                        'categoryType': category_type,
+                        'rank': rank,
+                        'section': 'preview' if preview else 'more',
+                        'postId': post_id,
+                        'url': url,
+                        'scrapedAt': _epoch_iso(scraped_at),
+                    })
+            self.lookups += len(ids)
+        return found
+
+    def lookup(self, blog_id: str, limit: Optional[int] = 10) -> List[Dict]:
+        return self.lookup_many([blog_id], limit)[blog_id]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            (entries,) = self._conn.execute('SELECT COUNT(*) FROM blog_index').fetchone()
+        return {
+            'updates': self.updates,
+            'lookups': self.lookups,
+            'entries': entries,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ScrapeMetrics:
+    """스테이지별 누적 시간/호출 수와 카운터 (키워드 한 번 또는 여러 번 합산)
+
+    스테이지 시간은 벽시계 기준이라 동시에 진행된 스테이지(카테고리별 미리보기/더보기 등)의
+    합은 전체 시간보다 클 수 있습니다.
+    bytesDownloaded 카운터는 압축(gzip/br) 해제 후의 본문 바이트 수라 실제 전송량보다 큽니다.
+    """
+
+    def __init__(self):
+        self.stage_seconds: Dict[str, float] = {}
+        self.stage_calls: Dict[str, int] = {}
+        self.counters: Dict[str, int] = {}
+        self.runs = 0
+        self.wall_seconds = 0.0
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        self.stage_seconds[name] = self.stage_seconds.get(name, 0.0) + seconds
+        self.stage_calls[name] = self.stage_calls.get(name, 0) + 1
+
+    def add(self, name: str, value: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def merge(self, other: 'ScrapeMetrics') -> None:
+        for name, seconds in other.stage_seconds.items():
+            self.stage_seconds[name] = self.stage_seconds.get(name, 0.0) + seconds
+            self.stage_calls[name] = self.stage_calls.get(name, 0) + other.stage_calls[name]
+        for name, value in other.counters.items():
+            self.add(name, value)
+        self.runs += other.runs
+        self.wall_seconds += other.wall_seconds
+
+    def to_dict(self) -> dict:
+        return {
+            'totalMs': round(self.wall_seconds * 1000, 1),
+            'stages': {
+                name: {'calls': self.stage_calls[name], 'totalMs': round(seconds * 1000, 1)}
+                for name, seconds in self.stage_seconds.items()
+            },
+            'counters': dict(self.counters),
+        }
+
+    def to_prometheus(self, prefix: str = 'naver_scraper') -> str:
+        """Prometheus 텍스트 노출 형식"""
+        lines = [
+            f'# TYPE {prefix}_runs_total counter',
+            f'{prefix}_runs_total {self.runs}',
+            f'# TYPE {prefix}_run_seconds_total counter',
+            f'{prefix}_run_seconds_total {self.wall_seconds:.6f}',
+            f'# TYPE {prefix}_stage_seconds_total counter',
+        ]
+        lines.extend(f'{prefix}_stage_seconds_total{{stage="{name}"}} {seconds:.6f}'
+                     for name, seconds in sorted(self.stage_seconds.items()))
+        lines.append(f'# TYPE {prefix}_stage_calls_total counter')
+        lines.extend(f'{prefix}_stage_calls_total{{stage="{name}"}} {self.stage_calls[name]}'
+                     for name in sorted(self.stage_calls))
+        for name, value in sorted(self.counters.items()):
+            metric = re.sub(r'(?<!^)(?=[A-Z])', '_', name).lower()
+            lines.append(f'# TYPE {prefix}_{metric}_total counter')
+            lines.append(f'{prefix}_{metric}_total {value}')
+        return '\n'.join(lines) + '\n'
+
+
+# 현재 키워드 스크래핑의 지표 (main_async가 설정, gather/to_thread로 만든 작업에도 전달됨)
+_CURRENT_METRICS: contextvars.ContextVar[Optional[ScrapeMetrics]] = contextvars.ContextVar(
+    'scrape_metrics', default=None
+)
+
+
+@contextlib.contextmanager
+def metric_stage(name: str) -> Iterator[None]:
+    """with 블록의 벽시계 시간을 현재 지표의 스테이지 name에 누적"""
+    metrics = _CURRENT_METRICS.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_stage(name, time.perf_counter() - started)
+
+
+def metric_count(name: str, value: int = 1) -> None:
+    metrics = _CURRENT_METRICS.get()
+    if metrics is not None:
+        metrics.add(name, value)
+
+
+def _run_measured(fn: Callable[..., Any], args: tuple) -> Tuple[Any, ScrapeMetrics]:
+    """ParsePool 작업 래퍼: 작업 프로세스에서 잰 스테이지/카운터를 결과와 함께 돌려줌"""
+    metrics = ScrapeMetrics()
+    token = _CURRENT_METRICS.set(metrics)
+    try:
+        return fn(*args), metrics
+    finally:
+        _CURRENT_METRICS.reset(token)
+
+
+def normalize_fetch_key(url: str) -> str:
+    """요청 합치기용 URL 정규화: fragment 제거, 쿼리 파라미터 정렬
+
+    in.naver.com 콘텐츠 링크는 키워드마다 붙는 areacode/query 파라미터와 상관없이 같은 글로
+    리다이렉트되므로 classify_url의 정규 URL(쿼리 없음)을 씁니다. lb_api의 "#lb_api=" 링크는
+    실제 API URL로 바꿉니다.
+    """
+    if url.startswith('#lb_api='):
+        url = urllib.parse.unquote(url.split('#lb_api=', 1)[1])
+    info = classify_url(url)
+    if info.kind == URL_IN_NAVER and info.canonical:
+        return info.canonical
+    parts = urllib.parse.urlsplit(url)
+    if parts.hostname == 'in.naver.com' or (parts.hostname or '').endswith('.in.naver.com'):
+        return urllib.parse.urlunsplit((parts.scheme, parts.netloc, parts.path, '', ''))
+    query = urllib.parse.urlencode(sorted(urllib.parse.parse_qsl(parts.query, keep_blank_values=True)))
+    return urllib.parse.urlunsplit((parts.scheme, parts.netloc, parts.path, query, ''))
+
+
+class SingleFlight:
+    """같은 키의 동시 요청을 한 번의 실행으로 합치고, 결과를 ttl초 동안 재사용 (v13)
+
+    배치/워커에서 여러 키워드가 같은 더보기 페이지, lb_api, in.naver.com 링크를 동시에 요청해도
+    네이버에는 한 번만 보냅니다. 실행은 별도 태스크에서 하므로 기다리던 쪽 하나가 취소돼도
+    나머지는 계속 결과를 받고, 기다리는 쪽이 모두 취소되면 (배치 timeout 등) 실행도 취소해
+    아무도 쓰지 않을 요청이 요청 제어 토큰을 쓰지 않게 합니다. 빈 결과(실패 시 []/None)는 보관하지 않습니다.
+    """
+
+    def __init__(self, ttl: float = 60.0, max_entries: int = 4096):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.executed = 0
+        self.shared = 0
+        self.cache_hits = 0
+        self._in_flight: Dict[Any, asyncio.Future] = {}
+        self._waiters: Dict[asyncio.Future, int] = {}  # 실행 중인 태스크 -> 기다리는 쪽 수
+        self._results: Dict[Any, Tuple[float, Any]] = {}  # 삽입 순서 = 만료 순서
+
+    async def do(self, key: Any, make: Callable[[], Awaitable[Any]]) -> Any:
+        now = time.monotonic()
+        cached = self._results.get(key)
+        if cached is not None:
+            if now - cached[0] < self.ttl:
+                self.cache_hits += 1
+                metric_count('singleFlightCacheHits')
+                return cached[1]
+            del self._results[key]
+
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.shared += 1
+            metric_count('singleFlightShared')
+        else:
+            self.executed += 1
+            future = asyncio.ensure_future(make())
+            self._in_flight[key] = future
+            future.add_done_callback(lambda done: self._finished(key, done))
+        self._waiters[future] = self._waiters.get(future, 0) + 1
+        try:
+            return await asyncio.shield(future)
+        finally:
+            remaining = self._waiters[future] - 1
+            if remaining:
+                self._waiters[future] = remaining
+            else:
+                del self._waiters[future]
+                if not future.done():
+                    # 마지막으로 기다리던 쪽이 취소됨: 결과를 받을 곳이 없으므로 실행도 취소
+                    future.cancel()
+
+    def _finished(self, key: Any, future: asyncio.Future) -> None:
+        self._in_flight.pop(key, None)
+        if self.ttl <= 0 or future.cancelled() or future.exception() is not None or not future.result():
+            return
+        self._results[key] = (time.monotonic(), future.result())
+        while len(self._results) > self.max_entries:
+            del self._results[next(iter(self._results))]
+
+    def stats(self) -> Dict[str, int]:
+        return {'executed': self.executed, 'shared': self.shared, 'cacheHits': self.cache_hits,
+                'inFlight': len(self._in_flight), 'entries': len(self._results)}
+
+
+class _HostState:
+    """호스트 하나의 AIMD 윈도우 / 토큰 버킷 / 백오프 상태"""
+
+    __slots__ = ('cond', 'window', 'in_flight', 'tokens', 'refilled_at', 'backoff_until',
+                 'last_decrease', 'failures', 'latency', 'ok', 'throttled', 'server_errors',
+                 'timeouts', 'connection_errors', 'slow')
+
+    def __init__(self, window: float, burst: float):
+        self.cond = asyncio.Condition()
+        self.window = window
+        self.in_flight = 0
+        self.tokens = burst
+        self.refilled_at = time.monotonic()
+        self.backoff_until = 0.0
+        self.last_decrease = 0.0
+        self.failures = 0
+        self.latency = 0.0
+        self.ok = self.throttled = self.server_errors = self.timeouts = self.connection_errors = self.slow = 0
+
+
+class RequestTicket:
+    """RateController.slot()이 넘겨주는 요청 한 건의 결과 기록용 객체"""
+
+    __slots__ = ('started', 'status_code', 'retry_after', 'timed_out', 'connection_failed')
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.status_code: Optional[int] = None
+        self.retry_after: Optional[float] = None
+        self.timed_out = False
+        self.connection_failed = False  # 응답 없이 끝난 요청 (연결 거부/리셋 등)
+
+    def finish(self, status_code: int, headers=None) -> None:
+        self.status_code = status_code
+        value = (headers or {}).get('retry-after')
+        if value and value.strip().isdigit():
+            self.retry_after = float(value)
+
+
+class RateController:
+    """호스트별 적응형 동시성 + 속도 제한 (v13)
+
+    - 동시 요청 수는 AIMD 윈도우: 정상 응답마다 +1/window, 429/5xx/타임아웃/연결 오류/느린 응답이면
+      절반으로 줄임 (지연 시간 한 번에 한 번만 줄임)
+    - 요청 시작은 토큰 버킷으로 초당 rate개까지 (burst만큼 몰아서 허용, rate=None이면 제한 없음)
+    - 429/5xx/타임아웃/연결 오류가 이어지면 호스트 전체를 지수 백오프로 잠시 멈춤 (Retry-After 우선)
+    snapshot()으로 호스트별 현재 상태를 볼 수 있습니다.
+    """
+
+    def __init__(self, initial_window: int = 6, max_window: Optional[int] = None, min_window: int = 1,
+                 rate: Optional[float] = 20.0, burst: Optional[float] = None, slow_after: float = 2.5,
+                 base_backoff: float = 1.0, max_backoff: float = 30.0):
+        self.initial_window = max(min_window, initial_window)
+        self.max_window = max(self.initial_window, max_window or initial_window * 4)
+        self.min_window = min_window
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate or 1.0)
+        self.slow_after = slow_after
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._hosts: Dict[str, _HostState] = {}
+
+    def _state(self, host: str) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(float(self.initial_window), self.burst)
+        return state
+
+    def _refill(self, state: _HostState, now: float) -> None:
+        if self.rate:
+            state.tokens = min(self.burst, state.tokens + (now - state.refilled_at) * self.rate)
+        state.refilled_at = now
+
+    def _wait_time(self, state: _HostState) -> Optional[float]:
+        """바로 시작할 수 있으면 0, 시간이 지나야 하면 대기 초, 다른 요청이 끝나야 하면 None"""
+        now = time.monotonic()
+        if state.backoff_until > now:
+            return state.backoff_until - now
+        if state.in_flight >= int(state.window):
+            return None
+        if not self.rate:
+            return 0.0
+        self._refill(state, now)
+        if state.tokens >= 1:
+            return 0.0
+        return (1 - state.tokens) / self.rate
+
+    @contextlib.asynccontextmanager
+    async def slot(self, url: str):
+        state = self._state(urllib.parse.urlsplit(url).hostname or '')
+        async with state.cond:
+            while True:
+                wait = self._wait_time(state)
+                if wait == 0:
+                    break
+                try:
+                    await asyncio.wait_for(state.cond.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+            if self.rate:
+                state.tokens -= 1
+            state.in_flight += 1
+
+        ticket = RequestTicket()
+        try:
+            yield ticket
+        except FetchTimeout:
+            ticket.timed_out = True
+            raise
+        except FetchError as e:
+            ticket.connection_failed = e.status_code is None
+            raise
+        finally:
+            async with state.cond:
+                state.in_flight -= 1
+                self._record(state, ticket)
+                state.cond.notify_all()
+
+    def _record(self, state: _HostState, ticket: RequestTicket) -> None:
+        now = time.monotonic()
+        elapsed = now - ticket.started
+        status = ticket.status_code
+        if not ticket.timed_out and not ticket.connection_failed and status is None:
+            return  # 취소 등 결과를 모르는 요청은 반영하지 않음
+
+        state.latency = elapsed if not state.latency else 0.8 * state.latency + 0.2 * elapsed
+        failed = ticket.timed_out or ticket.connection_failed or status == 429 or status >= 500
+        if failed:
+            if ticket.timed_out:
+                state.timeouts += 1
+            elif ticket.connection_failed:
+                state.connection_errors += 1
+            elif status == 429:
+                state.throttled += 1
+            else:
+                state.server_errors += 1
+            state.failures += 1
+            self._decrease(state, now)
+            backoff = min(self.max_backoff, self.base_backoff * 2 ** (state.failures - 1))
+            if ticket.retry_after is not None:
+                backoff = max(backoff, min(self.max_backoff, ticket.retry_after))
+            state.backoff_until = max(state.backoff_until, now + backoff)
+        elif elapsed > self.slow_after:
+            state.slow += 1
+            self._decrease(state, now)
+        else:
+            state.ok += 1
+            state.failures = 0
+            state.window = min(float(self.max_window), state.window + 1 / state.window)
+
+    def _decrease(self, state: _HostState, now: float) -> None:
+        # 같은 혼잡으로 동시에 실패한 요청들이 윈도우를 연달아 깎지 않도록 지연 시간당 한 번만
+        if now - state.last_decrease < max(state.latency, 0.5):
+            return
+        state.last_decrease = now
+        state.window = max(float(self.min_window), state.window / 2)
+
+    def snapshot(self) -> Dict[str, dict]:
+        """호스트별 현재 윈도우/진행 중 요청/토큰/백오프 잔여 시간과 누적 카운터"""
+        now = time.monotonic()
+        result = {}
+        for host, state in self._hosts.items():
+            if self.rate:
+                self._refill(state, now)
+            result[host] = {
+                'window': round(state.window, 2),
+                'inFlight': state.in_flight,
+                'tokens': round(state.tokens, 2) if self.rate else None,
+                'backoffRemaining': round(max(0.0, state.backoff_until - now), 2),
+                'latencyEwma': round(state.latency, 3),
+                'ok': state.ok,
+                'throttled': state.throttled,
+                'serverErrors': state.server_errors,
+                'timeouts': state.timeouts,
+                'connectionErrors': state.connection_errors,
+                'slow': state.slow,
+            }
+        return result
+
+
+class ScanResult(NamedTuple):
+    """NaverHttpClient.scan() 결과 (redirect면 location, 아니면 본문 첫 매칭 그룹)"""
+    status_code: int
+    url: str
+    location: Optional[str]
+    match: Optional[str]
+
+
+class _StreamScanner:
+    """청크로 들어오는 본문에서 바이트 정규식의 첫 매칭 찾기 (청크 경계에 걸친 매칭 포함)"""
+
+    OVERLAP = 4096
+
+    def __init__(self, pattern: 're.Pattern[bytes]', max_bytes: int):
+        self.pattern = pattern
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+        self.match: Optional[bytes] = None
+        self._tail = b''
+
+    def feed(self, chunk: bytes) -> bool:
+        """True면 더 읽을 필요 없음 (매칭 또는 max_bytes 도달)"""
+        self.bytes_read += len(chunk)
+        metric_count('bytesDownloaded', len(chunk))
+        buffer = self._tail + chunk
+        match = self.pattern.search(buffer)
+        if match:
+            self.match = next(group for group in match.groups() if group is not None)
+            return True
+        self._tail = buffer[-self.OVERLAP:]
+        return self.bytes_read >= self.max_bytes
+
+    def decoded(self, headers) -> Optional[str]:
+        if self.match is None:
+            return None
+        charset = re.search(r'charset=([\w-]+)', headers.get('content-type', ''), re.I)
+        try:
+            return html.unescape(self.match.decode(charset.group(1) if charset else 'utf-8', errors='replace'))
+        except LookupError:
+            return html.unescape(self.match.decode('utf-8', errors='replace'))
+
+
+class NaverHttpClient:
+    """모든 스크래핑 스테이지가 공유하는 keep-alive HTTP 클라이언트
+
+    httpx가 설치되어 있으면 AsyncClient 하나(h2가 있으면 HTTP/2)를 사용하고,
+    없으면 requests.Session을 스레드에서 실행합니다.
+    호스트별 동시 요청 수와 속도는 RateController가 정하고 (per_host_limit은 초기 윈도우),
+    429/5xx 응답은 백오프 후 max_retries번까지 다시 보내고, GET 등 멱등 요청은 타임아웃/연결 오류도
+    같은 방식으로 다시 보냅니다. 쿠키는 요청마다
+    명시적으로 보내고 응답의 Set-Cookie는 저장하지 않습니다 (기존 requests.get과 동일).
+    resolution_cache를 넘기면 in.naver.com 해석 결과를, serp_cache를 넘기면 검색 페이지 결과를
+    캐시에서 먼저 찾습니다 (캐시는 만든 쪽이 닫음).
+    browser_pool은 Playwright fallback이 쓰는 브라우저 풀로, 생략하면 기본 풀을 만들고
+    aclose()에서 함께 닫습니다 (브라우저는 처음 필요할 때 띄움).
+    url_rewriter는 실제로 요청할 URL을 바꾸는 훅입니다 (오프라인 벤치마크의 스텁 서버 등).
+    metrics에는 main_async로 처리한 키워드들의 스테이지 지표가 합산됩니다.
+    parse_pool을 넘기면 HTML 파싱을 프로세스 풀에서 실행합니다 (풀은 만든 쪽이 닫음).
+    single_flight는 더보기/lb_api/in.naver.com 요청을 키워드 사이에서 합치는 층입니다 (기본 ttl 60초).
+    archive를 넘기면 main_async의 성공 결과마다 노출 관측을 기록하고, blog_index를 넘기면
+    blogId 역색인을 갱신합니다 (둘 다 만든 쪽이 닫음).
+    커넥션 풀/합치기/속도 제어가 처음 쓴 이벤트 루프에 묶이므로 한 이벤트 루프 안에서만 씁니다
+    (asyncio.run마다 새 루프를 만드는 main()/run_batch() 호출 사이에 재사용하면 RuntimeError).
+    """
+
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(self, per_host_limit: int = 6, max_connections: int = 64,
+                 resolution_cache: Optional[InNaverResolutionCache] = None,
+                 controller: Optional[RateController] = None, max_retries: int = 2,
+                 browser_pool: Optional['BrowserPool'] = None, serp_cache: Optional[SerpCache] = None,
+                 url_rewriter: Optional[Callable[[str], str]] = None, parse_pool: Optional['ParsePool'] = None,
+                 single_flight: Optional[SingleFlight] = None, archive: Optional[ObservationArchive] = None,
+                 blog_index: Optional[BlogAppearanceIndex] = None):
+        self.per_host_limit = per_host_limit
+        self.archive = archive
+        self.blog_index = blog_index
+        self.single_flight = single_flight or SingleFlight()
+        self.parse_pool = parse_pool
+        self.url_rewriter = url_rewriter
+        self.metrics = ScrapeMetrics()  # 이 클라이언트로 처리한 모든 키워드의 지표 합계
+        self.serp_cache = serp_cache
+        self.browser_pool = browser_pool or BrowserPool()
+        self.resolution_cache = resolution_cache
+        self.controller = controller or RateController(initial_window=per_host_limit)
+        self.max_retries = max_retries
+        self._client = None
+        self._session = None
+        self._requests = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.http2 = False
+
+        from http.cookiejar import CookieJar, DefaultCookiePolicy
+
+        no_cookie_policy = DefaultCookiePolicy(allowed_domains=[])
+        try:
+            import httpx
+        except ImportError:
+            httpx = None
+
+        if httpx is not None:
+            self._httpx = httpx
+            self.http2 = importlib.util.find_spec('h2') is not None
+            self._client = httpx.AsyncClient(
+                http2=self.http2,
+                cookies=CookieJar(policy=no_cookie_policy),
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_connections,
+                    keepalive_expiry=30.0,
+                ),
+            )
+        else:
+            import requests
+            from requests.adapters import HTTPAdapter
+            self._requests = requests
+            self._session = requests.Session()
+            self._session.cookies.set_policy(no_cookie_policy)
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=max_connections)
+            self._session.mount('https://', adapter)
+            self._session.mount('http://', adapter)
+
+    async def __aenter__(self) -> 'NaverHttpClient':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self.browser_pool.aclose()
+        if self._client is not None:
+            await self._client.aclose()
+        if self._session is not None:
+            self._session.close()
+
+    def _bind_loop(self) -> None:
+        """처음 쓰는 이벤트 루프에 묶고, 다른 루프(이미 닫힌 asyncio.run 루프 등)에서 쓰면 명확한 오류"""
+        loop = asyncio.get_running_loop()
+        if self._loop is None:
+            self._loop = loop
+        elif self._loop is not loop:
+            raise RuntimeError(
+                'NaverHttpClient is bound to the event loop it was first used on; sync wrappers '
+                '(main, run_batch, run_worker, run_queue_worker) start a new loop per call, so reuse one '
+                'client across keywords with main_async/run_batch_async inside a single event loop'
+            )
+
+    async def _paced(self, url: str, send: Callable[[], Awaitable[Tuple[Any, int, Any]]],
+                     idempotent: bool = True) -> Any:
+        """controller 슬롯 안에서 send()를 실행하고, 재시도할 상태 코드면 백오프 후 다시 보냄
+
+        send()는 (결과, 상태 코드, 응답 헤더)를 돌려줍니다. idempotent면 타임아웃/연결 오류
+        (응답 없는 FetchError)도 재시도하며, 백오프는 controller가 슬롯을 내줄 때 기다립니다.
+        """
+        self._bind_loop()
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self.controller.slot(url) as ticket:
+                    result, status_code, headers = await send()
+                    ticket.finish(status_code, headers)
+            except FetchError as e:
+                metric_count('httpRequests')
+                if e.status_code is not None or not idempotent or attempt == self.max_retries:
+                    raise
+                metric_count('httpRetries')
+                continue
+            metric_count('httpRequests')
+            if status_code not in self.RETRY_STATUSES or attempt == self.max_retries:
+                return result
+            metric_count('httpRetries')
+
+    async def get(self, url: str, *, params: Optional[dict] = None, headers: Optional[dict] = None,
+                  cookies: Optional[dict] = None, timeout: float = 10,
+                  follow_redirects: bool = True) -> FetchResponse:
+        return await self.request('GET', url, params=params, headers=headers, cookies=cookies,
+                                  timeout=timeout, follow_redirects=follow_redirects)
+
+    async def request(self, method: str, url: str, *, params: Optional[dict] = None,
+                      headers: Optional[dict] = None, cookies: Optional[dict] = None,
+                      timeout: float = 10, follow_redirects: bool = True) -> FetchResponse:
+        headers = dict(headers or {})
+        if cookies:
+            headers['Cookie'] = '; '.join(f'{name}={value}' for name, value in cookies.items())
+        if self.url_rewriter is not None:
+            url = self.url_rewriter(url)
+
+        async def send():
+            if self._client is None:
+                response = await asyncio.to_thread(
+                    self._request_sync, method, url, params, headers, timeout, follow_redirects
+                )
+                metric_count('bytesDownloaded', len(response.content))
+                return response, response.status_code, response.headers
+            httpx = self._httpx
+            try:
+                response = await self._client.request(
+                    method, url, params=params, headers=headers,
+                    timeout=timeout, follow_redirects=follow_redirects,
+                )
+            except httpx.TimeoutException as e:
+                raise FetchTimeout(f'Timeout fetching {url}: {e}') from e
+            except httpx.HTTPError as e:
+                raise FetchError(f'Error fetching {url}: {e}') from e
+            metric_count('bytesDownloaded', len(response.content))
+            return (FetchResponse(response.status_code, str(response.url), response.headers, response.content),
+                    response.status_code, response.headers)
+
+        return await self._paced(url, send, method.upper() in ('GET', 'HEAD', 'OPTIONS'))
+
+    def _request_sync(self, method: str, url: str, params: Optional[dict], headers: dict,
+                      timeout: float, follow_redirects: bool) -> FetchResponse:
+        requests = self._requests
+        try:
+            response = self._session.request(
+                method, url, params=params, headers=headers,
+                timeout=timeout, allow_redirects=follow_redirects,
+            )
+        except requests.Timeout as e:
+            raise FetchTimeout(f'Timeout fetching {url}: {e}') from e
+        except requests.RequestException as e:
+            raise FetchError(f'Error fetching {url}: {e}') from e
+        return FetchResponse(response.status_code, response.url, response.headers, response.content)
+
+    async def scan(self, url: str, pattern: 're.Pattern[bytes]', *, headers: Optional[dict] = None,
+                   timeout: float = 10, max_bytes: int = 1 << 20) -> ScanResult:
+        """리다이렉트를 따라가지 않고 응답 하나를 스트리밍으로 훑기
+
+        3xx면 본문을 읽지 않고 Location만 돌려주고, 그 외에는 본문을 청크 단위로 읽다가
+        pattern이 처음 매칭되는 순간 연결을 끊습니다 (DOM을 만들지 않음).
+        """
+        headers = dict(headers or {})
+        request_url = self.url_rewriter(url) if self.url_rewriter is not None else url
+
+        async def send():
+            if self._client is None:
+                return await asyncio.to_thread(self._scan_sync, request_url, pattern, headers, timeout, max_bytes)
+            httpx = self._httpx
+            try:
+                async with self._client.stream('GET', request_url, headers=headers, timeout=timeout,
+                                               follow_redirects=False) as response:
+                    if response.is_redirect:
+                        location = response.headers.get('location')
+                        return ScanResult(response.status_code, request_url, location, None), response.status_code, response.headers
+                    scanner = _StreamScanner(pattern, max_bytes)
+                    async for chunk in response.aiter_bytes():
+                        if scanner.feed(chunk):
+                            break
+                    return (ScanResult(response.status_code, request_url, None, scanner.decoded(response.headers)),
+                            response.status_code, response.headers)
+            except httpx.TimeoutException as e:
+                raise FetchTimeout(f'Timeout fetching {url}: {e}') from e
+            except httpx.HTTPError as e:
+                raise FetchError(f'Error fetching {url}: {e}') from e
+
+        return await self._paced(request_url, send)
+
+    def _scan_sync(self, url: str, pattern: 're.Pattern[bytes]', headers: dict,
+                   timeout: float, max_bytes: int) -> Tuple[ScanResult, int, Any]:
+        requests = self._requests
+        try:
+            with self._session.get(url, headers=headers, timeout=timeout,
+                                   allow_redirects=False, stream=True) as response:
+                if response.is_redirect:
+                    location = response.headers.get('location')
+                    return ScanResult(response.status_code, url, location, None), response.status_code, response.headers
+                scanner = _StreamScanner(pattern, max_bytes)
+                for chunk in response.iter_content(16384):
+                    if scanner.feed(chunk):
+                        break
+                return (ScanResult(response.status_code, url, None, scanner.decoded(response.headers)),
+                        response.status_code, response.headers)
+        except requests.Timeout as e:
+            raise FetchTimeout(f'Timeout fetching {url}: {e}') from e
+        except requests.RequestException as e:
+            raise FetchError(f'Error fetching {url}: {e}') from e
+
+
+def _run_sync(make_coro: Callable[[NaverHttpClient], Awaitable[Any]],
+              client: Optional[NaverHttpClient] = None, close_client: bool = False, **client_kwargs) -> Any:
+    """동기 API 호환용: 코루틴 하나를 실행
+
+    client를 생략하면 임시 클라이언트를 열고 끝나면 닫습니다. 넘긴 client는 닫지 않으며,
+    close_client=True면 (CLI처럼 호출한 쪽이 소유권을 넘길 때) 끝나고 닫습니다.
+    asyncio.run은 호출마다 새 이벤트 루프를 만들므로 넘긴 client는 한 번의 호출에만 쓸 수 있고,
+    이미 다른 루프에서 쓴 client면 바로 RuntimeError를 냅니다 (재사용은 *_async 함수로).
+    """
+
+    async def runner():
+        if client is None:
+            async with NaverHttpClient(**client_kwargs) as opened:
+                return await make_coro(opened)
+        client._bind_loop()
+        if not close_client:
+            return await make_coro(client)
+        async with client:
+            return await make_coro(client)
+
+    return asyncio.run(runner())
+
+
+class SerpFetch(NamedTuple):
+    """검색 페이지 요청 결과 (not_modified면 html은 비어 있고 캐시 본문을 사용)"""
+    html: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    not_modified: bool
+    error_status: Optional[int] = None  # 실패했을 때 HTTP 상태 코드 (타임아웃/연결 오류면 None)
+
+
+async def fetch_naver_search_async(client: NaverHttpClient, keyword: str,
+                                   cached: Optional[SerpEntry] = None) -> SerpFetch:
+    """네이버 검색 HTML 가져오기 (cached의 ETag/Last-Modified가 있으면 조건부 요청)"""
+
+    params = {
+        'where': 'nexearch',
+        'query': keyword,
+    }
+    headers = SEARCH_HEADERS
+    if cached is not None and (cached.etag or cached.last_modified):
+        headers = dict(SEARCH_HEADERS)
+        if cached.etag:
+            headers['If-None-Match'] = cached.etag
+        if cached.last_modified:
+            headers['If-Modified-Since'] = cached.last_modified
+
+    try:
+        response = await client.get(
+            'https://search.naver.com/search.naver',
+            params=params,
+            cookies=NAVER_COOKIES,
+            headers=headers,
+            timeout=10
+        )
+        if response.status_code == 304 and cached is not None:
+            return SerpFetch('', cached.etag, cached.last_modified, True)
+        response.raise_for_status()
+        return SerpFetch(response.text, response.headers.get('etag'), response.headers.get('last-modified'), False)
+    except FetchError as e:
+        print(f"Error fetching Naver search page: {e}", file=sys.stderr)
+        return SerpFetch('', None, None, False, e.status_code)
+
+
+async def get_naver_search_html_async(client: NaverHttpClient, keyword: str) -> str:
+    """네이버 검색 HTML 가져오기 (쿠키/헤더 포함)"""
+    return (await fetch_naver_search_async(client, keyword)).html
+
+
+def get_naver_search_html(keyword: str) -> str:
+    """네이버 검색 HTML 가져오기 (동기 호환 래퍼)"""
+    return _run_sync(lambda client: get_naver_search_html_async(client, keyword))
+
+
+URL_BLOG_POST = 'blog_post'  # blog.naver.com 글 (blogId + postId)
+URL_BLOG = 'blog'            # blog.naver.com 이지만 글 번호가 없음 (블로그 홈 등)
+URL_IN_NAVER = 'in_naver'    # in.naver.com 콘텐츠 (해석이 필요한 링크)
+URL_OTHER = 'other'
+
+
+class UrlInfo(NamedTuple):
+    """classify_url 결과 (in_naver는 blogId=인플루언서 ID, postId=콘텐츠 ID)"""
+    kind: str
+    blogId: Optional[str]
+    postId: Optional[str]
+    canonical: Optional[str]
+
+
+_BLOG_PATH_RE = re.compile(r'blog\.naver\.com/([^/]+)/(\d+)')
+_BLOG_ID_PARAM_RE = re.compile(r'[?&;]blogId=([^&#]+)')
+_LOG_NO_PARAM_RE = re.compile(r'[?&;]logNo=(\d+)')
+_BLOG_HOME_RE = re.compile(r'blog\.naver\.com/([A-Za-z0-9_-]+)/?(?:[?#]|$)')
+_IN_NAVER_CONTENT_RE = re.compile(r'in\.naver\.com/([^/?#]+)/contents/(?:[A-Za-z]+/)?(\d+)')
+_OTHER_URL = UrlInfo(URL_OTHER, None, None, None)
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def classify_url(href: str) -> UrlInfo:
+    """href 하나를 (종류, blogId, postId, 정규 URL)로 분류 (미리 컴파일한 정규식, 결과 메모이즈)
+
+    blog.naver.com/m.blog.naver.com의 /blogId/postId 경로와 PostView.naver 등의 blogId/logNo
+    파라미터(순서 무관), in.naver.com 콘텐츠 링크를 처리합니다. 모든 추출 경로가 이 함수를 씁니다.
+    """
+    if 'blog.naver.com' in href:
+        match = _BLOG_PATH_RE.search(href)
+        if match:
+            blog_id, post_id = match.groups()
+        else:
+            blog_match = _BLOG_ID_PARAM_RE.search(href) or _BLOG_HOME_RE.search(href)
+            log_match = _LOG_NO_PARAM_RE.search(href)
+            blog_id = blog_match.group(1) if blog_match else None
+            post_id = log_match.group(1) if log_match else None
+        if blog_id and post_id:
+            blog_id = sys.intern(blog_id)
+            return UrlInfo(URL_BLOG_POST, blog_id, post_id, f'https://blog.naver.com/{blog_id}/{post_id}')
+        if blog_id:
+            blog_id = sys.intern(blog_id)
+            return UrlInfo(URL_BLOG, blog_id, None, f'https://blog.naver.com/{blog_id}')
+        return UrlInfo(URL_BLOG, None, None, None)
+
+    if 'in.naver.com' in href and '/contents/' in href:
+        match = _IN_NAVER_CONTENT_RE.search(href)
+        if match:
+            influencer_id, content_id = match.groups()
+            return UrlInfo(URL_IN_NAVER, influencer_id, content_id,
+                           f'https://in.naver.com/{influencer_id}/contents/internal/{content_id}')
+        return UrlInfo(URL_IN_NAVER, None, None, None)
+
+    return _OTHER_URL
+
+
+def parse_blog_url(url: str) -> Tuple[Optional[str], Optional[str]]:
+    """블로그 URL에서 blogId, postId 추출 (글 URL이 아니면 (None, None))"""
+    info = classify_url(url)
+    if info.kind == URL_BLOG_POST:
+        return info.blogId, info.postId
+    return None, None
+
+
+def parse_target(spec: str) -> Tuple[Optional[str], Optional[str]]:
+    """순위 확인 대상 → (blogId, postId), 모르는 쪽은 None
+
+    블로그 글/블로그 URL, "blogId/postId", "blogId", 숫자만 있는 postId를 받습니다.
+    그 밖의 URL(in.naver.com 링크 포함)이나 형식은 순위에 놓일 수 없으므로 ValueError를 냅니다.
+    """
+    spec = spec.strip()
+    if '://' in spec or 'blog.naver.com' in spec:
+        info = classify_url(spec)
+        if info.kind not in (URL_BLOG_POST, URL_BLOG) or not info.blogId:
+            raise ValueError(f'Invalid target (expected a blog.naver.com blog or post URL): {spec}')
+        return info.blogId, info.postId
+    if spec.isdigit():
+        return None, spec
+    blog_id, _, post_id = spec.partition('/')
+    if not blog_id or '/' in post_id or (post_id and not post_id.isdigit()):
+        raise ValueError(f'Invalid target (expected blogId, blogId/postId or postId): {spec}')
+    return blog_id, post_id or None
+
+
+# <a ... href="...blog.naver.com..."> 의 href 값 (큰따옴표/작은따옴표/따옴표 없음)
+_BLOG_HREF_BYTES_RE = re.compile(
+    rb'<a\b[^>]*?\shref\s*=\s*(?:"([^"]*blog\.naver\.com[^"]*)"|\'([^\']*blog\.naver\.com[^\']*)\'|'
+    rb'([^\s"\'>]*blog\.naver\.com[^\s>]*))',
+    re.I,
+)
+
+
+async def resolve_in_naver_fast_async(client: NaverHttpClient, in_url: str, headers: dict,
+                                      max_hops: int = 5) -> Optional[str]:
+    """리다이렉트만으로 in.naver.com 해석 (v13: 본문 전체 다운로드/DOM 생성 없음)
+
+    리다이렉트를 직접 따라가며 Location이 blog.naver.com을 가리키면 바로 반환하고,
+    리다이렉트가 아닌 응답은 본문을 스트리밍으로 읽다가 첫 blog.naver.com 링크에서 멈춥니다.
+    """
+    url = in_url
+    for _ in range(max_hops + 1):
+        scanned = await client.scan(url, _BLOG_HREF_BYTES_RE, headers=headers, timeout=3)
+        if scanned.location:
+            url = urllib.parse.urljoin(url, scanned.location)
+            if 'blog.naver.com' in url:
+                return url
+            continue
+        if 'blog.naver.com' in url:
+            return url
+        return scanned.match
+    return None
+
+
+async def _resolve_in_naver_full_async(client: NaverHttpClient, in_url: str, headers: dict) -> Optional[str]:
+    """본문 전체를 받아 파싱하는 기존 방식 (RESOLVE_MODE='full')"""
+    response = await client.get(in_url, headers=headers, timeout=3)
+
+    # 최종 리다이렉션된 URL이 blog.naver.com인지 확인
+    final_url = response.url
+    if 'blog.naver.com' in final_url:
+        return final_url
+
+    # HTML에서 blog.naver.com 링크 찾기
+    document = parse_html(response.text)
+    links = _lx_links(document) if _is_lxml_element(document) else document.find_all('a', href=True)
+    for a_tag in links:
+        href = a_tag.get('href')
+        if 'blog.naver.com' in href:
+            return href
+
+    return None
+
+
+async def extract_blog_from_in_naver_async(client: NaverHttpClient, in_url: str, headers: dict,
+                                           max_retries: int = 2) -> Optional[str]:
+    """in.naver.com 링크에서 실제 blog.naver.com URL 추출 (v12: timeout 5s→3s, retry logic added)
+
+    v13: 같은 콘텐츠 링크의 동시 해석은 client.single_flight에서 하나로 합쳐집니다.
+    """
+    return await client.single_flight.do(
+        ('inNaver', normalize_fetch_key(in_url)),
+        lambda: _extract_blog_from_in_naver_async(client, in_url, headers, max_retries),
+    )
+
+
+async def _extract_blog_from_in_naver_async(client: NaverHttpClient, in_url: str, headers: dict,
+                                            max_retries: int) -> Optional[str]:
+    resolve = resolve_in_naver_fast_async if RESOLVE_MODE == 'fast' else _resolve_in_naver_full_async
+    for attempt in range(max_retries + 1):
+        try:
+            return await resolve(client, in_url, headers)
+        except FetchTimeout:
+            if attempt < max_retries:
+                metric_count('redirectRetries')
+                continue  # Retry on timeout
+            print(f"Timeout extracting from {in_url} after {max_retries + 1} attempts", file=sys.stderr)
+            return None
+        except Exception as e:
+            print(f"Error extracting from {in_url}: {e}", file=sys.stderr)
+            return None
+    return None
+
+
+def extract_blog_from_in_naver(in_url: str, headers: dict, max_retries: int = 2) -> Optional[str]:
+    """in.naver.com 링크 해석 (동기 호환 래퍼)"""
+    return _run_sync(lambda client: extract_blog_from_in_naver_async(client, in_url, headers, max_retries))
+
+
+async def batch_extract_in_naver_urls_async(client: NaverHttpClient, in_urls: Set[str], headers: dict,
+                                            timeout: float = 30) -> Dict[str, str]:
+    """배치로 in.naver.com URL들을 blog.naver.com URL로 변환 (v13: 공유 클라이언트에서 동시 실행)
+
+    동시성은 클라이언트의 호스트별 제한이 결정하며, 배치 전체가 timeout을 넘기면
+    끝난 결과만 사용합니다 (v12의 as_completed(timeout=30)과 동일한 상한).
+    client.resolution_cache가 있으면 캐시에 없는 URL만 요청하고 결과를 저장합니다.
+
+    Returns:
+        Dict mapping in_url -> blog_url
+    """
+    url_map = {}
+    if not in_urls:
+        return url_map
+
+    with metric_stage('redirectBatch'):
+        return await _resolve_in_naver_batch(client, in_urls, headers, timeout, url_map)
+
+
+async def _resolve_in_naver_batch(client: NaverHttpClient, in_urls: Set[str], headers: dict,
+                                  timeout: float, url_map: Dict[str, str]) -> Dict[str, str]:
+    cache = client.resolution_cache
+    # 캐시는 키워드마다 다른 쿼리를 뺀 정규 URL로 찾고 저장 (같은 글은 키워드가 달라도 적중)
+    keys = {url: normalize_fetch_key(url) for url in in_urls}
+    to_resolve = set(in_urls)
+    if cache is not None:
+        urls_by_key: Dict[str, List[str]] = {}
+        for url, key in keys.items():
+            urls_by_key.setdefault(key, []).append(url)
+        cached, missing = cache.get_many(urls_by_key)
+        for key, blog_url in cached.items():
+            for url in urls_by_key[key]:
+                url_map[url] = blog_url
+        to_resolve = {url for key in missing for url in urls_by_key[key]}
+        metric_count('resolutionCacheHits', len(cached))
+        metric_count('resolutionCacheMisses', len(missing))
+        if not to_resolve:
+            return url_map
+
+    metric_count('redirectsResolved', len(to_resolve))
+    tasks = {
+        asyncio.ensure_future(extract_blog_from_in_naver_async(client, url, headers)): url
+        for url in to_resolve
+    }
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+    if pending:
+        print(f"Timeout resolving {len(pending)} in.naver.com URLs after {timeout}s", file=sys.stderr)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    resolved = {}
+    for task in done:
+        in_url = tasks[task]
+        try:
+            blog_url = task.result()
+            resolved[keys[in_url]] = blog_url
+            if blog_url:
+                url_map[in_url] = blog_url
+        except Exception as e:
+            print(f"Error processing {in_url}: {e}", file=sys.stderr)
+
+    if cache is not None:
+        cache.put_many(resolved)
+
+    return url_map
+
+
+def batch_extract_in_naver_urls(in_urls: Set[str], headers: dict, max_workers: int = 3) -> Dict[str, str]:
+    """배치 in.naver.com 해석 (동기 호환 래퍼, max_workers는 호스트별 동시 요청 수)"""
+    return _run_sync(
+        lambda client: batch_extract_in_naver_urls_async(client, in_urls, headers),
+        per_host_limit=max_workers,
+    )
+
+
+# 블로그 아이템 / 제목 / 미리보기 요소를 찾는 class 키워드 (소문자 비교)
+BLOG_ITEM_CLASS_KEYWORDS = (
+    'fds-article-simple-box',
+    'fds-comps-right-image-desktop',
+    'fds-ugc-body',
+    'api-blogr-body',
+    'blog-item',
+    'post-item'
+)
+TITLE_CLASS_KEYWORDS = ('title', 'headline', 'subject', 'name')
+PREVIEW_CLASS_KEYWORDS = ('desc', 'preview', 'text', 'content', 'dsc')
+
+
+def _link_title_parts(link) -> Tuple[str, str]:
+    """링크 텍스트와 aria-label/title 속성 (제목 후보)"""
+    return link.get_text(strip=True), link.get('aria-label', '') or link.get('title', '')
+
+
+def plan_blogs_from_container(container) -> Dict:
+    """컨테이너에서 블로그 추출 계획 생성 (DOM만 읽고 네트워크는 사용하지 않음)
+
+    in.naver.com 링크는 해석 전이라 후보로만 남겨두고, build_blogs_from_plan()이
+    해석 결과를 받아 v6/v10과 같은 우선순위로 최종 목록을 만듭니다.
+
+    Returns:
+        {'mode': 'links' | 'items', 'entries': [...], 'inNaverUrls': set}
+    """
+
+    if _is_lxml_element(container):
+        return _lx_plan_blogs_from_container(container)
+
+    # 1단계: 블로그 아이템 컨테이너 찾기
+    blog_items = container.find_all('div', class_=lambda x: x and any(
+        keyword in str(x).lower() for keyword in BLOG_ITEM_CLASS_KEYWORDS
+    ))
+
+    # 컨테이너를 못 찾으면 전체를 하나의 컨테이너로 처리
+    if not blog_items:
+        blog_items = [container]
+
+    # 2단계: in.naver.com URL 수집 (중복 제거)
+    in_naver_urls = set()
+    for item in blog_items:
+        for link in item.find_all('a', href=True):
+            href = link.get('href', '')
+            if classify_url(href).kind == URL_IN_NAVER:
+                in_naver_urls.add(href)
+
+    entries = []
+
+    # v10 FIX: influencer/location type (blog_items == 1) 처리
+    if len(blog_items) == 1 and blog_items[0] == container:
+        # 단일 컨테이너 내부의 모든 blog 링크 후보
+        for link in container.find_all('a', href=True):
+            href = link.get('href', '')
+
+            # 우선순위 1: blog.naver.com 직접 링크
+            info = classify_url(href)
+            if info.kind == URL_BLOG_POST:
+                direct = (info.blogId, info.postId)
+            elif info.kind == URL_BLOG:
+                continue
+            # 우선순위 2: in.naver.com 링크 (해석 후 사용)
+            elif href in in_naver_urls:
+                direct = None
+            else:
+                continue
+
+            title = link.get_text(strip=True) or link.get('aria-label', '') or link.get('title', '')
+            entries.append({'href': href, 'direct': direct, 'title': title})
+
+        return {'mode': 'links', 'entries': entries, 'inNaverUrls': in_naver_urls}
+
+    # 3단계: 각 블로그 아이템의 링크 후보와 제목/썸네일/미리보기 수집
+    for item in blog_items:
+        # 우선순위 1: blog.naver.com 직접 링크
+        direct = None
+        all_links = item.find_all('a', href=True)
+        for link in all_links:
+            href = link.get('href', '')
+            info = classify_url(href)
+            if info.kind == URL_BLOG_POST:
+                direct = (href, info.blogId, info.postId, _link_title_parts(link))
+                break
+
+        candidates = []
+        fallback = None
+        if not direct:
+            # 우선순위 2: in.naver.com 링크 (해석 결과로 결정)
+            candidates = [
+                (link.get('href', ''), _link_title_parts(link))
+                for link in all_links
+                if link.get('href', '') in in_naver_urls
+            ]
+
+            # 우선순위 3: title 클래스가 있는 링크
+            title_link = item.find('a', class_=lambda x: x and 'title' in str(x).lower())
+            if title_link:
+                href = title_link.get('href', '')
+                info = classify_url(href)
+                if info.kind == URL_BLOG_POST:
+                    fallback = (href, info.blogId, info.postId, _link_title_parts(title_link))
+
+            if not candidates and not fallback:
+                continue
+
+        # 제목 방법 1: title 관련 클래스명 찾기
+        title_text = ''
+        title_elem = item.find(['span', 'div', 'strong', 'h3', 'h4'], class_=lambda x: x and any(
+            keyword in str(x).lower() for keyword in TITLE_CLASS_KEYWORDS
+        ))
+        if title_elem:
+            title_text = title_elem.get_text(strip=True)
+
+        # 제목 방법 4: 아이템 내부의 첫 번째 텍스트 요소 (방법 1이 비었을 때만 필요)
+        fallback_text = ''
+        if not title_text:
+            for elem in item.find_all(['span', 'div', 'strong']):
+                text = elem.get_text(strip=True)
+                if text and len(text) > 5:
+                    fallback_text = text
+                    break
+
+        # 썸네일 추출
+        img = item.find('img')
+        thumbnail = None
+        if img:
+            thumbnail = img.get('src') or img.get('data-src') or img.get('data-lazy-src')
+
+        # 미리보기 텍스트 추출
+        preview = None
+        preview_elem = item.find(['span', 'div', 'p'], class_=lambda x: x and any(
+            keyword in str(x).lower() for keyword in PREVIEW_CLASS_KEYWORDS
+        ))
+        if preview_elem:
+            preview = preview_elem.get_text(strip=True)[:200]
+
+        entries.append({
+            'direct': direct,
+            'candidates': candidates,
+            'fallback': fallback,
+            'titleText': title_text,
+            'fallbackText': fallback_text,
+            'thumbnail': thumbnail,
+            'preview': preview,
+        })
+
+    return {'mode': 'items', 'entries': entries, 'inNaverUrls': in_naver_urls}
+
+
+class Blog(NamedTuple):
+    """추출된 블로그 글 하나 (필드명 = 출력 JSON 키, blogId는 intern된 문자열)"""
+    url: str
+    title: str
+    blogId: str
+    postId: str
+    thumbnail: Optional[str]
+    preview: Optional[str]
+
+    def to_dict(self) -> Dict[str, Optional[str]]:
+        return self._asdict()
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Blog':
+        """출력 JSON의 블로그 객체 → Blog (직전 결과 재사용용)"""
+        return cls(data['url'], data['title'], sys.intern(data['blogId']), data['postId'],
+                   data.get('thumbnail'), data.get('preview'))
+
+
+class Category(NamedTuple):
+    """감지된 스마트블록 카테고리에서 추출에 필요한 부분만 (DOM 참조 없음)"""
+    title: str
+    type: str
+    plan: Dict
+    moreLink: Optional[str]
+
+
+class CategoryResult(NamedTuple):
+    """카테고리 하나의 수집 결과"""
+    categoryTitle: str
+    categoryType: str
+    blogsInPreview: List[Blog]
+    moreLink: Optional[str]
+    morePageBlogs: List[Blog]
+    complete: bool = True  # False: target 모드에서 대상을 찾은 뒤 수집을 멈춤
+
+    @property
+    def total_blogs(self) -> int:
+        return len(self.blogsInPreview) + len(self.morePageBlogs)
+
+    def to_dict(self) -> dict:
+        data = {
+            'categoryTitle': self.categoryTitle,
+            'categoryType': self.categoryType,
+            'blogsInPreview': _blog_dicts(self.blogsInPreview),
+            'moreLink': self.moreLink,
+            'morePageBlogs': _blog_dicts(self.morePageBlogs),
+            'totalBlogsInMore': len(self.morePageBlogs)
+        }
+        if not self.complete:
+            data['partial'] = True
+        return data
+
+
+def _blog_dicts(blogs: Iterable[Blog]) -> List[Dict]:
+    return [blog.to_dict() for blog in blogs]
+
+
+def build_blogs_from_plan(plan: Dict, in_to_blog_map: Dict[str, str]) -> List[Blog]:
+    """추출 계획 + in.naver.com 해석 결과로 최종 블로그 목록 생성"""
+
+    blogs = []
+    seen_posts = set()  # (blogId, postId) 튜플로 중복 체크
+
+    if plan['mode'] == 'links':
+        for entry in plan['entries']:
+            if entry['direct']:
+                blog_url = entry['href']
+                blog_id, post_id = entry['direct']
+            else:
+                blog_url = in_to_blog_map.get(entry['href'])
+                if not blog_url:
+                    continue
+                blog_id, post_id = parse_blog_url(blog_url)
+                if not blog_id or not post_id:
+                    continue
+
+            # 중복 체크
+            post_key = (blog_id, post_id)
+            if post_key in seen_posts:
+                continue
+            seen_posts.add(post_key)
+
+            title = entry['title']
+            if not title or len(title) < 3:
+                title = f"블로그 포스트 ({blog_id})"
+
+            blogs.append(Blog(blog_url, title, sys.intern(blog_id), post_id, None, title))
+
+        return blogs
+
+    for entry in plan['entries']:
+        chosen = entry['direct']
+
+        if not chosen:
+            for href, title_parts in entry['candidates']:
+                blog_url = in_to_blog_map.get(href)
+                if blog_url:
+                    blog_id, post_id = parse_blog_url(blog_url)
+                    if blog_id and post_id:
+                        chosen = (blog_url, blog_id, post_id, title_parts)
+                        break
+
+        if not chosen:
+            chosen = entry['fallback']
+        if not chosen:
+            continue
+
+        blog_url, blog_id, post_id, (link_text, link_attr_title) = chosen
+
+        # 중복 체크
+        post_key = (blog_id, post_id)
+        if post_key in seen_posts:
+            continue
+        seen_posts.add(post_key)
+
+        # 제목: 클래스명 → 링크 텍스트 → aria-label/title → 첫 텍스트 요소
+        title = entry['titleText'] or link_text or link_attr_title or entry['fallbackText']
+
+        # 빈 제목 방지
+        if not title or len(title) < 3:
+            title = f"블로그 포스트 ({blog_id})"
+
+        # 제목이 너무 긴 경우 자르기
+        if len(title) > 100:
+            title = title[:97] + "..."
+
+        blogs.append(Blog(blog_url, title, sys.intern(blog_id), post_id, entry['thumbnail'], entry['preview']))
+
+    return blogs
+
+
+class RankIndex:
+    """순위 순서의 (blogId, postId) 목록 색인: 글/블로그/postId별 첫 순위 (1부터)
+
+    한 번 만들면 대상 수와 상관없이 대상마다 dict 조회 한 번으로 순위를 찾습니다.
+    """
+
+    __slots__ = ('by_post', 'by_blog', 'by_post_id')
+
+    def __init__(self, keys: Iterable[Tuple[str, str]]):
+        self.by_post: Dict[Tuple[str, str], int] = {}
+        self.by_blog: Dict[str, int] = {}
+        self.by_post_id: Dict[str, int] = {}
+        for rank, (blog_id, post_id) in enumerate(keys, 1):
+            self.by_post.setdefault((blog_id, post_id), rank)
+            self.by_blog.setdefault(blog_id, rank)
+            self.by_post_id.setdefault(post_id, rank)
+
+    def rank_of(self, key: Tuple[Optional[str], Optional[str]]) -> Optional[int]:
+        blog_id, post_id = key
+        if blog_id is None:
+            return self.by_post_id.get(post_id)
+        if post_id is None:
+            return self.by_blog.get(blog_id)
+        return self.by_post.get(key)
+
+
+class RankTargets:
+    """순위 확인 대상 블로그/글 목록 (target 모드)
+
+    대상이 모두 자리를 찾으면(placed) 카테고리 수집을 멈추므로, 결과의 블로그 목록은
+    대상 위치까지만 확정되고 대상들의 순위는 전체 수집과 같습니다. 같은 키워드를 여러
+    대상으로 확인할 때도 수집은 한 번이고, 순위는 카테고리별 RankIndex에서 찾습니다.
+    """
+
+    def __init__(self, specs: Iterable[str]):
+        self.specs = [spec for spec in specs if spec and spec.strip()]
+        self.keys = [parse_target(spec) for spec in self.specs]
+        for spec, key in zip(self.specs, self.keys):
+            if key == (None, None):
+                raise ValueError(f'Invalid target: {spec}')
+
+    def __bool__(self) -> bool:
+        return bool(self.keys)
+
+    def placed(self, blogs: Iterable[Blog]) -> bool:
+        """blogs 안에서 모든 대상을 찾았는지"""
+        index = RankIndex(blog_keys(blogs))
+        return all(index.rank_of(key) is not None for key in self.keys)
+
+    def report(self, categories: List[Dict]) -> List[Dict]:
+        """카테고리 결과 → 대상별 위치 (rank는 카테고리 안 1부터, 미리보기 다음 더보기 순)"""
+        reports = [
+            {'target': spec, 'blogId': blog_id, 'postId': post_id, 'found': False, 'ranks': []}
+            for spec, (blog_id, post_id) in zip(self.specs, self.keys)
+        ]
+        for category in categories:
+            ranking = category_ranking(category)
+            index = RankIndex(blog_keys(ranking))
+            preview_count = len(category['blogsInPreview'])
+            for report, key in zip(reports, self.keys):
+                rank = index.rank_of(key)
+                if rank is None:
+                    continue
+                report['found'] = True
+                report['ranks'].append({
+                    'categoryTitle': category['categoryTitle'],
+                    'categoryType': category['categoryType'],
+                    'rank': rank,
+                    'section': 'preview' if rank <= preview_count else 'more',
+                    'url': ranking[rank - 1]['url'],
+                })
+        return reports
+
+
+async def build_blogs_until_targets_async(client: NaverHttpClient, plan: Dict, targets: RankTargets,
+                                         headers: dict, wave_size: int = 4) -> Tuple[List[Blog], bool]:
+    """미리보기 블로그를 앞에서부터 in.naver.com을 wave_size개씩 해석하며 만들고, 대상을 모두 찾으면 멈춤
+
+    앞쪽 항목의 링크가 모두 해석된 구간만 목록으로 만들기 때문에 찾은 대상의 순위는
+    전체 해석 결과와 같습니다.
+
+    Returns:
+        (블로그 목록, 모든 항목을 해석했는지)
+    """
+    entries = plan['entries']
+    if plan['mode'] == 'links':
+        entry_urls = [[] if entry['direct'] else [entry['href']] for entry in entries]
+    else:
+        entry_urls = [[] if entry['direct'] else [href for href, _ in entry['candidates']] for entry in entries]
+    ordered = list(dict.fromkeys(url for urls in entry_urls for url in urls))
+
+    in_to_blog_map: Dict[str, str] = {}
+    attempted: Set[str] = set()
+    ready = 0
+    while True:
+        while ready < len(entries) and all(url in attempted for url in entry_urls[ready]):
+            ready += 1
+        blogs = build_blogs_from_plan(dict(plan, entries=entries[:ready]), in_to_blog_map)
+        if ready == len(entries):
+            return blogs, True
+        if targets.placed(blogs):
+            metric_count('targetEarlyExits')
+            return blogs, False
+        wave = [url for url in ordered if url not in attempted][:wave_size]
+        attempted.update(wave)
+        in_to_blog_map.update(await batch_extract_in_naver_urls_async(client, set(wave), headers))
+
+
+class ParsePool:
+    """HTML 파싱 전용 프로세스 풀 (v13)
+
+    GIL 때문에 이벤트 루프 스레드에서는 한 코어만 쓰이므로, 검색 페이지/더보기 페이지/lb_api
+    조각의 파싱을 별도 프로세스에서 실행합니다. 작업에는 원본 바이트만 보내고 결과로는
+    DOM 없이 추출 계획(plan)과 문자열만 돌려받습니다. 작업 프로세스는 처음 쓸 때 spawn으로 띄우며
+    (이벤트 루프/스레드가 있는 프로세스를 fork하지 않도록), 풀은 만든 쪽이 close()로 닫습니다.
+    작업 프로세스에서 잰 스테이지 지표(previewPlan 등)는 결과와 함께 받아 현재 지표에 합칩니다.
+    """
+
+    def __init__(self, processes: Optional[int] = None):
+        self.processes = max(1, processes or os.cpu_count() or 1)
+        self.tasks = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        if self._executor is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            self._executor = ProcessPoolExecutor(max_workers=self.processes,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+        self.tasks += 1
+        loop = asyncio.get_running_loop()
+        metrics = _CURRENT_METRICS.get()
+        if metrics is None:
+            return await loop.run_in_executor(self._executor, fn, *args)
+        result, child_metrics = await loop.run_in_executor(self._executor, _run_measured, fn, args)
+        metrics.merge(child_metrics)
+        return result
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+def _decode_html(content: bytes, encoding: str) -> str:
+    try:
+        return content.decode(encoding, errors='replace')
+    except LookupError:
+        return content.decode('utf-8', errors='replace')
+
+
+def plan_html_document(content: bytes, encoding: str = 'utf-8', backend: Optional[str] = None) -> Dict:
+    """HTML 문서 전체의 추출 계획 (ParsePool 작업으로도 실행)"""
+    return plan_blogs_from_container(parse_html(_decode_html(content, encoding), backend))
+
+
+def detect_categories_compact(html: str, backend: Optional[str] = None) -> Tuple[List[Category], str]:
+    """검색 페이지 → 카테고리별 Category(제목/종류/추출 계획/더보기 링크)와 스마트블록 지문
+
+    DOM은 이 함수 안에서만 쓰고 돌려주지 않으므로, 반환 직후 파싱 트리를 해제할 수 있습니다
+    (bs4 트리는 부모/자식 순환 참조라 decompose()로 직접 끊음).
+    """
+    categories_info = detect_smartblock_categories(html, backend=backend)
+    categories = []
+    for cat_info in categories_info:
+        container = cat_info['container']
+        with metric_stage('previewPlan'):
+            plan = plan_blogs_from_container(container)
+        with metric_stage('moreLinkDiscovery'):
+            more_link = find_more_link(container)
+        categories.append(Category(cat_info['title'], cat_info['type'], plan, more_link))
+    fingerprint = smartblock_fingerprint(categories_info, [category.moreLink for category in categories])
+
+    if categories_info and not _is_lxml_element(categories_info[0]['container']):
+        soup = categories_info[0]['container']
+        while soup.parent is not None:
+            soup = soup.parent
+        soup.decompose()
+    return categories, fingerprint
+
+
+def parse_serp_document(content: bytes, encoding: str = 'utf-8',
+                        backend: Optional[str] = None) -> Tuple[List[Category], str]:
+    """ParsePool 작업: 검색 페이지 원본 바이트 → detect_categories_compact 결과"""
+    return detect_categories_compact(_decode_html(content, encoding), backend)
+
+
+async def extract_blogs_from_html_async(client: NaverHttpClient, content: bytes, encoding: str,
+                                        headers: dict) -> List[Blog]:
+    """HTML 문서 전체에서 블로그 추출 (client.parse_pool이 있으면 파싱은 프로세스 풀에서)"""
+    if client.parse_pool is not None:
+        plan = await client.parse_pool.run(plan_html_document, content, encoding, HTML_PARSER_BACKEND)
+    else:
+        plan = plan_html_document(content, encoding)
+    in_to_blog_map = await batch_extract_in_naver_urls_async(client, plan['inNaverUrls'], headers)
+    return build_blogs_from_plan(plan, in_to_blog_map)
+
+
+async def extract_blogs_from_container_async(client: NaverHttpClient, container, headers: dict) -> List[Blog]:
+    """컨테이너에서 블로그 목록 추출 (v13 - 계획 → in.naver.com 동시 해석 → 생성)"""
+    plan = plan_blogs_from_container(container)
+    in_to_blog_map = await batch_extract_in_naver_urls_async(client, plan['inNaverUrls'], headers)
+    return build_blogs_from_plan(plan, in_to_blog_map)
+
+
+def extract_blogs_from_container(container, headers: dict) -> List[Dict]:
+    """컨테이너에서 블로그 목록 추출 (v6 - 배치 최적화)
+
+    3단계 프로세스:
+    1. 모든 고유 in.naver.com/contents URL 수집
+    2. 배치로 blog.naver.com URL 추출
+    3. blog_items와 매칭하여 제목/썸네일 추출
+    """
+    plan = plan_blogs_from_container(container)
+    in_to_blog_map = {}
+    if plan['inNaverUrls']:
+        in_to_blog_map = batch_extract_in_naver_urls(plan['inNaverUrls'], headers)
+    return _blog_dicts(build_blogs_from_plan(plan, in_to_blog_map))
+
+
+def lb_api_page_url(api_url: str, page: int) -> str:
+    """lb_api URL의 page번째 페이지 URL (start = 1 + (page - 1) * display, 나머지 파라미터는 그대로)"""
+    parts = urllib.parse.urlsplit(api_url)
+    query = urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+    display = next((int(value) for name, value in query if name == 'display' and value.isdigit()), 10)
+    start = str(1 + (page - 1) * display)
+    if any(name == 'start' for name, _ in query):
+        query = [(name, start if name == 'start' else value) for name, value in query]
+    else:
+        query.append(('start', start))
+    return urllib.parse.urlunsplit(parts._replace(query=urllib.parse.urlencode(query)))
+
+
+async def _fetch_lb_api_page_blogs(client: NaverHttpClient, api_url: str, cookies: dict,
+                                   headers: dict) -> List[Blog]:
+    """lb_api 한 페이지 호출 후 dom.collection[0].html에서 블로그 추출"""
+    metric_count('lbApiPages')
+    response = await client.get(api_url, cookies=cookies, headers=headers, timeout=15)
+    response.raise_for_status()
+
+    # JSON 파싱
+    data = response.json()
+
+    # dom.collection[0].html에서 HTML 추출
+    if 'dom' in data and 'collection' in data['dom']:
+        collection = data['dom']['collection']
+        if isinstance(collection, list) and len(collection) > 0:
+            html_content = collection[0].get('html', '')
+            if html_content:
+                return await extract_blogs_from_html_async(client, html_content.encode('utf-8'), 'utf-8', headers)
+    return []
+
+
+async def scrape_lb_api_more_page_async(client: NaverHttpClient, lb_api_url: str, cookies: dict,
+                                        headers: dict, max_pages: Optional[int] = None,
+                                        parallel_pages: int = 4,
+                                        stop: Optional[Callable[[List[Blog]], bool]] = None) -> List[Blog]:
+    """lb_api URL에서 블로그 목록 크롤링 (ugc_list 카테고리용)
+
+    v13: 1페이지를 받은 뒤 2..max_pages 페이지를 parallel_pages개씩 동시에 요청하고,
+    페이지 순서대로 (blogId, postId) 중복 제거하며 합칩니다. 새 글이 하나도 없는
+    페이지(또는 실패한 페이지)를 만나면 거기서 멈춥니다.
+    stop(지금까지의 목록)이 True를 돌려주면 남은 페이지를 요청하지 않습니다 (target 모드).
+    stop이 없으면 같은 lb_api의 동시 수집은 client.single_flight에서 하나로 합쳐집니다.
+    """
+
+    max_pages = max_pages or LB_API_MAX_PAGES
+    if stop is None:
+        return list(await client.single_flight.do(
+            ('lbApi', normalize_fetch_key(lb_api_url), max_pages),
+            lambda: _scrape_lb_api_more_page_async(client, lb_api_url, cookies, headers, max_pages, parallel_pages),
+        ))
+    return await _scrape_lb_api_more_page_async(client, lb_api_url, cookies, headers, max_pages, parallel_pages, stop)
+
+
+async def _scrape_lb_api_more_page_async(client: NaverHttpClient, lb_api_url: str, cookies: dict,
+                                         headers: dict, max_pages: int, parallel_pages: int,
+                                         stop: Optional[Callable[[List[Blog]], bool]] = None) -> List[Blog]:
+    all_blogs = []
+    seen_posts = set()
+
+    def merge(page_blogs: List[Blog]) -> int:
+        # 중복 제거하면서 추가, 새로 추가된 글 수 반환
+        added = 0
+        for blog in page_blogs:
+            post_key = (blog.blogId, blog.postId)
+            if post_key not in seen_posts:
+                seen_posts.add(post_key)
+                all_blogs.append(blog)
+                added += 1
+        return added
+
+    try:
+        # lb_api URL 디코딩
+        if lb_api_url.startswith('#lb_api='):
+            api_url = urllib.parse.unquote(lb_api_url.split('#lb_api=', 1)[1])
+        else:
+            api_url = lb_api_url
+
+        page_blogs = await _fetch_lb_api_page_blogs(client, api_url, cookies, headers)
+        merge(page_blogs)
+        print(f'lb_api에서 {len(page_blogs)}개 블로그 추출 (중복 제거 후: {len(all_blogs)}개)', file=sys.stderr)
+
+        next_page = 2
+        if stop is not None and stop(all_blogs):
+            return all_blogs
+        while all_blogs and next_page <= max_pages:
+            pages = range(next_page, min(max_pages, next_page + parallel_pages - 1) + 1)
+            tasks = [
+                asyncio.ensure_future(_fetch_lb_api_page_blogs(client, lb_api_page_url(api_url, page), cookies, headers))
+                for page in pages
+            ]
+            try:
+                for page, task in zip(pages, tasks):
+                    try:
+                        added = merge(await task)
+                    except Exception as e:
+                        print(f'lb_api {page}페이지 실패: {e}', file=sys.stderr)
+                        added = 0
+                    if not added:
+                        print(f'lb_api {page}페이지에 새 글 없음, 페이지네이션 종료 (총 {len(all_blogs)}개)', file=sys.stderr)
+                        return all_blogs
+                    if stop is not None and stop(all_blogs):
+                        return all_blogs
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+            next_page = pages[-1] + 1
+
+        print(f'lb_api {min(max_pages, next_page - 1)}페이지까지 {len(all_blogs)}개 블로그 추출', file=sys.stderr)
+
+    except Exception as e:
+        print(f'Error scraping lb_api {lb_api_url[:50]}...: {e}', file=sys.stderr)
+
+    return all_blogs
+
+
+def scrape_lb_api_more_page(lb_api_url: str, cookies: dict, headers: dict, max_pages: Optional[int] = None) -> List[Dict]:
+    """lb_api 크롤링 (동기 호환 래퍼)"""
+    return _blog_dicts(_run_sync(
+        lambda client: scrape_lb_api_more_page_async(client, lb_api_url, cookies, headers, max_pages)
+    ))
+
+
+class BrowserPool:
+    """ugc_list fallback용 Playwright 브라우저 풀 (v13)
+
+    headless Chromium 하나를 띄워 두고 최대 size개의 BrowserContext를 카테고리/키워드 사이에서
+    재사용합니다. 이미지/폰트/미디어 요청은 라우팅에서 막고, 컨텍스트는 max_uses번 쓰면
+    닫고 새로 만듭니다. 첫 사용 때 브라우저를 띄우며, aclose() 뒤에 다시 쓰면 새로 띄웁니다.
+    """
+
+    BLOCKED_RESOURCE_TYPES = frozenset({'image', 'font', 'media'})
+
+    def __init__(self, size: int = 2, max_uses: int = 20, headless: bool = True,
+                 user_agent: Optional[str] = None):
+        self.size = max(1, size)
+        self.max_uses = max(1, max_uses)
+        self.headless = headless
+        self.user_agent = user_agent or DEFAULT_HEADERS.get('User-Agent')
+        self.stats = {'launches': 0, 'contextsCreated': 0, 'contextsRecycled': 0, 'pagesServed': 0}
+        self._reset()
+
+    def _reset(self) -> None:
+        self._playwright = None
+        self._browser = None
+        self._idle: List[Tuple[Any, int]] = []  # (BrowserContext, 사용 횟수)
+        self._slots = asyncio.Semaphore(self.size)
+        self._lock = asyncio.Lock()
+
+    async def _route(self, route) -> None:
+        if route.request.resource_type in self.BLOCKED_RESOURCE_TYPES:
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _checkout(self) -> Tuple[Any, int]:
+        async with self._lock:
+            if self._browser is None or not self._browser.is_connected():
+                from playwright.async_api import async_playwright
+                if self._playwright is None:
+                    self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(headless=self.headless)
+                self._idle = []
+                self.stats['launches'] += 1
+            if self._idle:
+                return self._idle.pop()
+            context = await self._browser.new_context(
+                user_agent=self.user_agent,
+                viewport={"width": 1920, "height": 1080}
+            )
+            await context.route('**/*', self._route)
+            self.stats['contextsCreated'] += 1
+            return context, 0
+
+    @contextlib.asynccontextmanager
+    async def page(self):
+        """풀의 컨텍스트에서 새 페이지를 열어 넘겨주고, 끝나면 페이지만 닫고 컨텍스트는 반납"""
+        async with self._slots:
+            context, uses = await self._checkout()
+            page = await context.new_page()
+            self.stats['pagesServed'] += 1
+            healthy = False
+            try:
+                yield page
+                healthy = True
+            finally:
+                try:
+                    await page.close()
+                except Exception:
+                    healthy = False
+                uses += 1
+                if healthy and uses < self.max_uses and self._browser is not None and self._browser.is_connected():
+                    self._idle.append((context, uses))
+                else:
+                    self.stats['contextsRecycled'] += 1
+                    try:
+                        await context.close()
+                    except Exception:
+                        pass
+
+    async def aclose(self) -> None:
+        for context, _ in self._idle:
+            try:
+                await context.close()
+            except Exception:
+                pass
+        if self._browser is not None:
+            await self._browser.close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+        self._reset()
+
+
+# Playwright 페이지에서 블로그 결과가 렌더링되었는지 판단하는 셀렉터
+UGC_BLOG_LINK_SELECTOR = 'a[href*="blog.naver.com"]'
+
+UGC_MORE_BUTTON_SELECTORS = [
+    "a:has-text('더보기')",
+    ".fds-comps-more-button-no-border a",
+    "button:has-text('더보기')",
+    "[aria-label*='더보기']"
+]
+
+
+async def scrape_ugc_list_with_playwright_async(client: NaverHttpClient, more_link: str, keyword: str,
+                                                headers: dict, max_pages: int = 2) -> List[Blog]:
+    """Phase 2: Playwright를 사용한 ugc_list 카테고리 크롤링 (lb_api fallback)
+
+    v13: client.browser_pool의 headless 컨텍스트를 재사용하고, 고정 sleep 대신
+    블로그 링크 셀렉터가 나타나거나 늘어날 때까지만 기다립니다.
+    """
+
+    all_blogs = []
+    seen_posts = set()
+
+    try:
+        # lb_api URL을 검색 URL로 변환 (keyword로 새로 검색하는 것이 안전함)
+        if more_link.startswith("#lb_api="):
+            search_url = f"https://search.naver.com/search.naver?where=blog&query={urllib.parse.quote(keyword)}"
+        else:
+            search_url = more_link if more_link.startswith("http") else f"https://search.naver.com{more_link}"
+
+        print(f"Playwright 크롤링 시작 (브라우저 풀): {search_url[:80]}...", file=sys.stderr)
+
+        from bs4 import BeautifulSoup
+        from playwright.async_api import TimeoutError as PlaywrightTimeout
+
+        async with client.browser_pool.page() as page:
+            # 네이버 검색 결과 페이지 이동 (networkidle 대신 DOM 준비 후 셀렉터 대기)
+            await page.goto(search_url, wait_until="domcontentloaded", timeout=30000)
+
+            # 페이지별 크롤링
+            for page_num in range(1, max_pages + 1):
+                print(f"Playwright 페이지 {page_num} 크롤링 중...", file=sys.stderr)
+
+                try:
+                    await page.wait_for_selector(UGC_BLOG_LINK_SELECTOR, timeout=10000)
+                except PlaywrightTimeout:
+                    print(f"블로그 링크가 나타나지 않아 페이지 {page_num}에서 중단", file=sys.stderr)
+                    break
+
+                # 현재 페이지 HTML 추출
+                soup = BeautifulSoup(await page.content(), "lxml")
+
+                # 블로그 컨테이너 찾기
+                containers = soup.find_all(["div", "section"], class_=lambda x: x and any(
+                    keyword in str(x) for keyword in ["blog", "total", "lst", "api_subject"]
+                ))
+
+                page_blogs = []
+                for container in containers:
+                    container_blogs = await extract_blogs_from_container_async(client, container, headers)
+                    for blog in container_blogs:
+                        post_key = (blog.blogId, blog.postId)
+                        if post_key not in seen_posts:
+                            seen_posts.add(post_key)
+                            page_blogs.append(blog)
+                            all_blogs.append(blog)
+
+                print(f"페이지 {page_num}에서 {len(page_blogs)}개 신규 블로그 추출", file=sys.stderr)
+
+                if page_num == max_pages:
+                    break
+
+                # 다음 페이지: "더보기" 버튼 클릭 후 블로그 링크 수가 늘어날 때까지 대기
+                link_count = await page.locator(UGC_BLOG_LINK_SELECTOR).count()
+                button_found = False
+                for selector in UGC_MORE_BUTTON_SELECTORS:
+                    button = page.locator(selector).first
+                    try:
+                        if not await button.is_visible():
+                            continue
+                        await button.click(timeout=3000)
+                    except Exception:
+                        continue
+                    button_found = True
+                    print(f"더보기 버튼 클릭 성공: {selector}", file=sys.stderr)
+                    break
+
+                if not button_found:
+                    print(f"더보기 버튼을 찾을 수 없어 페이지 {page_num}에서 중단", file=sys.stderr)
+                    break
+
+                try:
+                    await page.wait_for_function(
+                        "([selector, count]) => document.querySelectorAll(selector).length > count",
+                        arg=[UGC_BLOG_LINK_SELECTOR, link_count], timeout=10000
+                    )
+                except PlaywrightTimeout:
+                    print(f"더보기 후 새 결과가 없어 페이지 {page_num}에서 중단", file=sys.stderr)
+                    break
+
+        print(f"Playwright 크롤링 완료: 총 {len(all_blogs)}개 블로그 추출", file=sys.stderr)
+
+    except Exception as e:
+        print(f"Playwright 크롤링 실패: {e}", file=sys.stderr)
+        import traceback
+        traceback.print_exc()
+
+    return all_blogs
+
+
+def scrape_ugc_list_with_playwright(more_link: str, keyword: str, headers: dict, headless: bool = True,
+                                    max_pages: int = 2) -> List[Dict]:
+    """Playwright ugc_list 크롤링 (동기 호환 래퍼, 호출마다 임시 브라우저 풀 사용)"""
+    return _blog_dicts(_run_sync(
+        lambda client: scrape_ugc_list_with_playwright_async(client, more_link, keyword, headers, max_pages),
+        browser_pool=BrowserPool(size=1, headless=headless),
+    ))
+
+def find_more_link(container) -> Optional[str]:
+    """더보기 링크 찾기 (influencer + ugc_list 카테고리 지원)"""
+
+    if _is_lxml_element(container):
+        return _lx_find_more_link(container)
+
+    # 방법 1: container 내부에서 직접 찾기 (influencer 카테고리)
+    # "더보기" 텍스트가 있는 링크 찾기
+    more_link = container.find('a', string=lambda x: x and '더보기' in x)
+    if more_link:
+        return more_link.get('href')
+
+    # 클래스명으로 찾기
+    more_link = container.find('a', class_=lambda x: x and 'more' in str(x).lower())
+    if more_link:
+        return more_link.get('href')
+
+    # title 속성으로 찾기
+    more_link = container.find('a', title=lambda x: x and '더보기' in x)
+    if more_link:
+        return more_link.get('href')
+
+    # aria-label로 찾기
+    more_link = container.find('a', attrs={'aria-label': lambda x: x and '더보기' in x})
+    if more_link:
+        return more_link.get('href')
+
+    # 방법 2: parent section에서 ugc_list footer 찾기
+    parent_section = container.find_parent(['div', 'section'])
+    if parent_section:
+        # fds-comps-footer-full-container 찾기
+        footer = parent_section.find('div', class_=lambda x: x and 'fds-comps-footer-full-container' in str(x))
+        if footer:
+            # fds-comps-more-button-no-border 찾기
+            more_button = footer.find('div', class_=lambda x: x and 'fds-comps-more-button-no-border' in str(x))
+            if more_button:
+                link = more_button.find('a', href=True)
+                if link:
+                    href = link.get('href')
+                    if href:  # lb_api URL도 포함
+                        print(f'Found ugc_list more link in footer: {href[:80]}...', file=sys.stderr)
+                        return href
+
+    return None
+
+
+async def scrape_more_page_async(client: NaverHttpClient, more_url: str, cookies: dict, headers: dict) -> List[Blog]:
+    """더보기 페이지의 전체 블로그 목록 스크래핑 (같은 페이지의 동시 요청은 client.single_flight에서 합침)"""
+    return list(await client.single_flight.do(
+        ('morePage', normalize_fetch_key(more_url)),
+        lambda: _scrape_more_page_async(client, more_url, cookies, headers),
+    ))
+
+
+async def _scrape_more_page_async(client: NaverHttpClient, more_url: str, cookies: dict, headers: dict) -> List[Blog]:
+    try:
+        response = await client.get(more_url, cookies=cookies, headers=headers, timeout=10)
+        response.raise_for_status()
+
+        # extract_blogs_from_container와 같은 계획/생성 단계 재사용
+        return await extract_blogs_from_html_async(client, response.content, response.encoding, headers)
+
+    except Exception as e:
+        print(f"Error scraping more page {more_url}: {e}", file=sys.stderr)
+        return []
+
+
+def scrape_more_page(more_url: str, cookies: dict, headers: dict) -> List[Dict]:
+    """더보기 페이지 스크래핑 (동기 호환 래퍼)"""
+    return _blog_dicts(_run_sync(lambda client: scrape_more_page_async(client, more_url, cookies, headers)))
+
+
+class ClassTokenIndex:
+    """검색 페이지 DOM을 한 번만 순회해 만든 class 토큰 → 요소 인덱스
+
+    요소마다 문서 순서(order)와 마지막 자손의 순서를 기록해 두므로
+    "이 요소 안에서 조건에 맞는 첫 요소" 같은 하위 트리 질의도 전체 순회 없이 처리합니다.
+    class 조건은 bs4의 class_ 매칭과 같게 토큰 단위로 비교합니다.
+    """
+
+    def __init__(self, soup):
+        from bs4 import Tag
+
+        self.elements: List[Tag] = []
+        self.spans: Dict[int, Tuple[int, int]] = {}  # id(tag) -> (order, 마지막 자손 order)
+        self.by_token: Dict[str, List[int]] = {}
+        self.json_scripts: List[Tag] = []
+        self._lowered_tokens: Optional[List[Tuple[str, str]]] = None
+        self._query_cache: Dict[Tuple, List[int]] = {}
+
+        stack = [(soup, -1, iter(soup.contents))]
+        while stack:
+            _, _, children = stack[-1]
+            for child in children:
+                if isinstance(child, Tag):
+                    order = len(self.elements)
+                    self.elements.append(child)
+                    for token in child.get('class') or ():
+                        self.by_token.setdefault(token, []).append(order)
+                    if child.name == 'script' and child.get('type') == 'application/json':
+                        self.json_scripts.append(child)
+                    stack.append((child, order, iter(child.contents)))
+                    break
+            else:
+                tag, order, _ = stack.pop()
+                if order >= 0:
+                    self.spans[id(tag)] = (order, len(self.elements) - 1)
+
+    def _orders(self, names: Optional[Tuple[str, ...]], token: Optional[str],
+                contains: Optional[Tuple[str, ...]], lower: bool) -> List[int]:
+        """조건에 맞는 요소들의 문서 순서 목록 (정렬됨, 질의별 캐시)"""
+        key = (names, token, contains, lower)
+        cached = self._query_cache.get(key)
+        if cached is not None:
+            return cached
+
+        if token is not None:
+            orders = set(self.by_token.get(token, ()))
+        else:
+            if self._lowered_tokens is None:
+                self._lowered_tokens = [(t, t.lower()) for t in self.by_token]
+            orders = set()
+            for original, lowered in self._lowered_tokens:
+                haystack = lowered if lower else original
+                if any(keyword in haystack for keyword in contains):
+                    orders.update(self.by_token[original])
+
+        if names is not None:
+            orders = {order for order in orders if self.elements[order].name in names}
+        result = sorted(orders)
+        self._query_cache[key] = result
+        return result
+
+    def find_all(self, names: Optional[Tuple[str, ...]] = None, token: Optional[str] = None,
+                 contains: Optional[Tuple[str, ...]] = None, lower: bool = False) -> List[Tag]:
+        """문서 전체에서 class 토큰 조건에 맞는 요소 (soup.find_all과 같은 문서 순서)
+
+        token: class 토큰이 정확히 일치, contains: 토큰에 키워드 중 하나가 포함 (lower=True면 소문자 비교)
+        """
+        return [self.elements[order] for order in self._orders(names, token, contains, lower)]
+
+    def find_within(self, ancestor: Tag, names: Optional[Tuple[str, ...]] = None, token: Optional[str] = None,
+                    contains: Optional[Tuple[str, ...]] = None, lower: bool = False) -> Optional[Tag]:
+        """ancestor의 자손 중 조건에 맞는 첫 요소 (ancestor.find와 같은 결과)"""
+        span = self.spans.get(id(ancestor))
+        if span is None:
+            return None
+        start, end = span
+        orders = self._orders(names, token, contains, lower)
+        position = bisect.bisect_right(orders, start)
+        if position < len(orders) and orders[position] <= end:
+            return self.elements[orders[position]]
+        return None
+
+
+SECTION_CLASS_KEYWORDS = ('fds-info-section', 'api-subject-bx', 'section')
+
+# JSON 안의 '브랜드 콘텐츠'는 원문 그대로이거나 \uXXXX 이스케이프로만 표현될 수 있음
+BRAND_CONTENT_TEXT = '브랜드 콘텐츠'
+
+
+def _find_brand_content(obj) -> Optional[str]:
+    """JSON 객체에서 '브랜드 콘텐츠'가 들어간 content 필드 찾기"""
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            if key == 'content' and isinstance(value, str) and BRAND_CONTENT_TEXT in value:
+                return value
+            result = _find_brand_content(value)
+            if result:
+                return result
+    elif isinstance(obj, list):
+        for item in obj:
+            result = _find_brand_content(item)
+            if result:
+                return result
+    return None
+
+
+def detect_smartblock_categories(html: str, backend: Optional[str] = None) -> List[Dict]:
+    """스마트블록 카테고리 감지 및 정보 추출 (v13: DOM 1회 순회 + class 토큰 인덱스)
+
+    backend='lxml'(또는 HTML_PARSER_BACKEND)이면 BeautifulSoup 없이 lxml 문서에서 감지하며,
+    이때 카테고리의 container는 lxml 요소입니다.
+    """
+
+    if (backend or HTML_PARSER_BACKEND) == 'lxml':
+        return _lx_detect_smartblock_categories(parse_html_lxml(html))
+
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'lxml')
+    index = ClassTokenIndex(soup)
+    categories = []
+    seen_containers = set()
+
+    # 전략 0: fds-ugc-block-mod-list 직접 타겟팅 (최우선)
+    ugc_list_containers = index.find_all(('div',), contains=('fds-ugc-block-mod-list',))
+
+    for container in ugc_list_containers:
+        container_id = id(container)
+        if container_id in seen_containers:
+            continue
+        seen_containers.add(container_id)
+
+        # 제목 찾기
+        title = "스마트블록"
+        parent_section = container.find_parent(['div', 'section'], class_=lambda x: x and any(
+            keyword in str(x).lower() for keyword in SECTION_CLASS_KEYWORDS
+        ))
 
         if parent_section:
-            headline = parent_section.find(['span', 'h2', 'h3', 'strong'], class_=lambda x: x and any(
-                keyword in str(x).lower() for keyword in ['headline', 'title', 'subject', 'header']
-            ))
+            headline = index.find_within(parent_section, ('span', 'h2', 'h3', 'strong'),
+                                         contains=('headline', 'title', 'subject', 'header'), lower=True)
             if headline:
                 title = headline.get_text(strip=True)
 
@@ -603,27 +2836,26 @@ def detect_smartblock_categories(html: str) -> List[Dict]:
     # 전략 1: sds-comps 클래스 (리빙 인플루언서) - v10 FIX: 컨테이너 단위로 감지
     # 개별 headline이 아닌 전체 컨테이너를 찾아서 카테고리로 인식
     # 최상위 sds-comps 컨테이너만 찾기 (너무 많은 중첩 div 방지)
-    influencer_containers = soup.find_all('div', class_='fds-ugc-influencer')
+    influencer_containers = index.find_all(('div',), token='fds-ugc-influencer')
     for container in influencer_containers:
         container_id = id(container)
         if container_id in seen_containers:
             continue
 
         # 컨테이너 내부에 headline이 있는지 확인
-        first_headline = container.find('span', class_='sds-comps-text-type-headline1')
+        first_headline = index.find_within(container, ('span',), token='sds-comps-text-type-headline1')
         if not first_headline:
             continue
 
         # 카테고리 제목: 상위 섹션의 제목 또는 기본값
         title = "리빙 인플루언서 콘텐츠"
         parent_section = container.find_parent(['div', 'section'], class_=lambda x: x and any(
-            keyword in str(x).lower() for keyword in ['fds-info-section', 'api-subject-bx', 'section']
+            keyword in str(x).lower() for keyword in SECTION_CLASS_KEYWORDS
         ))
 
         if parent_section:
-            section_title = parent_section.find(['h2', 'h3', 'strong', 'span'], class_=lambda x: x and any(
-                keyword in str(x).lower() for keyword in ['headline', 'title', 'subject']
-            ))
+            section_title = index.find_within(parent_section, ('h2', 'h3', 'strong', 'span'),
+                                              contains=('headline', 'title', 'subject'), lower=True)
             if section_title:
                 title = section_title.get_text(strip=True)
 
@@ -635,7 +2867,7 @@ def detect_smartblock_categories(html: str) -> List[Dict]:
         })
 
     # 전략 2: fds-comps-footer-more-subject (지역 기반)
-    location_blocks = soup.find_all('span', class_='fds-comps-footer-more-subject')
+    location_blocks = index.find_all(('span',), token='fds-comps-footer-more-subject')
     for block in location_blocks:
         title = block.get_text(strip=True)
         container = block.find_parent('div', class_=lambda x: x and 'fds-comps' in str(x))
@@ -649,228 +2881,1828 @@ def detect_smartblock_categories(html: str) -> List[Dict]:
                     'container': container
                 })
 
-    # 전략 3: fds-comps-header-headline (일반 스마트블록)
-    general_blocks = soup.find_all('span', class_='fds-comps-header-headline')
-    for block in general_blocks:
-        title = block.get_text(strip=True)
-        container = block.find_parent('div', class_=lambda x: x and 'fds-comps' in str(x))
-        if container:
-            container_id = id(container)
-            if container_id not in seen_containers:
-                seen_containers.add(container_id)
-                categories.append({
-                    'title': title,
-                    'type': 'general',
-                    'container': container
-                })
+    # 전략 3: fds-comps-header-headline (일반 스마트블록)
+    general_blocks = index.find_all(('span',), token='fds-comps-header-headline')
+    for block in general_blocks:
+        title = block.get_text(strip=True)
+        container = block.find_parent('div', class_=lambda x: x and 'fds-comps' in str(x))
+        if container:
+            container_id = id(container)
+            if container_id not in seen_containers:
+                seen_containers.add(container_id)
+                categories.append({
+                    'title': title,
+                    'type': 'general',
+                    'container': container
+                })
+
+    # 전략 3.5: fds-ugc-block-root-ad-header (브랜드 콘텐츠 블록)
+    brand_blocks = index.find_all(contains=('fds-ugc-block-root-ad-header',))
+    for block in brand_blocks:
+        # 제목 추출
+        title_span = block.find('span')
+        if title_span:
+            title = title_span.get_text(strip=True)
+        else:
+            title = '브랜드 콘텐츠'
+
+        # 전체 컨테이너 찾기 (ID가 fdr-로 시작하는 부모)
+        container = block.find_parent(id=lambda x: x and x.startswith('fdr-'))
+        if container:
+            container_id = id(container)
+            if container_id not in seen_containers:
+                seen_containers.add(container_id)
+                categories.append({
+                    'title': title,
+                    'type': 'brand_content',
+                    'container': container
+                })
+
+    # 전략 4: JSON 내 content 필드 (브랜드 콘텐츠)
+    for script in index.json_scripts:
+        try:
+            raw = script.string
+            if not raw:
+                continue
+
+            # 원문에도 없고 \u 이스케이프도 없으면 디코딩해도 '브랜드 콘텐츠'가 나올 수 없음
+            if BRAND_CONTENT_TEXT not in raw and '\\u' not in raw:
+                continue
+
+            brand_content = _find_brand_content(json.loads(raw))
+            if brand_content:
+                container = script.find_parent('div', class_=lambda x: x and any(
+                    keyword in str(x).lower() for keyword in ['brand', 'ad', 'sponsor', 'comps']
+                ))
+
+                if not container:
+                    container = script.find_parent('div')
+
+                if container:
+                    container_id = id(container)
+                    if container_id not in seen_containers:
+                        seen_containers.add(container_id)
+                        categories.append({
+                            'title': brand_content,
+                            'type': 'brand',
+                            'container': container
+                        })
+        except (json.JSONDecodeError, AttributeError):
+            continue
+
+    return categories
+
+
+# ---------------------------------------------------------------------------
+# lxml 백엔드: BeautifulSoup 트리를 만들지 않고 lxml 문서에서 직접 추출
+# bs4 경로와 같은 규칙(class 토큰 매칭, get_text(strip=True), .string)을 그대로 따르므로
+# 결과 JSON이 바이트 단위로 같습니다.
+# ---------------------------------------------------------------------------
+
+# bs4가 본문 문자열로 치지 않는 태그 (Script/Stylesheet/TemplateString/RubyText 등)
+_LX_NON_TEXT_ANCESTORS = ('script', 'style', 'template', 'rt', 'rp')
+_LX_TEXT_PATH = './/text()[not(' + ' or '.join(f'ancestor::{name}' for name in _LX_NON_TEXT_ANCESTORS) + ')]'
+_LX_LINKS_PATH = './/a[@href]'
+
+# str.lower()가 ASCII로 접는 문자: A-Z와 켈빈 기호(K) → 사전 필터가 실제 매칭을 놓치지 않도록 포함
+_LX_UPPER = 'ABCDEFGHIJKLMNOPQRSTUVWXYZK'
+_LX_LOWER = 'abcdefghijklmnopqrstuvwxyzk'
+
+
+@functools.lru_cache(maxsize=None)
+def _lx_xpath(path: str, smart_strings: bool = True) -> etree.XPath:
+    """XPath 컴파일 (한 번만, lxml은 처음 쓸 때 import)"""
+    from lxml import etree
+
+    return etree.XPath(path, smart_strings=smart_strings)
+
+
+def _lx_links(node) -> list:
+    return _lx_xpath(_LX_LINKS_PATH)(node)
+
+
+def _lx_literal(value: str) -> str:
+    return f"'{value}'" if "'" not in value else f'"{value}"'
+
+
+@functools.lru_cache(maxsize=None)
+def _lx_class_xpath(axis: str, names: Optional[Tuple[str, ...]], token: Optional[str],
+                    contains: Optional[Tuple[str, ...]], lower: bool) -> etree.XPath:
+    """class 조건용 XPath (한 번만 컴파일). 토큰 단위 검사는 _lx_class_matches가 마무리"""
+    predicates = []
+    if names:
+        predicates.append(' or '.join(f'self::{name}' for name in names))
+    if token is not None:
+        predicates.append(f'contains(@class, {_lx_literal(token)})')
+    elif contains:
+        attr = f"translate(@class, '{_LX_UPPER}', '{_LX_LOWER}')" if lower else '@class'
+        predicates.append(' or '.join(f'contains({attr}, {_lx_literal(k)})' for k in contains))
+    return _lx_xpath(f'{axis}::*' + ''.join(f'[{p}]' for p in predicates))
+
+
+def _lx_class_matches(el, token: Optional[str], contains: Optional[Tuple[str, ...]], lower: bool) -> bool:
+    tokens = (el.get('class') or '').split()
+    if token is not None:
+        return token in tokens
+    if not contains:
+        return True
+    if lower:
+        tokens = [t.lower() for t in tokens]
+    return any(keyword in t for t in tokens for keyword in contains)
+
+
+def _lx_find_all(root, names: Optional[Tuple[str, ...]] = None, token: Optional[str] = None,
+                 contains: Optional[Tuple[str, ...]] = None, lower: bool = False) -> list:
+    """root의 자손 중 조건에 맞는 요소 (문서 순서). root가 ElementTree면 루트 요소도 포함"""
+    xpath = _lx_class_xpath('descendant', names, token, contains, lower)
+    return [el for el in xpath(root) if _lx_class_matches(el, token, contains, lower)]
+
+
+def _lx_find(root, names: Optional[Tuple[str, ...]] = None, token: Optional[str] = None,
+             contains: Optional[Tuple[str, ...]] = None, lower: bool = False):
+    if token is None and not contains:
+        return next(root.iterdescendants(*(names or ())), None)
+    for el in _lx_class_xpath('descendant', names, token, contains, lower)(root):
+        if _lx_class_matches(el, token, contains, lower):
+            return el
+    return None
+
+
+def _lx_find_parent(el, names: Tuple[str, ...], contains: Optional[Tuple[str, ...]] = None, lower: bool = False):
+    for ancestor in el.iterancestors(*names):
+        if _lx_class_matches(ancestor, None, contains, lower):
+            return ancestor
+    return None
+
+
+def _lx_text(el) -> str:
+    """bs4 get_text(strip=True)와 같은 결과 (주석/script/style 등의 문자열 제외)"""
+    if any(True for _ in el.iterancestors(*_LX_NON_TEXT_ANCESTORS)):
+        return ''
+    return ''.join(stripped for stripped in (text.strip() for text in _lx_xpath(_LX_TEXT_PATH, False)(el)) if stripped)
+
+
+def _lx_string(el) -> Optional[str]:
+    """bs4 Tag.string과 같은 결과 (자식이 문자열 하나뿐일 때만 그 문자열)"""
+    children = list(el)
+    count = (1 if el.text else 0) + len(children) + sum(1 for child in children if child.tail)
+    if count != 1:
+        return None
+    if el.text:
+        return el.text
+    child = children[0]
+    if not isinstance(child.tag, str):  # 주석/PI도 bs4에서는 문자열 노드
+        return child.text
+    return _lx_string(child)
+
+
+def _lx_link_title_parts(link) -> Tuple[str, str]:
+    return _lx_text(link), link.get('aria-label', '') or link.get('title', '')
+
+
+def parse_html_lxml(html: str):
+    """lxml.html로 문서 파싱 (빈 문서면 빈 <html> 요소)"""
+    import lxml.html
+    from lxml import etree
+
+    try:
+        return lxml.html.document_fromstring(html)
+    except ValueError:
+        # 인코딩 선언이 있는 str은 lxml이 거부하므로 바이트로 다시 파싱
+        return lxml.html.document_fromstring(html.encode('utf-8'), parser=lxml.html.HTMLParser(encoding='utf-8'))
+    except etree.ParserError:
+        return etree.Element('html')
+
+
+def parse_html(html: str, backend: Optional[str] = None):
+    """HTML 파싱 (backend 생략 시 HTML_PARSER_BACKEND)"""
+    if (backend or HTML_PARSER_BACKEND) == 'lxml':
+        return parse_html_lxml(html)
+    from bs4 import BeautifulSoup
+
+    return BeautifulSoup(html, 'lxml')
+
+
+def _is_lxml_element(node) -> bool:
+    # lxml 요소라면 lxml.etree는 이미 로드돼 있으므로 여기서 import하지 않음
+    etree = sys.modules.get('lxml.etree')
+    return etree is not None and isinstance(node, etree._Element)
+
+
+def _lx_plan_blogs_from_container(container) -> Dict:
+    """plan_blogs_from_container의 lxml 구현"""
+
+    blog_items = _lx_find_all(container, ('div',), contains=BLOG_ITEM_CLASS_KEYWORDS, lower=True)
+    single_container = not blog_items
+    if single_container:
+        blog_items = [container]
+
+    in_naver_urls = set()
+    for item in blog_items:
+        for link in _lx_links(item):
+            href = link.get('href', '')
+            if classify_url(href).kind == URL_IN_NAVER:
+                in_naver_urls.add(href)
+
+    entries = []
+
+    if single_container:
+        for link in _lx_links(container):
+            href = link.get('href', '')
+            info = classify_url(href)
+            if info.kind == URL_BLOG_POST:
+                direct = (info.blogId, info.postId)
+            elif info.kind == URL_BLOG:
+                continue
+            elif href in in_naver_urls:
+                direct = None
+            else:
+                continue
+
+            title = _lx_text(link) or link.get('aria-label', '') or link.get('title', '')
+            entries.append({'href': href, 'direct': direct, 'title': title})
+
+        return {'mode': 'links', 'entries': entries, 'inNaverUrls': in_naver_urls}
+
+    for item in blog_items:
+        direct = None
+        all_links = _lx_links(item)
+        for link in all_links:
+            href = link.get('href', '')
+            info = classify_url(href)
+            if info.kind == URL_BLOG_POST:
+                direct = (href, info.blogId, info.postId, _lx_link_title_parts(link))
+                break
+
+        candidates = []
+        fallback = None
+        if not direct:
+            candidates = [
+                (link.get('href', ''), _lx_link_title_parts(link))
+                for link in all_links
+                if link.get('href', '') in in_naver_urls
+            ]
+
+            title_link = _lx_find(item, ('a',), contains=('title',), lower=True)
+            if title_link is not None:
+                href = title_link.get('href', '')
+                info = classify_url(href)
+                if info.kind == URL_BLOG_POST:
+                    fallback = (href, info.blogId, info.postId, _lx_link_title_parts(title_link))
+
+            if not candidates and not fallback:
+                continue
+
+        title_text = ''
+        title_elem = _lx_find(item, ('span', 'div', 'strong', 'h3', 'h4'),
+                              contains=TITLE_CLASS_KEYWORDS, lower=True)
+        if title_elem is not None:
+            title_text = _lx_text(title_elem)
+
+        fallback_text = ''
+        if not title_text:
+            for elem in item.iterdescendants('span', 'div', 'strong'):
+                text = _lx_text(elem)
+                if text and len(text) > 5:
+                    fallback_text = text
+                    break
+
+        img = next(item.iterdescendants('img'), None)
+        thumbnail = None
+        if img is not None:
+            thumbnail = img.get('src') or img.get('data-src') or img.get('data-lazy-src')
+
+        preview = None
+        preview_elem = _lx_find(item, ('span', 'div', 'p'), contains=PREVIEW_CLASS_KEYWORDS, lower=True)
+        if preview_elem is not None:
+            preview = _lx_text(preview_elem)[:200]
+
+        entries.append({
+            'direct': direct,
+            'candidates': candidates,
+            'fallback': fallback,
+            'titleText': title_text,
+            'fallbackText': fallback_text,
+            'thumbnail': thumbnail,
+            'preview': preview,
+        })
+
+    return {'mode': 'items', 'entries': entries, 'inNaverUrls': in_naver_urls}
+
+
+def _lx_find_more_link(container) -> Optional[str]:
+    """find_more_link의 lxml 구현"""
+
+    for link in container.iterdescendants('a'):
+        string = _lx_string(link)
+        if string and '더보기' in string:
+            return link.get('href')
+
+    more_link = _lx_find(container, ('a',), contains=('more',), lower=True)
+    if more_link is not None:
+        return more_link.get('href')
+
+    for attr in ('title', 'aria-label'):
+        for link in container.iterdescendants('a'):
+            value = link.get(attr)
+            if value and '더보기' in value:
+                return link.get('href')
+
+    parent_section = next(container.iterancestors('div', 'section'), None)
+    if parent_section is not None:
+        footer = _lx_find(parent_section, ('div',), contains=('fds-comps-footer-full-container',))
+        if footer is not None:
+            more_button = _lx_find(footer, ('div',), contains=('fds-comps-more-button-no-border',))
+            if more_button is not None:
+                link = next(iter(_lx_links(more_button)), None)
+                if link is not None:
+                    href = link.get('href')
+                    if href:  # lb_api URL도 포함
+                        print(f'Found ugc_list more link in footer: {href[:80]}...', file=sys.stderr)
+                        return href
+
+    return None
+
+
+def _lx_detect_smartblock_categories(root) -> List[Dict]:
+    """detect_smartblock_categories의 lxml 구현 (전략 순서/중복 제거 규칙 동일)"""
+
+    document = root.getroottree()
+    categories = []
+    seen_containers = set()  # lxml 요소는 참조가 살아 있는 동안 같은 프록시 객체
+
+    # 전략 0: fds-ugc-block-mod-list
+    for container in _lx_find_all(document, ('div',), contains=('fds-ugc-block-mod-list',)):
+        if container in seen_containers:
+            continue
+        seen_containers.add(container)
+
+        title = "스마트블록"
+        parent_section = _lx_find_parent(container, ('div', 'section'), SECTION_CLASS_KEYWORDS, lower=True)
+        if parent_section is not None:
+            headline = _lx_find(parent_section, ('span', 'h2', 'h3', 'strong'),
+                                contains=('headline', 'title', 'subject', 'header'), lower=True)
+            if headline is not None:
+                title = _lx_text(headline)
+
+        if title == "스마트블록":
+            prev_sibling = next(container.itersiblings('div', 'header', preceding=True), None)
+            if prev_sibling is not None:
+                headline = _lx_find(prev_sibling, ('span', 'h2', 'h3', 'strong'))
+                if headline is not None:
+                    title = _lx_text(headline)
+
+        categories.append({'title': title, 'type': 'ugc_list', 'container': container})
+
+    # 전략 1: 리빙 인플루언서 컨테이너
+    for container in _lx_find_all(document, ('div',), token='fds-ugc-influencer'):
+        if container in seen_containers:
+            continue
+        if _lx_find(container, ('span',), token='sds-comps-text-type-headline1') is None:
+            continue
+
+        title = "리빙 인플루언서 콘텐츠"
+        parent_section = _lx_find_parent(container, ('div', 'section'), SECTION_CLASS_KEYWORDS, lower=True)
+        if parent_section is not None:
+            section_title = _lx_find(parent_section, ('h2', 'h3', 'strong', 'span'),
+                                     contains=('headline', 'title', 'subject'), lower=True)
+            if section_title is not None:
+                title = _lx_text(section_title)
+
+        seen_containers.add(container)
+        categories.append({'title': title, 'type': 'influencer', 'container': container})
+
+    # 전략 2, 3: 지역 기반 / 일반 스마트블록
+    for token, category_type in (('fds-comps-footer-more-subject', 'location'),
+                                 ('fds-comps-header-headline', 'general')):
+        for block in _lx_find_all(document, ('span',), token=token):
+            title = _lx_text(block)
+            container = _lx_find_parent(block, ('div',), ('fds-comps',))
+            if container is not None and container not in seen_containers:
+                seen_containers.add(container)
+                categories.append({'title': title, 'type': category_type, 'container': container})
+
+    # 전략 3.5: 브랜드 콘텐츠 블록
+    for block in _lx_find_all(document, contains=('fds-ugc-block-root-ad-header',)):
+        title_span = _lx_find(block, ('span',))
+        title = _lx_text(title_span) if title_span is not None else '브랜드 콘텐츠'
+
+        container = next((a for a in block.iterancestors() if (a.get('id') or '').startswith('fdr-')), None)
+        if container is not None and container not in seen_containers:
+            seen_containers.add(container)
+            categories.append({'title': title, 'type': 'brand_content', 'container': container})
+
+    # 전략 4: JSON 내 content 필드
+    for script in document.iter('script'):
+        if script.get('type') != 'application/json':
+            continue
+        raw = script.text
+        if not raw or (BRAND_CONTENT_TEXT not in raw and '\\u' not in raw):
+            continue
+        try:
+            brand_content = _find_brand_content(json.loads(raw))
+        except json.JSONDecodeError:
+            continue
+        if brand_content:
+            container = _lx_find_parent(script, ('div',), ('brand', 'ad', 'sponsor', 'comps'), lower=True)
+            if container is None:
+                container = next(script.iterancestors('div'), None)
+            if container is not None and container not in seen_containers:
+                seen_containers.add(container)
+                categories.append({'title': brand_content, 'type': 'brand', 'container': container})
+
+    return categories
+
+
+def smartblock_fingerprint(categories_info: List[Dict], more_links: Optional[List[Optional[str]]] = None) -> str:
+    """스마트블록 영역 지문: 카테고리 제목/종류/더보기 링크와 블로그·in.naver.com 링크 순서의 해시
+
+    광고/추적 파라미터처럼 결과와 무관한 부분은 빼고, 순위에 영향을 주는 부분만 반영합니다.
+    more_links(카테고리 순서대로 이미 찾은 더보기 링크)를 넘기면 더보기 링크를 다시 찾지 않습니다.
+    """
+    digest = hashlib.sha1()
+    if more_links is None:
+        more_links = [find_more_link(cat_info['container']) for cat_info in categories_info]
+    for cat_info, more_link in zip(categories_info, more_links):
+        container = cat_info['container']
+        if _is_lxml_element(container):
+            hrefs = [a.get('href') for a in _lx_links(container)]
+        else:
+            hrefs = [a.get('href') for a in container.find_all('a', href=True)]
+        parts = [cat_info['title'], cat_info['type'], more_link or '']
+        parts.extend(href for href in hrefs if 'blog.naver.com' in href or 'in.naver.com' in href)
+        digest.update('\x1f'.join(parts).encode('utf-8'))
+        digest.update(b'\x1e')
+    return digest.hexdigest()
+
+
+def blog_keys(blogs: Iterable) -> List[Tuple[str, str]]:
+    """블로그 목록(Blog 또는 출력 JSON dict) → 순서대로 (blogId, postId)"""
+    return [(blog.blogId, blog.postId) if isinstance(blog, Blog) else (blog['blogId'], blog['postId'])
+            for blog in blogs]
+
+
+def category_ranking(category: Dict) -> List[Dict]:
+    """카테고리 결과 → 순위 순서의 블로그 목록 (미리보기 다음 더보기, (blogId, postId) 중복 제거)"""
+    ranked = []
+    seen = set()
+    for blog in category['blogsInPreview'] + category['morePageBlogs']:
+        key = (blog['blogId'], blog['postId'])
+        if key not in seen:
+            seen.add(key)
+            ranked.append(blog)
+    return ranked
+
+
+def result_digest(result: Dict) -> str:
+    """결과에서 순위에 관련된 부분(카테고리 제목/종류, 순위별 blogId/postId)만의 해시
+
+    scrapedAt, metrics, 제목/썸네일 문구처럼 매번 달라질 수 있는 값은 반영하지 않습니다.
+    """
+    digest = hashlib.sha1()
+    for category in result.get('categories') or []:
+        parts = [category['categoryTitle'], category['categoryType']]
+        parts.extend(f'{blog_id}/{post_id}' for blog_id, post_id in blog_keys(category_ranking(category)))
+        digest.update('\x1f'.join(parts).encode('utf-8'))
+        digest.update(b'\x1e')
+    return digest.hexdigest()
+
+
+def diff_results(previous: Dict, current: Dict) -> Dict:
+    """직전 결과 대비 변경분만 담은 결과
+
+    categoriesAdded: 새 카테고리 (전체 내용), categoriesRemoved: 사라진 카테고리 제목,
+    categoriesChanged: 카테고리별 blogsAdded / blogsRemoved / blogsMoved (순위는 1부터, rankDelta > 0이면 상승).
+    """
+    current_hash = result_digest(current)
+    base_hash = previous.get('resultHash') or result_digest(previous)
+    diff = {
+        'success': True,
+        'keyword': current['keyword'],
+        'scrapedAt': current['scrapedAt'],
+        'diff': True,
+        'baseHash': base_hash,
+        'resultHash': current_hash,
+        'unchanged': current_hash == base_hash,
+        'totalCategories': current['totalCategories'],
+        'totalBlogs': current['totalBlogs'],
+    }
+    for key in ('serpUnchanged', 'metrics'):
+        if key in current:
+            diff[key] = current[key]
+    if 'categories' not in previous:
+        # 해시만 받은 경우: 같으면 요약만, 다르면 전체 결과
+        if not diff['unchanged']:
+            diff['categories'] = current['categories']
+        return diff
+
+    before = {category['categoryTitle']: category for category in previous['categories']}
+    after = {category['categoryTitle']: category for category in current['categories']}
+    added, changed = [], []
+    for title, category in after.items():
+        if title not in before:
+            added.append(category)
+            continue
+        old_ranks = {key: rank for rank, key in enumerate(blog_keys(category_ranking(before[title])), 1)}
+        ranking = category_ranking(category)
+        new_ranks = {key: rank for rank, key in enumerate(blog_keys(ranking), 1)}
+        blogs_added, blogs_moved = [], []
+        for rank, blog in enumerate(ranking, 1):
+            key = (blog['blogId'], blog['postId'])
+            if key not in old_ranks:
+                blogs_added.append(dict(blog, rank=rank))
+            elif old_ranks[key] != rank:
+                blogs_moved.append({'blogId': key[0], 'postId': key[1], 'url': blog['url'], 'rank': rank,
+                                    'previousRank': old_ranks[key], 'rankDelta': old_ranks[key] - rank})
+        blogs_removed = [{'blogId': key[0], 'postId': key[1], 'previousRank': rank}
+                         for key, rank in old_ranks.items() if key not in new_ranks]
+        if blogs_added or blogs_removed or blogs_moved or category['categoryType'] != before[title]['categoryType']:
+            changed.append({
+                'categoryTitle': title,
+                'categoryType': category['categoryType'],
+                'blogsAdded': blogs_added,
+                'blogsRemoved': blogs_removed,
+                'blogsMoved': blogs_moved,
+            })
+    diff['categoriesAdded'] = added
+    diff['categoriesRemoved'] = [title for title in before if title not in after]
+    diff['categoriesChanged'] = changed
+    return diff
+
+
+def load_previous_results(path: str) -> Dict[str, Dict]:
+    """직전 결과 파일(단일 JSON 또는 배치 NDJSON) → 키워드별 결과 (diff 모드 입력)"""
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    try:
+        documents = [json.loads(text)]
+    except ValueError:
+        documents = [json.loads(line) for line in text.splitlines() if line.strip()]
+    return {document['keyword']: document for document in documents
+            if isinstance(document, dict) and document.get('success') and document.get('keyword')}
+
+
+async def scrape_more_link_async(client: NaverHttpClient, keyword: str, more_link: str,
+                                 cookies: dict, headers: dict,
+                                 stop: Optional[Callable[[List[Blog]], bool]] = None) -> List[Blog]:
+    """더보기 링크 종류(lb_api / 일반 더보기 페이지)에 따라 전체 블로그 목록 수집
+
+    stop은 scrape_lb_api_more_page_async와 같고, True가 되면 Playwright fallback도 건너뜁니다.
+    """
+
+    # Check if it's an lb_api URL (ugc_list category)
+    if more_link.startswith('#lb_api='):
+        # Phase 1: lb_api 직접 호출
+        with metric_stage('lbApi'):
+            more_blogs = await scrape_lb_api_more_page_async(client, more_link, cookies, headers, stop=stop)
+
+        # Phase 2: lb_api가 실패하거나 블로그가 적을 때 Playwright fallback (공유 브라우저 풀)
+        if len(more_blogs) < 5 and not (stop is not None and stop(more_blogs)):
+            print(f'lb_api 결과 부족 ({len(more_blogs)}개), Playwright 브라우저 풀로 재시도...', file=sys.stderr)
+            with metric_stage('playwrightFallback'):
+                playwright_blogs = await scrape_ugc_list_with_playwright_async(client, more_link, keyword, headers)
+
+            # Playwright 결과가 더 많으면 사용
+            if len(playwright_blogs) > len(more_blogs):
+                print(f'Playwright 결과가 더 우수: {len(playwright_blogs)}개 vs {len(more_blogs)}개', file=sys.stderr)
+                more_blogs = playwright_blogs
+        return more_blogs
+
+    # Use regular scraper for influencer/other categories
+    if more_link.startswith('/'):
+        full_more_url = f"https://search.naver.com{more_link}"
+    elif more_link.startswith('http'):
+        full_more_url = more_link
+    else:
+        full_more_url = f"https://search.naver.com/{more_link}"
 
-    # 전략 3.5: fds-ugc-block-root-ad-header (브랜드 콘텐츠 블록)
-    brand_blocks = soup.find_all(class_=lambda x: x and 'fds-ugc-block-root-ad-header' in str(x))
-    for block in brand_blocks:
-        # 제목 추출
-        title_span = block.find('span')
-        if title_span:
-            title = title_span.get_text(strip=True)
+    with metric_stage('morePage'):
+        return await scrape_more_page_async(client, full_more_url, cookies, headers)
+
+
+async def scrape_category_async(client: NaverHttpClient, keyword: str, category: Category,
+                                cookies: dict, headers: dict, previous: Optional[Dict] = None,
+                                targets: Optional[RankTargets] = None) -> CategoryResult:
+    """카테고리 하나의 미리보기 블로그와 더보기 블로그를 동시에 수집
+
+    detect_smartblock_categories의 dict(container 포함)를 넘겨도 됩니다.
+    previous(직전 결과의 같은 카테고리)가 있고 더보기 링크와 미리보기 블로그 순서가 그대로면
+    더보기/lb_api 요청 없이 직전 morePageBlogs를 재사용합니다.
+    targets가 있으면 미리보기 → 더보기 순서로 수집하다가 대상을 모두 찾은 곳에서 멈춥니다.
+    """
+
+    if not isinstance(category, Category):
+        container = category['container']
+        category = Category(category['title'], category['type'],
+                            plan_blogs_from_container(container), find_more_link(container))
+    plan = category.plan
+    more_link = category.moreLink
+
+    async def preview_blogs() -> List[Blog]:
+        with metric_stage('previewExtract'):
+            in_to_blog_map = await batch_extract_in_naver_urls_async(client, plan['inNaverUrls'], headers)
+            return build_blogs_from_plan(plan, in_to_blog_map)
+
+    async def more_page_blogs() -> List[Blog]:
+        if not more_link:
+            return []
+        return await scrape_more_link_async(client, keyword, more_link, cookies, headers)
+
+    if targets:
+        with metric_stage('previewExtract'):
+            blogs_preview, complete = await build_blogs_until_targets_async(client, plan, targets, headers)
+        if not complete or not more_link or targets.placed(blogs_preview):
+            if more_link:
+                metric_count('targetSkippedMorePages')
+            return CategoryResult(category.title, category.type, blogs_preview, more_link, [],
+                                  complete and not more_link)
+
+        stopped = []
+
+        def stop(more: List[Blog]) -> bool:
+            if targets.placed(blogs_preview + more):
+                stopped.append(True)
+                metric_count('targetEarlyExits')
+                return True
+            return False
+
+        more_blogs = await scrape_more_link_async(client, keyword, more_link, cookies, headers, stop)
+        return CategoryResult(category.title, category.type, blogs_preview, more_link, more_blogs, not stopped)
+
+    if previous is None or not more_link or previous.get('moreLink') != more_link:
+        blogs_preview, more_blogs = await asyncio.gather(preview_blogs(), more_page_blogs())
+    else:
+        blogs_preview = await preview_blogs()
+        if blog_keys(blogs_preview) == blog_keys(previous['blogsInPreview']):
+            metric_count('morePageReused')
+            more_blogs = [Blog.from_dict(blog) for blog in previous['morePageBlogs']]
         else:
-            title = '브랜드 콘텐츠'
-        
-        # 전체 컨테이너 찾기 (ID가 fdr-로 시작하는 부모)
-        container = block.find_parent(id=lambda x: x and x.startswith('fdr-'))
-        if container:
-            container_id = id(container)
-            if container_id not in seen_containers:
-                seen_containers.add(container_id)
-                categories.append({
-                    'title': title,
-                    'type': 'brand_content',
-                    'container': container
-                })
+            more_blogs = await more_page_blogs()
 
-    # 전략 4: JSON 내 content 필드 (브랜드 콘텐츠)
-    script_tags = soup.find_all('script', type='application/json')
-    for script in script_tags:
-        try:
-            if not script.string:
-                continue
+    return CategoryResult(category.title, category.type, blogs_preview, more_link, more_blogs)
 
-            data = json.loads(script.string)
-
-            def find_brand_content(obj, path=""):
-                if isinstance(obj, dict):
-                    for key, value in obj.items():
-                        if key == 'content' and isinstance(value, str) and '브랜드 콘텐츠' in value:
-                            return value
-                        result = find_brand_content(value, f"{path}.{key}")
-                        if result:
-                            return result
-                elif isinstance(obj, list):
-                    for item in obj:
-                        result = find_brand_content(item, path)
-                        if result:
-                            return result
-                return None
-
-            brand_content = find_brand_content(data)
-            if brand_content:
-                container = script.find_parent('div', class_=lambda x: x and any(
-                    keyword in str(x).lower() for keyword in ['brand', 'ad', 'sponsor', 'comps']
-                ))
 
-                if not container:
-                    container = script.find_parent('div')
+async def main_async(keyword: str, client: Optional[NaverHttpClient] = None,
+                     previous: Optional[Dict] = None, targets: Optional[Iterable[str]] = None) -> dict:
+    """메인 스크래핑 함수 (asyncio)
 
-                if container:
-                    container_id = id(container)
-                    if container_id not in seen_containers:
-                        seen_containers.add(container_id)
-                        categories.append({
-                            'title': brand_content,
-                            'type': 'brand',
-                            'container': container
-                        })
-        except (json.JSONDecodeError, AttributeError):
-            continue
+    client를 넘기면 여러 키워드가 같은 커넥션 풀을 공유하고,
+    생략하면 이 호출 동안만 쓰는 클라이언트를 엽니다.
+    previous(직전 결과, 또는 {'resultHash': ...})를 넘기면 diff_results() 형식의 변경분만 돌려줍니다.
+    targets(블로그 글 URL, "blogId/postId" 등)를 넘기면 대상을 찾은 뒤 카테고리별 수집을 멈추고
+    결과의 "targets"에 대상별 카테고리 순위를 담습니다 (이때 블로그 목록은 "partial"일 수 있음).
+    """
 
-    return categories
+    if client is None:
+        async with NaverHttpClient() as own_client:
+            return await main_async(keyword, own_client, previous, targets)
+
+    if targets is not None and not isinstance(targets, RankTargets):
+        targets = RankTargets(targets)
+
+    # 스테이지 지표: 이 키워드 결과(COLLECT_METRICS일 때)와 client.metrics 합계에 반영
+    metrics = ScrapeMetrics()
+    token = _CURRENT_METRICS.set(metrics)
+    started = time.perf_counter()
+    try:
+        result = await _scrape_keyword_async(keyword, client, previous, targets)
+    finally:
+        _CURRENT_METRICS.reset(token)
+        metrics.runs = 1
+        metrics.wall_seconds = time.perf_counter() - started
+        client.metrics.merge(metrics)
 
+    if COLLECT_METRICS:
+        result = dict(result, metrics=metrics.to_dict())
+    if client.archive is not None and result.get('success'):
+        client.archive.record(result)
+    if client.blog_index is not None and result.get('success'):
+        client.blog_index.update(result)
+    if targets and result.get('success'):
+        result = dict(result, targets=targets.report(result['categories']))
+    if previous is not None and result.get('success') and not result.get('earlyExit'):
+        result = diff_results(previous, result)
+    return result
 
-def main(keyword: str) -> dict:
-    """메인 스크래핑 함수"""
 
-    html = get_naver_search_html(keyword)
+async def _scrape_keyword_async(keyword: str, client: NaverHttpClient, previous: Optional[Dict] = None,
+                                targets: Optional[RankTargets] = None) -> dict:
+    serp_cache = client.serp_cache
+    cached = serp_cache.get(keyword) if serp_cache is not None else None
+    with metric_stage('serpFetch'):
+        fetched = await fetch_naver_search_async(client, keyword, cached)
+
+    if fetched.not_modified:
+        serp_cache.record_not_modified()
+        metric_count('serpNotModified')
+        html = cached.html
+    else:
+        html = fetched.html
 
     if not html:
         return {
             'success': False,
-            'error': 'Failed to fetch Naver search page'
+            'error': 'Failed to fetch Naver search page',
+            # 타임아웃/429/5xx/403(일시 차단)은 다시 시도할 만하지만 그 밖의 4xx는 같은 결과가 반복됨
+            'retryable': fetched.error_status in (None, 403, 408) or fetched.error_status in client.RETRY_STATUSES,
         }
 
-    categories_info = detect_smartblock_categories(html)
-    result_categories = []
-    total_blogs = 0
-
-    cookies = {
-        'NNB': 'ECHGGL2ZR7AGO',
-        'ASID': '7425f1d60000019564d162b600000055',
-        'PM_CK_loc': '1dd76e4b80bc46c7d0d1adf34d89f5e27fc787c39dbf2aab1c87ad65a4e7d39a',
-        'SHP_BUCKET_ID': '4',
-        'nx_ssl': '2',
-        'page_uid': 'j9SIYdp0JXVssLpE5EZssssstJV-155875',
-    }
-
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9',
-        'Accept-Language': 'ko,en-US;q=0.9',
-        'Referer': 'https://search.naver.com/',
-    }
-
-    for cat_info in categories_info:
-        container = cat_info['container']
-        blogs_preview = extract_blogs_from_container(container, headers)
-        more_link = find_more_link(container)
-
-        more_blogs = []
-        if more_link:
-            # Check if it's an lb_api URL (ugc_list category)
-            if more_link.startswith('#lb_api='):
-                # Phase 1: lb_api 직접 호출
-                more_blogs = scrape_lb_api_more_page(more_link, cookies, headers)
-                
-                # Phase 2: lb_api가 실패하거나 블로그가 적을 때 Playwright fallback
-                if len(more_blogs) < 5:
-                    print(f'lb_api 결과 부족 ({len(more_blogs)}개), Playwright로 재시도 (headless=False)...', file=sys.stderr)
-                    try:
-                        playwright_blogs = scrape_ugc_list_with_playwright(
-                            more_link, keyword, headers, headless=False, max_pages=2
-                        )
-                        
-                        # Playwright 결과가 더 많으면 사용
-                        if len(playwright_blogs) > len(more_blogs):
-                            print(f'Playwright 결과가 더 우수: {len(playwright_blogs)}개 vs {len(more_blogs)}개', file=sys.stderr)
-                            more_blogs = playwright_blogs
-                    except Exception as e:
-                        print(f'Playwright fallback 실패, 429 에러 시 headless=True로 재시도: {e}', file=sys.stderr)
-                        if '429' in str(e) or 'Too Many Requests' in str(e):
-                            try:
-                                playwright_blogs = scrape_ugc_list_with_playwright(
-                                    more_link, keyword, headers, headless=True, max_pages=2
-                                )
-                                if len(playwright_blogs) > len(more_blogs):
-                                    more_blogs = playwright_blogs
-                            except Exception as e2:
-                                print(f'Playwright headless 모드도 실패: {e2}', file=sys.stderr)
-            else:
-                # Use regular scraper for influencer/other categories
-                if more_link.startswith('/'):
-                    full_more_url = f"https://search.naver.com{more_link}"
-                elif more_link.startswith('http'):
-                    full_more_url = more_link
-                else:
-                    full_more_url = f"https://search.naver.com/{more_link}"
-
-                more_blogs = scrape_more_page(full_more_url, cookies, headers)
+    # 감지 직후 DOM을 버리고 카테고리별 추출 계획만 유지 (네트워크 작업 동안 파싱 트리를 붙잡지 않음)
+    with metric_stage('detect'):
+        if client.parse_pool is not None:
+            categories, fingerprint = await client.parse_pool.run(
+                parse_serp_document, html.encode('utf-8'), 'utf-8', HTML_PARSER_BACKEND
+            )
+        else:
+            categories, fingerprint = detect_categories_compact(html)
 
-        category_data = {
-            'categoryTitle': cat_info['title'],
-            'categoryType': cat_info['type'],
-            'blogsInPreview': blogs_preview,
-            'moreLink': more_link,
-            'morePageBlogs': more_blogs,
-            'totalBlogsInMore': len(more_blogs)
-        }
+    # 스마트블록이 직전 실행과 같으면 더보기/lb_api/in.naver.com 요청 없이 직전 결과 재사용
+    reusable = serp_cache.reusable_result(cached, fingerprint) if serp_cache is not None else None
+    if reusable is not None:
+        metric_count('serpCacheReused')
+        return dict(
+            reusable,
+            scrapedAt=datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
+            serpUnchanged=True,
+        )
 
-        result_categories.append(category_data)
-        total_blogs += len(blogs_preview) + len(more_blogs)
+    # 모든 카테고리의 더보기/lb_api/in.naver.com 요청을 한 번에 진행
+    previous_categories = {
+        category['categoryTitle']: category for category in (previous or {}).get('categories') or []
+    }
+    result_categories = list(await asyncio.gather(*(
+        scrape_category_async(client, keyword, category, NAVER_COOKIES, DEFAULT_HEADERS,
+                              previous_categories.get(category.title), targets)
+        for category in categories
+    )))
 
     # v12: Filter empty and duplicate categories
     filtered_categories = []
     seen_titles = set()
-    
+
     for cat in result_categories:
-        total_blogs_in_cat = len(cat['blogsInPreview']) + cat['totalBlogsInMore']
-        
         # Skip empty categories
-        if total_blogs_in_cat == 0:
+        if cat.total_blogs == 0:
             continue
-        
+
         # Skip duplicate titles
-        if cat['categoryTitle'] in seen_titles:
+        if cat.categoryTitle in seen_titles:
             continue
-        
-        seen_titles.add(cat['categoryTitle'])
+
+        seen_titles.add(cat.categoryTitle)
         filtered_categories.append(cat)
-    
+
     # Replace with filtered categories and recalculate total
     result_categories = filtered_categories
-    total_blogs = sum(len(cat['blogsInPreview']) + cat['totalBlogsInMore'] for cat in result_categories)
-    
-    return {
+    total_blogs = sum(cat.total_blogs for cat in result_categories)
+
+    result = {
         'success': True,
         'keyword': keyword,
         'scrapedAt': datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
         'totalCategories': len(result_categories),
         'totalBlogs': total_blogs,
-        'categories': result_categories
+        'categories': [cat.to_dict() for cat in result_categories]
     }
+    if not all(cat.complete for cat in result_categories):
+        # 대상을 찾은 뒤 멈춘 결과는 diff/SERP 캐시의 기준으로 쓰지 않음
+        result['earlyExit'] = True
+        return result
+    if serp_cache is not None:
+        serp_cache.put(keyword, html, fingerprint, result, fetched.etag, fetched.last_modified)
+    return result
 
 
-if __name__ == '__main__':
-    if len(sys.argv) < 2:
+def main(keyword: str, client: Optional[NaverHttpClient] = None, previous: Optional[Dict] = None,
+         targets: Optional[Iterable[str]] = None) -> dict:
+    """메인 스크래핑 함수 (넘긴 client는 이 호출에서만 쓸 수 있음, 여러 키워드에 재사용하려면 main_async)"""
+    return _run_sync(lambda opened: main_async(keyword, opened, previous, targets), client)
+
+
+@functools.lru_cache(maxsize=None)
+def _orjson():
+    """orjson 모듈 (없으면 None → 표준 json 사용)"""
+    try:
+        import orjson
+    except ImportError:
+        return None
+    return orjson
+
+
+def dumps_json(obj: Any, pretty: bool = False) -> bytes:
+    """결과 직렬화: orjson이 있으면 orjson, 없으면 json (둘 다 UTF-8 그대로, ensure_ascii=False와 동일)"""
+    orjson = _orjson()
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+    return json.dumps(obj, ensure_ascii=False, indent=2 if pretty else None).encode('utf-8')
+
+
+class ResultWriter:
+    """결과 출력 층 (v13)
+
+    fmt='json'은 결과마다 들여쓴 JSON 문서(단일 키워드 모드의 기존 출력), fmt='ndjson'은 결과마다
+    한 줄입니다. per_category=True면 카테고리마다 {"record": "category", "keyword", ...} 한 줄을 쓰고
+    이어서 categories를 뺀 {"record": "keyword", ...} 요약 한 줄을 씁니다. 카테고리 줄도 키워드 결과가
+    끝난 뒤에 한꺼번에 씁니다 (빈 카테고리/중복 제목 필터가 모든 카테고리를 받은 뒤에 정해지므로,
+    카테고리가 끝나는 즉시 쓰지는 않음).
+    compress='zstd'면 결과 하나마다 닫힌 zstd 프레임을 이어 붙이므로 (zstandard 패키지 필요)
+    읽는 쪽은 스트림을 그대로 풀면서 결과 단위로 처리할 수 있습니다.
+    stream은 바이너리/텍스트 모두 받고, 쓴 뒤 매번 flush합니다.
+    """
+
+    def __init__(self, stream: Union[BinaryIO, TextIO], fmt: str = 'ndjson', per_category: bool = False,
+                 compress: Optional[str] = None, level: int = 3):
+        if fmt not in ('json', 'ndjson'):
+            raise ValueError(f'Unknown output format: {fmt}')
+        self.fmt = fmt
+        self.per_category = per_category
+        self.written = 0
+        self._text = isinstance(stream, io.TextIOBase)
+        self._stream = stream
+        self._zstd = None
+        if compress == 'zstd':
+            import zstandard
+            raw = stream.buffer if self._text else stream
+            self._zstd = zstandard
+            self._text = False
+            self._stream = zstandard.ZstdCompressor(level=level).stream_writer(raw, closefd=False)
+        elif compress:
+            raise ValueError(f'Unknown compression: {compress}')
+
+    def records(self, result: dict) -> Iterator[dict]:
+        if not self.per_category:
+            yield result
+            return
+        for category in result.get('categories') or []:
+            yield {'record': 'category', 'keyword': result['keyword'], 'scrapedAt': result['scrapedAt'], **category}
+        yield {'record': 'keyword', **{key: value for key, value in result.items() if key != 'categories'}}
+
+    def write_result(self, result: dict) -> None:
+        pretty = self.fmt == 'json'
+        data = b''.join(dumps_json(record, pretty) + b'\n' for record in self.records(result))
+        if self._text:
+            self._stream.write(data.decode('utf-8'))
+        else:
+            self._stream.write(data)
+        if self._zstd is not None:
+            self._stream.flush(self._zstd.FLUSH_FRAME)
+        else:
+            self._stream.flush()
+        self.written += 1
+
+    def close(self) -> None:
+        """zstd 스트림 정리 (원래 스트림은 닫지 않음)"""
+        if self._zstd is not None:
+            self._stream.close()
+
+
+def iter_keywords(source: TextIO) -> Iterator[str]:
+    """키워드 파일/stdin에서 한 줄에 하나씩 키워드 읽기 (빈 줄은 건너뜀)"""
+    for line in source:
+        keyword = line.strip()
+        if keyword:
+            yield keyword
+
+
+def read_batch_jobs(source: TextIO, default_targets: Iterable[str] = (),
+                    invalid: Optional[List[dict]] = None) -> Tuple[List[str], Dict[str, List[str]]]:
+    """배치 입력 → (중복 없는 키워드 목록, 키워드별 순위 확인 대상)
+
+    한 줄은 키워드 문자열이거나 {"keyword": ..., "targets": [...]} (또는 "targetUrl") JSON 객체입니다.
+    "targets"는 URL 문자열 하나여도 됩니다.
+    같은 키워드가 여러 줄(여러 사용자)에 있으면 대상을 모아 키워드당 한 번만 수집합니다.
+    잘못된 줄은 배치 전체를 멈추지 않고 건너뛰며, invalid 리스트를 넘기면 그 줄을
+    실패 결과({'success': False, 'keyword', 'error'})로 담습니다 (없으면 stderr 경고).
+    """
+    keywords: List[str] = []
+    targets: Dict[str, List[str]] = {}
+    for line_no, raw in enumerate(source, 1):
+        line = raw.strip()
+        if not line:
+            continue
+        job_targets = list(default_targets)
+        keyword = line
+        if line.startswith('{'):
+            keyword = None
+            try:
+                job = json.loads(line)
+                if not isinstance(job, dict):
+                    raise ValueError('job must be a JSON object')
+                keyword = str(job.get('keyword') or '').strip() or None
+                extra = job.get('targets') or []
+                if isinstance(extra, str):
+                    extra = [extra]
+                if not isinstance(extra, list) or not all(isinstance(target, str) for target in extra):
+                    raise ValueError('"targets" must be a URL string or a list of URL strings')
+                if job.get('targetUrl') and not isinstance(job['targetUrl'], str):
+                    raise ValueError('"targetUrl" must be a URL string')
+                for target in [*extra, job.get('targetUrl') or '']:
+                    if target.strip():
+                        parse_target(target)
+            except ValueError as e:
+                failure = {'success': False, 'keyword': keyword, 'error': f'Invalid batch line {line_no}: {e}'}
+                if invalid is not None:
+                    invalid.append(failure)
+                else:
+                    print(f"배치 입력 {line_no}번째 줄 무시: {e}", file=sys.stderr)
+                continue
+            job_targets.extend(extra)
+            if job.get('targetUrl'):
+                job_targets.append(job['targetUrl'])
+        if not keyword:
+            continue
+        if keyword not in targets:
+            keywords.append(keyword)
+            targets[keyword] = []
+        targets[keyword].extend(target for target in job_targets if target not in targets[keyword])
+    return keywords, targets
+
+
+async def run_batch_async(keywords: Iterable[str], out: Union[TextIO, ResultWriter], concurrency: int = 4,
+                          client: Optional[NaverHttpClient] = None,
+                          previous: Optional[Dict[str, Dict]] = None,
+                          targets: Optional[Dict[str, List[str]]] = None) -> Dict[str, int]:
+    """여러 키워드를 하나의 클라이언트 위에서 처리 (최대 concurrency개 동시 실행)
+
+    키워드가 끝나는 순서대로 결과를 JSON 한 줄(NDJSON)로 out에 바로 씁니다
+    (out이 ResultWriter면 그 형식/압축을 따름).
+    인터프리터 기동과 커넥션 풀 비용은 배치 전체에서 한 번만 듭니다.
+    previous(키워드별 직전 결과)에 있는 키워드는 변경분(diff)만 씁니다.
+    targets(키워드별 순위 확인 대상, read_batch_jobs 참고)가 있는 키워드는 target 모드로 수집합니다.
+
+    Returns:
+        {'total': 처리한 키워드 수, 'failed': 실패한 키워드 수}
+    """
+
+    if client is None:
+        async with NaverHttpClient() as own_client:
+            return await run_batch_async(keywords, out, concurrency, own_client, previous, targets)
+
+    stats = {'total': 0, 'failed': 0}
+    pending = iter(keywords)
+    writer = out if isinstance(out, ResultWriter) else ResultWriter(out)
+
+    async def worker() -> None:
+        # 여러 worker가 같은 이터레이터에서 다음 키워드를 가져감 (next() 사이에는 await가 없음)
+        for keyword in pending:
+            try:
+                result = await main_async(keyword, client, (previous or {}).get(keyword),
+                                          (targets or {}).get(keyword) or None)
+            except Exception as e:
+                result = {
+                    'success': False,
+                    'error': f'Unexpected error: {str(e)}'
+                }
+            if not result.get('success'):
+                result.setdefault('keyword', keyword)
+                stats['failed'] += 1
+            stats['total'] += 1
+            writer.write_result(result)
+
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    return stats
+
+
+def run_batch(keywords: Iterable[str], out: Union[TextIO, ResultWriter] = sys.stdout, concurrency: int = 4,
+              client: Optional[NaverHttpClient] = None, previous: Optional[Dict[str, Dict]] = None,
+              targets: Optional[Dict[str, List[str]]] = None) -> Dict[str, int]:
+    """배치 모드 (동기 진입점, 넘긴 client는 닫지 않음)"""
+    return _run_sync(lambda opened: run_batch_async(keywords, out, concurrency, opened, previous, targets), client)
+
+
+class MethodNotFound(Exception):
+    """ScraperWorker.call: 없는 JSON-RPC 메서드 (-32601)"""
+
+
+class ScraperWorker:
+    """상주 워커: 줄 단위 JSON-RPC 2.0 요청을 받아 키워드를 동시에 처리 (v13)
+
+    하나의 client(커넥션 풀, 캐시, 브라우저 풀)를 모든 요청이 공유하므로 프로세스 기동과
+    콜드 커넥션 비용이 요청마다 들지 않습니다. 응답은 끝나는 순서대로 id와 함께 돌려줍니다.
+
+    메서드:
+        scrape {"keyword": str, "previous"?: 직전 결과, "previousHash"?: str, "targets"?: [str]}
+                                 → main()과 같은 결과 객체 (previous/previousHash가 있으면 변경분)
+        health                   → {"status": "ok", "uptimeSeconds", "inFlight"}
+        appearances {"blogIds": [str], "limit"?: int}
+                                 → {blogId: [최근 노출 {keyword, categoryTitle, rank, scrapedAt, ...}]}
+                                   (blog_index가 있을 때, 네이버 요청 없음)
+        stats                    → 처리 건수, 지표 합계, 요청 제어/캐시/브라우저 풀 상태
+        shutdown                 → 진행 중인 요청을 마친 뒤 종료
+    """
+
+    def __init__(self, client: NaverHttpClient, concurrency: int = 4):
+        self.client = client
+        self.concurrency = max(1, concurrency)
+        self.started_at = time.time()
+        self.in_flight = 0
+        self.served = 0
+        self.failed = 0
+        self.stopping = False
+        self._stop = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.concurrency)
+
+    def stats(self) -> dict:
+        client = self.client
+        return {
+            'uptimeSeconds': round(time.time() - self.started_at, 1),
+            'concurrency': self.concurrency,
+            'inFlight': self.in_flight,
+            'served': self.served,
+            'failed': self.failed,
+            'metrics': client.metrics.to_dict(),
+            'controller': client.controller.snapshot(),
+            'browserPool': client.browser_pool.stats,
+            'resolutionCache': client.resolution_cache.stats() if client.resolution_cache is not None else None,
+            'serpCache': client.serp_cache.stats() if client.serp_cache is not None else None,
+            'singleFlight': client.single_flight.stats(),
+            'archive': client.archive.stats() if client.archive is not None else None,
+            'blogIndex': client.blog_index.stats() if client.blog_index is not None else None,
+        }
+
+    async def call(self, method: str, params: dict) -> Any:
+        if method == 'scrape':
+            keyword = params.get('keyword')
+            if not isinstance(keyword, str) or not keyword.strip():
+                raise ValueError('params.keyword is required')
+            previous = params.get('previous')
+            if previous is None and params.get('previousHash'):
+                previous = {'resultHash': str(params['previousHash'])}
+            if previous is not None and not isinstance(previous, dict):
+                raise ValueError('params.previous must be an object')
+            targets = params.get('targets')
+            if targets is not None:
+                if not isinstance(targets, list) or not all(isinstance(target, str) for target in targets):
+                    raise ValueError('params.targets must be a list of strings')
+                targets = RankTargets(targets)
+            async with self._slots:
+                self.in_flight += 1
+                try:
+                    result = await main_async(keyword.strip(), self.client, previous, targets)
+                except Exception as e:
+                    result = {
+                        'success': False,
+                        'error': f'Unexpected error: {str(e)}'
+                    }
+                finally:
+                    self.in_flight -= 1
+            self.served += 1
+            if not result.get('success'):
+                result.setdefault('keyword', keyword)
+                self.failed += 1
+            return result
+        if method == 'appearances':
+            blog_ids = params.get('blogIds')
+            if not isinstance(blog_ids, list) or not all(isinstance(blog_id, str) for blog_id in blog_ids):
+                raise ValueError('params.blogIds must be a list of strings')
+            limit = params.get('limit', 10)
+            if limit is not None and (not isinstance(limit, int) or limit < 1):
+                raise ValueError('params.limit must be a positive integer')
+            if self.client.blog_index is None:
+                raise ValueError('blog index is not enabled (--blog-index)')
+            return self.client.blog_index.lookup_many(blog_ids, limit)
+        if method == 'health':
+            return {'status': 'stopping' if self.stopping else 'ok',
+                    'uptimeSeconds': round(time.time() - self.started_at, 1), 'inFlight': self.in_flight}
+        if method == 'stats':
+            return self.stats()
+        if method == 'shutdown':
+            self.stopping = True
+            self._stop.set()
+            return {'status': 'stopping'}
+        raise MethodNotFound(method)
+
+    async def handle(self, line: str) -> Optional[dict]:
+        """요청 한 줄 처리 → 응답 객체 (id 없는 notification이면 None)"""
+        try:
+            message = json.loads(line)
+        except ValueError:
+            return {'jsonrpc': '2.0', 'id': None, 'error': {'code': -32700, 'message': 'Parse error'}}
+        if not isinstance(message, dict) or not isinstance(message.get('method'), str):
+            return {'jsonrpc': '2.0', 'id': None, 'error': {'code': -32600, 'message': 'Invalid Request'}}
+
+        request_id = message.get('id')
+        params = message.get('params') or {}
+        try:
+            if not isinstance(params, dict):
+                raise ValueError('params must be an object')
+            response = {'jsonrpc': '2.0', 'id': request_id,
+                        'result': await self.call(message['method'], params)}
+        except MethodNotFound:
+            response = {'jsonrpc': '2.0', 'id': request_id,
+                        'error': {'code': -32601, 'message': f"Method not found: {message['method']}"}}
+        except ValueError as e:
+            response = {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': -32602, 'message': str(e)}}
+        except Exception as e:
+            # 메서드 안의 실제 오류: 메서드 없음/잘못된 인자로 숨기지 않고 내부 오류로 알림
+            import traceback
+            traceback.print_exc(file=sys.stderr)
+            response = {'jsonrpc': '2.0', 'id': request_id,
+                        'error': {'code': -32603, 'message': f'Internal error: {type(e).__name__}: {e}'}}
+        return response if 'id' in message else None
+
+    async def serve(self, read_line: Callable[[], Awaitable[str]], write_line: Callable[[str], Awaitable[None]]) -> None:
+        """연결 하나(또는 stdio)에서 EOF나 shutdown까지 요청을 읽고, 응답은 끝나는 대로 씀"""
+        write_lock = asyncio.Lock()
+        tasks: Set[asyncio.Task] = set()
+
+        async def respond(line: str) -> None:
+            response = await self.handle(line)
+            if response is not None:
+                async with write_lock:
+                    await write_line(dumps_json(response).decode('utf-8'))
+
+        while not self.stopping:
+            reading = asyncio.ensure_future(read_line())
+            stopping = asyncio.ensure_future(self._stop.wait())
+            done, _ = await asyncio.wait({reading, stopping}, return_when=asyncio.FIRST_COMPLETED)
+            stopping.cancel()
+            if reading not in done:
+                reading.cancel()
+                break
+            line = reading.result()
+            if not line:
+                break
+            if not line.strip():
+                continue
+            task = asyncio.ensure_future(respond(line))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def serve_stdio(self) -> None:
+        # stdin은 데몬 스레드에서 읽음 (shutdown 뒤 블로킹된 readline이 종료를 막지 않도록)
+        loop = asyncio.get_running_loop()
+        lines: asyncio.Queue = asyncio.Queue()
+
+        def pump() -> None:
+            try:
+                for line in sys.stdin:
+                    loop.call_soon_threadsafe(lines.put_nowait, line)
+                loop.call_soon_threadsafe(lines.put_nowait, '')
+            except RuntimeError:
+                pass  # 이벤트 루프가 이미 닫힘
+
+        threading.Thread(target=pump, name='scraper-worker-stdin', daemon=True).start()
+
+        async def read_line() -> str:
+            return await lines.get()
+
+        async def write_line(text: str) -> None:
+            sys.stdout.write(text + '\n')
+            sys.stdout.flush()
+
+        await self.serve(read_line, write_line)
+
+    async def serve_unix(self, path: str) -> None:
+        """Unix 소켓에서 여러 연결을 동시에 받음 (shutdown 요청 시 모든 연결의 진행 중 요청을 마치고 종료)"""
+        connections: Set[asyncio.Task] = set()
+
+        async def on_connect(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            connections.add(asyncio.current_task())
+            async def read_line() -> str:
+                return (await reader.readline()).decode('utf-8')
+
+            async def write_line(text: str) -> None:
+                writer.write(text.encode('utf-8') + b'\n')
+                await writer.drain()
+
+            try:
+                await self.serve(read_line, write_line)
+            finally:
+                writer.close()
+                connections.discard(asyncio.current_task())
+
+        if os.path.exists(path):
+            os.unlink(path)
+        server = await asyncio.start_unix_server(on_connect, path, limit=1 << 20)
+        try:
+            await self._stop.wait()
+        finally:
+            server.close()
+            if connections:
+                await asyncio.gather(*connections, return_exceptions=True)
+            await server.wait_closed()
+            if os.path.exists(path):
+                os.unlink(path)
+
+
+async def run_worker_async(client: NaverHttpClient, concurrency: int = 4, socket_path: Optional[str] = None) -> dict:
+    """상주 워커 실행 (socket_path가 없으면 stdin/stdout), 종료 시 통계 반환"""
+    worker = ScraperWorker(client, concurrency)
+    if socket_path:
+        await worker.serve_unix(socket_path)
+    else:
+        await worker.serve_stdio()
+    return {'served': worker.served, 'failed': worker.failed}
+
+
+def run_worker(client: Optional[NaverHttpClient] = None, concurrency: int = 4, socket_path: Optional[str] = None) -> dict:
+    """상주 워커 (동기 진입점, 넘긴 client는 닫지 않음)"""
+    return _run_sync(lambda opened: run_worker_async(opened, concurrency, socket_path), client)
+
+
+class KeywordJob(NamedTuple):
+    """KeywordJobQueue.claim()이 돌려주는 작업 하나 (임대 중)"""
+    id: int
+    keyword: str
+    targets: List[str]
+    attempts: int  # 이번 임대를 포함한 시도 횟수
+
+
+class KeywordJobQueue:
+    """키워드 수집 작업 큐 (SQLite, 임대 방식)
+
+    여러 워커 프로세스가 같은 파일에서 claim()으로 작업을 임대(lease)해 가고, 처리 중에는
+    heartbeat()로 임대를 연장합니다. 임대가 lease_seconds 안에 연장되지 않으면(워커 종료 등)
+    다른 워커가 다시 가져갑니다 (visibility timeout). 실패한 작업은 backoff_base * 2^(시도-1)초
+    (최대 backoff_max) 뒤에 다시 나오고, max_attempts번 실패하거나 다시 시도해도 소용없는
+    실패(retryable=False)면 바로 failed로 끝납니다.
+    완료한 결과는 큐에 함께 기록되어(write-back) results()로 읽습니다.
+    complete()/fail()은 임대를 가진 워커만 반영되며, 임대를 잃은 뒤의 결과는 버립니다.
+    임대는 BEGIN IMMEDIATE 트랜잭션으로 잡으므로 같은 파일을 여러 프로세스가 공유할 수 있습니다
+    (WAL 모드라 네트워크 파일시스템이 아닌 한 머신 안의 공유를 전제로 함).
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 120, max_attempts: int = 5,
+                 backoff_base: float = 30, backoff_max: float = 1800):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._lock = threading.Lock()
+
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        import sqlite3
+
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            ' id INTEGER PRIMARY KEY,'
+            ' keyword TEXT NOT NULL,'
+            ' targets TEXT NOT NULL,'  # JSON 배열
+            ' status TEXT NOT NULL,'  # queued / leased / done / failed
+            ' attempts INTEGER NOT NULL DEFAULT 0,'
+            ' available_at REAL NOT NULL,'  # queued: 이 시각 이후에 임대 가능 (재시도 대기)
+            ' lease_owner TEXT,'
+            ' lease_expires REAL,'
+            ' last_error TEXT,'
+            ' result TEXT,'  # 마지막 결과 JSON (done이면 성공 결과)
+            ' created_at REAL NOT NULL,'
+            ' finished_at REAL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, available_at)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_keyword ON jobs(keyword, status)')
+
+    @contextlib.contextmanager
+    def _transaction(self) -> Iterator[Any]:
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+
+    def enqueue(self, keywords: Iterable[str], targets: Optional[Dict[str, List[str]]] = None) -> Dict[str, int]:
+        """키워드 작업 추가 (read_batch_jobs 결과 그대로 받음)
+
+        같은 키워드의 작업이 아직 끝나지 않았으면(queued/leased) 새로 만들지 않고 그 작업에
+        대상만 합칩니다. Returns: {'added': 새 작업 수, 'merged': 기존 작업에 합친 수}
+        """
+        now = time.time()
+        counts = {'added': 0, 'merged': 0}
+        with self._transaction() as conn:
+            for keyword in keywords:
+                job_targets = list((targets or {}).get(keyword) or ())
+                row = conn.execute(
+                    "SELECT id, targets FROM jobs WHERE keyword = ? AND status IN ('queued', 'leased') LIMIT 1",
+                    (keyword,),
+                ).fetchone()
+                if row is None:
+                    conn.execute(
+                        "INSERT INTO jobs (keyword, targets, status, available_at, created_at) "
+                        "VALUES (?, ?, 'queued', ?, ?)",
+                        (keyword, json.dumps(job_targets, ensure_ascii=False), now, now),
+                    )
+                    counts['added'] += 1
+                    continue
+                job_id, existing = row
+                merged = json.loads(existing)
+                merged.extend(target for target in job_targets if target not in merged)
+                conn.execute('UPDATE jobs SET targets = ? WHERE id = ?', (json.dumps(merged, ensure_ascii=False), job_id))
+                counts['merged'] += 1
+        return counts
+
+    def claim(self, worker_id: str, limit: int = 1) -> List[KeywordJob]:
+        """임대 가능한 작업을 최대 limit개 임대 (재시도 대기가 끝났거나 임대가 만료된 작업 포함)"""
+        if limit < 1:
+            return []
+        now = time.time()
+        with self._transaction() as conn:
+            # 임대가 만료된 채 시도 횟수를 다 쓴 작업은 다시 내주지 않고 실패로 끝냄
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', last_error = 'lease expired', lease_owner = NULL, "
+                "finished_at = ? WHERE status = 'leased' AND lease_expires <= ? AND attempts >= ?",
+                (now, now, self.max_attempts),
+            )
+            rows = conn.execute(
+                "SELECT id, keyword, targets, attempts FROM jobs "
+                "WHERE (status = 'queued' AND available_at <= ?) OR (status = 'leased' AND lease_expires <= ?) "
+                "ORDER BY available_at, id LIMIT ?",
+                (now, now, limit),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1 "
+                "WHERE id = ?",
+                [(worker_id, now + self.lease_seconds, job_id) for job_id, _, _, _ in rows],
+            )
+        return [KeywordJob(job_id, keyword, json.loads(targets), attempts + 1)
+                for job_id, keyword, targets, attempts in rows]
+
+    def heartbeat(self, job_id: int, worker_id: str) -> bool:
+        """임대 연장 (False면 임대를 잃음: 만료 후 다른 워커가 가져감)"""
+        with self._transaction() as conn:
+            updated = conn.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (time.time() + self.lease_seconds, job_id, worker_id),
+            ).rowcount
+        return updated == 1
+
+    def complete(self, job_id: int, worker_id: str, result: Dict) -> str:
+        """성공 결과 기록 → 'done' (임대를 잃었으면 결과를 버리고 'lost')"""
+        with self._transaction() as conn:
+            updated = conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, lease_owner = NULL, last_error = NULL, finished_at = ? "
+                "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (dumps_json(result).decode('utf-8'), time.time(), job_id, worker_id),
+            ).rowcount
+        return 'done' if updated == 1 else 'lost'
+
+    def fail(self, job_id: int, worker_id: str, error: str, result: Optional[Dict] = None,
+             retryable: bool = True) -> str:
+        """실패 기록 → 'retried'(백오프 후 다시 queued) / 'failed'(영구 실패 또는 시도 횟수 소진) / 'lost'"""
+        now = time.time()
+        encoded = dumps_json(result).decode('utf-8') if result is not None else None
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT attempts FROM jobs WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (job_id, worker_id),
+            ).fetchone()
+            if row is None:
+                return 'lost'
+            (attempts,) = row
+            if not retryable or attempts >= self.max_attempts:
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', last_error = ?, result = ?, lease_owner = NULL, "
+                    "finished_at = ? WHERE id = ?",
+                    (error, encoded, now, job_id),
+                )
+                return 'failed'
+            delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', last_error = ?, result = ?, lease_owner = NULL, "
+                "lease_expires = NULL, available_at = ? WHERE id = ?",
+                (error, encoded, now + delay, job_id),
+            )
+        return 'retried'
+
+    def outstanding(self) -> int:
+        """아직 끝나지 않은 작업 수 (queued + leased, 재시도 대기 포함)"""
+        with self._lock:
+            (count,) = self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'leased')"
+            ).fetchone()
+        return count
+
+    def results(self, after_id: int = 0, include_failed: bool = True) -> Iterator[Tuple[int, Dict]]:
+        """끝난 작업의 (id, 결과) (id 순서, after_id 이후만). 실패 작업은 마지막 결과나 오류 객체"""
+        statuses = ('done', 'failed') if include_failed else ('done',)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, keyword, status, result, last_error FROM jobs WHERE id > ? "
+                f"AND status IN ({','.join('?' * len(statuses))}) ORDER BY id",
+                (after_id, *statuses),
+            ).fetchall()
+        for job_id, keyword, status, result, last_error in rows:
+            if result:
+                yield job_id, json.loads(result)
+            else:
+                yield job_id, {'success': False, 'keyword': keyword, 'error': last_error or status}
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+        counts = {'queued': 0, 'leased': 0, 'done': 0, 'failed': 0}
+        counts.update(rows)
+        return counts
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def default_worker_id() -> str:
+    import socket
+
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+async def run_queue_worker_async(queue: KeywordJobQueue, client: NaverHttpClient, concurrency: int = 4,
+                                 worker_id: Optional[str] = None, poll_interval: float = 2.0,
+                                 drain: bool = False) -> Dict[str, int]:
+    """큐에서 키워드 작업을 임대해 최대 concurrency개씩 main_async로 처리
+
+    처리 중인 작업은 lease_seconds/3마다 임대를 연장하고, 성공 결과는 complete()로,
+    실패(success=False 또는 예외)는 fail()로 돌려줍니다. 결과의 retryable이 False이거나
+    네트워크 외의 예외(파싱 오류 등 같은 입력이면 반복되는 실패)는 재시도 없이 바로 failed가 됩니다.
+    drain이면 끝나지 않은 작업이 하나도 없을 때 종료하고, 아니면 SIGINT/SIGTERM을 받을 때까지
+    poll_interval초마다 새 작업을 찾습니다. 종료할 때는 새 작업을 임대하지 않고 진행 중인 작업만 마칩니다.
+    큐 호출(SQLite, 잠금 대기 최대 30초)은 이벤트 루프를 막지 않도록 스레드에서 실행하고, 결과 기록이
+    실패하면 작업별로 로그만 남깁니다 (임대가 만료되면 다른 워커가 다시 처리, 'lost'로 집계).
+
+    Returns:
+        {'claimed', 'done', 'retried', 'failed', 'lost'} 건수
+    """
+    import signal
+
+    worker_id = worker_id or default_worker_id()
+    stats = {'claimed': 0, 'done': 0, 'retried': 0, 'failed': 0, 'lost': 0}
+    running: Set[asyncio.Task] = set()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        with contextlib.suppress(NotImplementedError, RuntimeError, ValueError):
+            loop.add_signal_handler(signum, stop.set)
+
+    async def keep_lease(job: KeywordJob) -> None:
+        while True:
+            await asyncio.sleep(queue.lease_seconds / 3)
+            try:
+                alive = await asyncio.to_thread(queue.heartbeat, job.id, worker_id)
+            except Exception as e:
+                print(f'작업 임대 연장 실패: {job.keyword} (#{job.id}): {e}', file=sys.stderr)
+                continue
+            if not alive:
+                print(f'작업 임대 상실: {job.keyword} (#{job.id})', file=sys.stderr)
+                return
+
+    async def process(job: KeywordJob) -> None:
+        heartbeat = asyncio.create_task(keep_lease(job))
+        try:
+            result = await main_async(job.keyword, client, None, job.targets or None)
+        except Exception as e:
+            result = {
+                'success': False,
+                'error': f'Unexpected error: {str(e)}',
+                'retryable': isinstance(e, (FetchError, OSError, asyncio.TimeoutError)),
+            }
+        finally:
+            heartbeat.cancel()
+        try:
+            if result.get('success'):
+                outcome = await asyncio.to_thread(queue.complete, job.id, worker_id, result)
+            else:
+                result.setdefault('keyword', job.keyword)
+                outcome = await asyncio.to_thread(queue.fail, job.id, worker_id, result.get('error') or 'failed',
+                                                  result, result.get('retryable', True))
+        except Exception as e:
+            print(f'작업 결과 기록 실패: {job.keyword} (#{job.id}): {e}', file=sys.stderr)
+            outcome = 'lost'
+        stats[outcome] += 1
+
+    try:
+        while not stop.is_set():
+            try:
+                jobs = await asyncio.to_thread(queue.claim, worker_id, concurrency - len(running))
+            except Exception as e:
+                print(f'작업 임대 실패: {e}', file=sys.stderr)
+                jobs = []
+            stats['claimed'] += len(jobs)
+            for job in jobs:
+                task = asyncio.create_task(process(job))
+                running.add(task)
+                task.add_done_callback(running.discard)
+            if len(running) >= concurrency:
+                await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                continue
+            if jobs:
+                continue
+            if drain and not running:
+                try:
+                    if await asyncio.to_thread(queue.outstanding) == 0:
+                        break
+                except Exception as e:
+                    print(f'남은 작업 확인 실패: {e}', file=sys.stderr)
+            # 빈 슬롯이 있지만 임대할 작업이 없음: 작업 하나가 끝나거나 poll_interval이 지날 때까지 대기
+            waiters = [*running, asyncio.ensure_future(stop.wait())]
+            await asyncio.wait(waiters, timeout=poll_interval, return_when=asyncio.FIRST_COMPLETED)
+            waiters[-1].cancel()
+        if running:
+            await asyncio.gather(*running)
+    finally:
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            with contextlib.suppress(NotImplementedError, RuntimeError, ValueError):
+                loop.remove_signal_handler(signum)
+    return stats
+
+
+def run_queue_worker(queue: KeywordJobQueue, client: Optional[NaverHttpClient] = None, concurrency: int = 4,
+                     worker_id: Optional[str] = None, poll_interval: float = 2.0, drain: bool = False) -> Dict[str, int]:
+    """큐 워커 (동기 진입점, 넘긴 client는 닫지 않음)"""
+    return _run_sync(lambda opened: run_queue_worker_async(queue, opened, concurrency, worker_id, poll_interval, drain),
+                     client)
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description='네이버 스마트블록 다중 카테고리 스크래퍼',
+    )
+    parser.add_argument('keyword', nargs='?', help='검색 키워드 (단일 모드)')
+    parser.add_argument('--batch', metavar='FILE',
+                        help='키워드 파일 (한 줄에 하나, "-"이면 stdin). 결과는 키워드마다 JSON 한 줄로 출력. '
+                             '줄마다 {"keyword": ..., "targets": [...]} 형식도 가능 (같은 키워드는 한 번만 수집)')
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='배치/워커 모드에서 동시에 처리할 키워드 수 (기본 4)')
+    parser.add_argument('--output', '-o', metavar='FILE',
+                        help='결과를 stdout 대신 FILE에 씀')
+    parser.add_argument('--format', choices=('json', 'ndjson'),
+                        help='결과 형식 (기본: 단일 모드 json = 들여쓴 문서, 배치 모드 ndjson = 키워드마다 한 줄)')
+    parser.add_argument('--per-category', action='store_true',
+                        help='NDJSON에서 카테고리마다 한 줄 + 키워드 요약 한 줄로 씀 (키워드가 끝난 뒤 한꺼번에)')
+    parser.add_argument('--compress', choices=('zstd',),
+                        help='결과마다 zstd 프레임으로 압축해서 씀 (zstandard 패키지 필요)')
+    parser.add_argument('--worker', action='store_true',
+                        help='상주 워커 모드: stdin에서 줄 단위 JSON-RPC 요청을 받아 stdout으로 응답')
+    parser.add_argument('--socket', metavar='PATH',
+                        help='워커 모드를 stdin 대신 Unix 소켓 PATH에서 실행')
+    parser.add_argument('--queue', metavar='FILE', default=os.environ.get('SCRAPER_QUEUE'),
+                        help='임대 방식 작업 큐 파일(SQLite, 기본 $SCRAPER_QUEUE): --enqueue/--queue-worker/--queue-results가 사용')
+    parser.add_argument('--enqueue', metavar='FILE',
+                        help='--batch와 같은 형식의 키워드/작업 파일("-"이면 stdin)을 큐에 넣고 종료 '
+                             '(끝나지 않은 같은 키워드 작업이 있으면 대상만 합침)')
+    parser.add_argument('--queue-worker', action='store_true',
+                        help='큐 워커 모드: 작업을 임대해 --concurrency개씩 처리하고 결과를 큐에 기록 '
+                             '(여러 프로세스를 띄워 수평 확장, SIGTERM이면 진행 중인 작업만 마치고 종료)')
+    parser.add_argument('--drain', action='store_true',
+                        help='큐 워커가 끝나지 않은 작업이 없으면 종료 (기본: 새 작업을 계속 기다림)')
+    parser.add_argument('--queue-results', type=int, nargs='?', const=0, metavar='AFTER_ID',
+                        help='끝난 작업의 결과를 (AFTER_ID 이후만) --format 형식으로 출력하고 종료')
+    parser.add_argument('--lease-seconds', type=float, default=120,
+                        help='작업 임대 시간(초, 기본 120). 이 시간 안에 연장되지 않으면 다른 워커가 가져감')
+    parser.add_argument('--max-attempts', type=int, default=5,
+                        help='작업당 최대 시도 횟수 (기본 5, 재시도 간격은 30초부터 두 배씩, 최대 30분)')
+    parser.add_argument('--diff-from', metavar='FILE',
+                        help='직전 결과 파일(단일 JSON 또는 배치 NDJSON): 해당 키워드는 변경분만 출력하고, '
+                             '미리보기가 그대로인 카테고리는 더보기 요청을 생략')
+    parser.add_argument('--target', action='append', metavar='URL',
+                        help='순위를 확인할 블로그 글 (URL, "blogId/postId", "blogId"; 여러 번 지정 가능). '
+                             '대상을 찾으면 카테고리별 수집을 멈추고 결과의 "targets"에 순위를 담음')
+    parser.add_argument('--per-host-limit', type=int, default=6,
+                        help='호스트별 초기 동시 HTTP 요청 수 (기본 6, 이후 응답 상태에 따라 자동 조절)')
+    parser.add_argument('--max-per-host', type=int, default=None,
+                        help='호스트별 동시 요청 수 상한 (기본 --per-host-limit의 4배)')
+    parser.add_argument('--rate', type=float, default=20.0,
+                        help='호스트별 초당 요청 시작 수 상한 (기본 20, 0이면 제한 없음)')
+    parser.add_argument('--lb-api-pages', type=int, default=LB_API_MAX_PAGES,
+                        help='ugc_list 카테고리에서 lb_api로 가져올 최대 페이지 수 (기본 5, 새 글이 없으면 조기 종료)')
+    parser.add_argument('--metrics', action='store_true', default=COLLECT_METRICS,
+                        help='결과 JSON에 스테이지별 시간/호출 수/카운터(metrics) 포함')
+    parser.add_argument('--metrics-prom', metavar='FILE',
+                        help='종료 시 전체 키워드의 지표 합계를 Prometheus 텍스트 형식으로 FILE에 기록 ("-"이면 stderr)')
+    parser.add_argument('--browser-pool-size', type=int, default=2,
+                        help='Playwright fallback이 동시에 쓰는 headless 컨텍스트 수 (기본 2)')
+    parser.add_argument('--browser-max-uses', type=int, default=20,
+                        help='컨텍스트를 새로 만들기 전까지 재사용할 횟수 (기본 20)')
+    parser.add_argument('--cache-dir', default=default_cache_dir(),
+                        help='in.naver.com 해석 캐시 등 영구 캐시 위치 (기본 $SCRAPER_CACHE_DIR 또는 ~/.cache/naver_blrank)')
+    parser.add_argument('--archive', metavar='DIR', default=os.environ.get('SCRAPER_ARCHIVE_DIR'),
+                        help='성공한 결과의 블로그 노출을 날짜별 SQLite 아카이브 DIR에 기록 (기본 $SCRAPER_ARCHIVE_DIR)')
+    parser.add_argument('--archive-query', metavar='BLOG_ID',
+                        help='수집 대신 아카이브에서 BLOG_ID의 (키워드, 카테고리)별 노출 횟수를 조회해 출력')
+    parser.add_argument('--archive-category', metavar='TITLE',
+                        help='--archive-query를 카테고리 제목 하나로 제한')
+    parser.add_argument('--archive-since', metavar='YYYY-MM-DD', help='--archive-query 시작 날짜 (포함)')
+    parser.add_argument('--archive-until', metavar='YYYY-MM-DD', help='--archive-query 끝 날짜 (포함)')
+    parser.add_argument('--blog-index', metavar='FILE', default=os.environ.get('SCRAPER_BLOG_INDEX'),
+                        help='성공한 결과로 blogId → (키워드, 카테고리, 순위) 역색인 FILE(SQLite)을 갱신 '
+                             '(기본 $SCRAPER_BLOG_INDEX)')
+    parser.add_argument('--blog-lookup', action='append', metavar='BLOG_ID',
+                        help='수집 대신 --blog-index에서 BLOG_ID의 최근 노출을 조회해 출력 (여러 번 지정 가능)')
+    parser.add_argument('--lookup-limit', type=int, default=10,
+                        help='--blog-lookup에서 blogId마다 출력할 최근 노출 수 (기본 10)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='영구 캐시를 사용하지 않음')
+    parser.add_argument('--serp-cache', action='store_true',
+                        help='스마트블록 미리보기가 바뀌지 않았으면 직전 결과를 재사용 (더보기/lb_api 순위는 '
+                             '다시 확인하지 않으므로 기본은 끔)')
+    parser.add_argument('--no-serp-cache', action='store_true', help=argparse.SUPPRESS)  # 이전 옵션 호환 (기본값과 같음)
+    parser.add_argument('--serp-max-age', type=float, default=3600,
+                        help='--serp-cache에서 직전 결과를 재사용할 수 있는 최대 경과 시간(초, 기본 3600 = 측정 주기 정도)')
+    parser.add_argument('--dedup-ttl', type=float, default=60,
+                        help='키워드 사이에서 합친 더보기/lb_api/in.naver.com 결과를 재사용할 시간(초, 기본 60, '
+                             '0이면 동시에 진행 중인 요청만 합침)')
+    parser.add_argument('--parser', choices=('bs4', 'lxml'), default=HTML_PARSER_BACKEND,
+                        help='HTML 파싱 백엔드 (기본 $SCRAPER_PARSER 또는 bs4, 결과는 동일)')
+    parser.add_argument('--parse-processes', type=int, nargs='?', const=os.cpu_count() or 1, default=0,
+                        help='HTML 파싱을 N개 프로세스 풀에서 실행 (값 생략 시 CPU 코어 수, 기본 0=인라인)')
+    parser.add_argument('--resolve-mode', choices=('fast', 'full'), default=RESOLVE_MODE,
+                        help='in.naver.com 해석 방식: fast=리다이렉트/스트리밍 스캔, full=본문 전체 파싱 (기본 fast)')
+    return parser
+
+
+def cli(argv: List[str]) -> int:
+    """커맨드라인 진입점"""
+
+    global HTML_PARSER_BACKEND, RESOLVE_MODE, LB_API_MAX_PAGES, COLLECT_METRICS
+
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    previous = load_previous_results(args.diff_from) if args.diff_from else {}
+    HTML_PARSER_BACKEND = args.parser
+    RESOLVE_MODE = args.resolve_mode
+    LB_API_MAX_PAGES = args.lb_api_pages
+    COLLECT_METRICS = args.metrics
+
+    try:
+        RankTargets(args.target or ())
+    except ValueError as e:
+        print(json.dumps({'success': False, 'error': str(e)}, ensure_ascii=False))
+        return 1
+
+    if args.archive_query:
+        if not args.archive:
+            print(json.dumps({'success': False, 'error': '--archive-query requires --archive DIR'}, ensure_ascii=False))
+            return 1
+        archive = ObservationArchive(args.archive)
+        try:
+            appearances = archive.appearances(args.archive_query, args.archive_category,
+                                              args.archive_since, args.archive_until)
+        finally:
+            archive.close()
+        print(json.dumps({'success': True, 'blogId': args.archive_query, 'appearances': appearances},
+                         ensure_ascii=False, indent=2))
+        return 0
+
+    if args.blog_lookup:
+        if not args.blog_index:
+            print(json.dumps({'success': False, 'error': '--blog-lookup requires --blog-index FILE'}, ensure_ascii=False))
+            return 1
+        blog_index = BlogAppearanceIndex(args.blog_index)
+        try:
+            appearances = blog_index.lookup_many(args.blog_lookup, args.lookup_limit)
+        finally:
+            blog_index.close()
+        print(json.dumps({'success': True, 'appearances': appearances}, ensure_ascii=False, indent=2))
+        return 0
+
+    queue = None
+    if args.enqueue or args.queue_worker or args.queue_results is not None:
+        if not args.queue:
+            print(json.dumps({'success': False, 'error': '--enqueue/--queue-worker/--queue-results require --queue FILE'},
+                             ensure_ascii=False))
+            return 1
+        queue = KeywordJobQueue(args.queue, lease_seconds=args.lease_seconds, max_attempts=args.max_attempts)
+    if args.enqueue or args.queue_results is not None:
+        output = None
+        try:
+            if args.enqueue:
+                source = sys.stdin if args.enqueue == '-' else open(args.enqueue, encoding='utf-8')
+                invalid: List[dict] = []
+                try:
+                    keywords, targets = read_batch_jobs(source, args.target or (), invalid)
+                finally:
+                    if source is not sys.stdin:
+                        source.close()
+                for failure in invalid:
+                    print(json.dumps(failure, ensure_ascii=False), file=sys.stderr)
+                counts = queue.enqueue(keywords, targets)
+                counts['invalid'] = len(invalid)
+                print(f'큐 추가: {json.dumps(counts)}', file=sys.stderr)
+            else:
+                output = open(args.output, 'wb') if args.output else sys.stdout.buffer
+                writer = ResultWriter(output, args.format or 'ndjson', args.per_category, args.compress)
+                for _, result in queue.results(args.queue_results):
+                    writer.write_result(result)
+                writer.close()
+            print(f'작업 큐: {json.dumps(queue.stats())}', file=sys.stderr)
+        finally:
+            if output is not None and output is not sys.stdout.buffer:
+                output.close()
+            queue.close()
+        return 0
+
+    if not args.batch and not args.keyword and not args.worker and not args.socket and not args.queue_worker:
+        # stdout JSON은 v12와 동일하게 유지 (호출 측 파싱 호환), 나머지 모드는 stderr 사용법으로 안내
         print(json.dumps({
             'success': False,
             'error': 'Usage: python scrape_smartblocks.py <keyword>'
         }, ensure_ascii=False))
-        sys.exit(1)
+        parser.print_usage(sys.stderr)
+        return 1
 
-    keyword = sys.argv[1]
+    resolution_cache = serp_cache = None
+    if not args.no_cache:
+        resolution_cache = InNaverResolutionCache(os.path.join(args.cache_dir, 'in_naver_resolution.sqlite3'))
+    if args.serp_cache and not args.no_cache and not args.no_serp_cache:
+        serp_cache = SerpCache(os.path.join(args.cache_dir, 'serp_cache.sqlite3'), max_result_age=args.serp_max_age)
+    controller = RateController(initial_window=args.per_host_limit, max_window=args.max_per_host,
+                                rate=args.rate or None)
+    browser_pool = BrowserPool(size=args.browser_pool_size, max_uses=args.browser_max_uses)
+    parse_pool = ParsePool(args.parse_processes) if args.parse_processes > 0 else None
+    archive = ObservationArchive(args.archive) if args.archive else None
+    blog_index = BlogAppearanceIndex(args.blog_index) if args.blog_index else None
+    client = NaverHttpClient(per_host_limit=args.per_host_limit, resolution_cache=resolution_cache,
+                             controller=controller, browser_pool=browser_pool, serp_cache=serp_cache,
+                             parse_pool=parse_pool, single_flight=SingleFlight(ttl=args.dedup_ttl),
+                             archive=archive, blog_index=blog_index)
 
+    output = None
     try:
-        result = main(keyword)
-        print(json.dumps(result, ensure_ascii=False, indent=2))
-    except Exception as e:
-        print(json.dumps({
-            'success': False,
-            'error': f'Unexpected error: {str(e)}'
-        }, ensure_ascii=False), file=sys.stderr)
-        sys.exit(1)
+        if args.worker or args.socket:
+            stats = _run_sync(lambda opened: run_worker_async(opened, args.concurrency, args.socket), client, True)
+            print(f"워커 종료: {stats['served']}개 요청 처리 (실패 {stats['failed']}개)", file=sys.stderr)
+            return 0
+
+        if args.queue_worker:
+            stats = _run_sync(lambda opened: run_queue_worker_async(queue, opened, args.concurrency, drain=args.drain),
+                              client, True)
+            print(f'큐 워커 종료: {json.dumps(stats)}, 작업 큐: {json.dumps(queue.stats())}', file=sys.stderr)
+            return 0
+
+        output = open(args.output, 'wb') if args.output else sys.stdout.buffer
+        writer = ResultWriter(output, args.format or ('ndjson' if args.batch else 'json'),
+                              args.per_category, args.compress)
+
+        if args.batch:
+            source = sys.stdin if args.batch == '-' else open(args.batch, encoding='utf-8')
+            invalid = []
+            try:
+                keywords, targets = read_batch_jobs(source, args.target or (), invalid)
+                # 잘못된 줄은 수집 없이 실패 결과로 먼저 기록
+                for failure in invalid:
+                    writer.write_result(failure)
+                stats = _run_sync(lambda opened: run_batch_async(keywords, writer, args.concurrency, opened,
+                                                                 previous, targets), client, True)
+            finally:
+                if source is not sys.stdin:
+                    source.close()
+            stats['total'] += len(invalid)
+            stats['failed'] += len(invalid)
+            writer.close()
+            print(f"배치 완료: {stats['total']}개 키워드 (실패 {stats['failed']}개)", file=sys.stderr)
+            return 0
+
+        try:
+            result = _run_sync(
+                lambda opened: main_async(args.keyword, opened, previous.get(args.keyword), args.target), client, True
+            )
+            writer.write_result(result)
+            writer.close()
+        except Exception as e:
+            print(json.dumps({
+                'success': False,
+                'error': f'Unexpected error: {str(e)}'
+            }, ensure_ascii=False), file=sys.stderr)
+            return 1
+        return 0
+    finally:
+        if output is not None and output is not sys.stdout.buffer:
+            output.close()
+        print(f'요청 제어 상태: {json.dumps(controller.snapshot())}', file=sys.stderr)
+        if args.metrics_prom == '-':
+            sys.stderr.write(client.metrics.to_prometheus())
+        elif args.metrics_prom:
+            with open(args.metrics_prom, 'w', encoding='utf-8') as f:
+                f.write(client.metrics.to_prometheus())
+        if parse_pool is not None:
+            parse_pool.close()
+        if queue is not None:
+            queue.close()
+        if client.single_flight.executed:
+            print(f'요청 합치기: {json.dumps(client.single_flight.stats())}', file=sys.stderr)
+        if browser_pool.stats['launches']:
+            print(f'브라우저 풀: {json.dumps(browser_pool.stats)}', file=sys.stderr)
+        if resolution_cache is not None:
+            print(f'in.naver.com 캐시: {json.dumps(resolution_cache.stats())}', file=sys.stderr)
+            resolution_cache.close()
+        if serp_cache is not None:
+            print(f'검색 페이지 캐시: {json.dumps(serp_cache.stats())}', file=sys.stderr)
+            serp_cache.close()
+        if archive is not None:
+            archive.close()
+            print(f'노출 아카이브: {json.dumps(archive.stats())}', file=sys.stderr)
+        if blog_index is not None:
+            print(f'블로그 역색인: {json.dumps(blog_index.stats())}', file=sys.stderr)
+            blog_index.close()
+
+
+if __name__ == '__main__':
+    sys.exit(cli(sys.argv[1:]))